@@ -1,8 +1,10 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
 from src.loader.dataLoader import load_badges, load_courses, load_relationships
+from src.api.json_provider import FastJSONProvider
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
 @app.route('/api/badges')
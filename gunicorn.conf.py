@@ -0,0 +1,28 @@
+"""
+Gunicorn settings for the backend: the app and its catalog indexes are loaded
+once in the master, and workers fork from it sharing that memory copy-on-write.
+
+    gunicorn -c gunicorn.conf.py src.api.server:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5002')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+# Streamed and LLM-backed responses run up to nginx's 300 s proxy_read_timeout
+timeout = 300
+preload_app = True
+# Tells the app it is being preloaded, so it leaves background work to preload_for_fork and the workers
+os.environ['BACKEND_PRELOAD'] = '1'
+
+
+def when_ready(server):
+    from src.api import server as backend
+    backend.preload_for_fork()
+
+
+def post_fork(server, worker):
+    from src.api import server as backend
+    backend.after_fork()
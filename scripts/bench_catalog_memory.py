@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure catalog model memory per 100k courses.
+
+Compares the previous dict-backed Course class (which also dropped hours,
+topics, projects and url) with the slotted, full-fidelity models and the
+columnar CatalogTable, using tracemalloc on a synthetic catalog.
+
+Usage:
+    python scripts/bench_catalog_memory.py [--courses 100000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.models.course import Course
+from src.planner.catalog_table import CatalogTable
+
+
+class LegacyCourse:
+    """The Course model as it was before slots: per-instance __dict__, lists, no interning."""
+
+    def __init__(self, id, name, description, prerequisites=None, badges=None):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.prerequisites = prerequisites or []
+        self.badges = badges or []
+
+    @classmethod
+    def from_dict(cls, data):
+        badges = [data['relatedBadge']] if data.get('relatedBadge') else []
+        return cls(data.get('id'), data.get('title'), data.get('description'),
+                   list(data.get('prerequisites', [])), badges)
+
+
+class LegacyFullCourse(LegacyCourse):
+    """The legacy model extended to keep every field, to isolate the cost of __dict__."""
+
+    @classmethod
+    def from_dict(cls, data):
+        course = super().from_dict(data)
+        course.hours = data.get('hours')
+        course.url = data.get('url')
+        course.topics = list(data.get('topics', []))
+        course.projects = list(data.get('projects', []))
+        return course
+
+
+def synthetic_catalog(count: int):
+    for i in range(count):
+        level = (i % 3) + 1
+        yield {
+            "id": f"course_{i:06d}_{level}01",
+            "title": f"Course {i}",
+            "description": f"Description of course {i}",
+            "hours": 8 + i % 20,
+            "url": f"https://example.com/courses/{i}",
+            # Ids arrive as fresh strings from the JSON parser, as in production
+            "relatedBadge": "".join(["badge_", str(i % 50)]),
+            "prerequisites": ["".join(["course_", f"{max(i - k, 0):06d}", f"_{level}01"]) for k in (1, 2)],
+            "topics": [f"topic {i % 40}", f"topic {i % 70}"],
+            "projects": [f"project {i % 30}"],
+        }
+
+
+def measure(label: str, build):
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<40} {current / 1024 / 1024:8.1f} MiB")
+    return objects, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=100000)
+    args = parser.parse_args()
+
+    raw = list(synthetic_catalog(args.courses))
+    print(f"Memory for {args.courses} courses (raw dicts excluded):")
+    _, legacy = measure("legacy Course (__dict__, 5 fields)", lambda: [LegacyCourse.from_dict(d) for d in raw])
+    _, legacy_full = measure("legacy Course (__dict__, all 9 fields)", lambda: [LegacyFullCourse.from_dict(d) for d in raw])
+    courses, slotted = measure("slotted Course (all 9 fields)", lambda: [Course.from_dict(d) for d in raw])
+    measure("CatalogTable columns", lambda: CatalogTable({c.id: c for c in courses},
+                                                         [f"badge_{i}" for i in range(50)],
+                                                         lambda course_id: "basic"))
+    print(f"  slotted / legacy (5 fields): {slotted / legacy:.2f}x")
+    print(f"  slotted / legacy (all fields): {slotted / legacy_full:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker private memory of forked workers sharing a preloaded catalog.
+
+Writes a synthetic catalog, loads it and builds every index once (as the
+gunicorn master does), then forks workers that each serve a mix of search,
+similar-course, schedule and track queries and run a full GC pass, as a
+worker would over its lifetime. Run once as-is and once with gc.freeze()
+before forking, each in a fresh interpreter, and report what each worker
+holds privately (pages copy-on-write could not keep shared).
+
+Usage:
+    python scripts/bench_fork_memory.py [--courses 20000] [--workers 4]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+LEVELS = ("basic", "intermediate", "expert")
+WORDS = ("python", "cloud", "data", "security", "testing", "design", "devops", "network", "agile", "api",
+         "kubernetes", "frontend", "backend", "analytics", "leadership", "database", "linux", "git", "ml", "ux")
+
+
+def write_catalog(directory: str, course_count: int, badge_count: int, rng: random.Random):
+    def text(n):
+        return " ".join(rng.choice(WORDS) + str(rng.randrange(200)) for _ in range(n))
+
+    os.makedirs(os.path.join(directory, "courses"))
+    os.makedirs(os.path.join(directory, "badges"))
+    badge_ids = [f"{LEVELS[i % 3]}_badge_{i:04d}" for i in range(badge_count)]
+    badge_courses = {badge_id: [] for badge_id in badge_ids}
+    for i in range(course_count):
+        course_id = f"course_{i:06d}_{i % 3 + 1}01"
+        badge_id = badge_ids[i % badge_count]
+        badge_courses[badge_id].append(course_id)
+        course = {
+            "id": course_id, "title": text(4), "description": text(25), "hours": 4 + i % 40,
+            "relatedBadge": badge_id, "topics": [text(2) for _ in range(3)], "projects": [text(3)],
+            # Chains stay within blocks of 50 courses, so schedules stay realistic
+            "prerequisites": [f"course_{j:06d}_{j % 3 + 1}01" for j in (i - 7, i - 31) if j >= i - i % 50],
+        }
+        with open(os.path.join(directory, "courses", f"{course_id}.json"), "w") as f:
+            json.dump(course, f)
+    for badge_id, courses in badge_courses.items():
+        badge = {"id": badge_id, "title": text(3), "description": text(20), "level": badge_id.split("_")[0],
+                 "courses": courses[:5], "skills": [text(2) for _ in range(4)]}
+        with open(os.path.join(directory, "badges", f"{badge_id}.json"), "w") as f:
+            json.dump(badge, f)
+
+
+def serve(planner, rng: random.Random, queries: int):
+    """A worker's share of traffic over the queried parts of the catalog."""
+    course_ids = list(planner.courses)
+    badge_ids = list(planner.badges)
+    for _ in range(queries):
+        planner.search_index.search(rng.choice(WORDS))
+        planner.similar_courses.similar(rng.choice(course_ids), 10)
+        planner.scheduler.schedule([rng.choice(badge_ids)], rng.sample(course_ids, 20), detail=False)
+        planner.track_index.reachable_experts([rng.choice(badge_ids)], rng.sample(course_ids, 20), limit=10)
+        planner.courses[rng.choice(course_ids)].to_dict()
+    gc.collect()
+
+
+def run_mode(catalog_dir: str, workdir: str, workers: int, queries: int, freeze: bool) -> dict:
+    from src.common.memory import process_memory
+    from src.planner.training_planner import TrainingPlanner
+
+    planner = TrainingPlanner(catalog_dir=catalog_dir, snapshot_path=os.path.join(workdir, "catalog.pickle"))
+    planner.build_indexes()
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    master = process_memory()
+
+    readers = []
+    for worker in range(workers):
+        read_fd, write_fd = os.pipe()
+        if os.fork() == 0:
+            os.close(read_fd)
+            try:
+                serve(planner, random.Random(worker), queries)
+                os.write(write_fd, json.dumps(process_memory()).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        readers.append(read_fd)
+    results = []
+    for read_fd in readers:
+        with os.fdopen(read_fd) as f:
+            results.append(json.loads(f.read()))
+        os.wait()
+    return {"master": master, "workers": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=20000)
+    parser.add_argument("--badges", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--mode", choices=("plain", "frozen"), help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        result = run_mode(os.path.join(args.workdir, "catalog"), args.workdir, args.workers, args.queries,
+                          freeze=args.mode == "frozen")
+        print(json.dumps(result))
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench-fork-")
+    write_catalog(os.path.join(workdir, "catalog"), args.courses, args.badges, random.Random(7))
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, USER_DB_PATH=os.path.join(workdir, "users.db"))
+    print(f"{args.courses} courses, {args.workers} forked workers, {args.queries} queries each (MiB):")
+    print(f"  {'mode':<8} {'master RSS':>10} {'worker RSS':>10} {'private':>8} {'shared':>8} {'PSS':>8}")
+    for mode in ("plain", "frozen"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--workdir", workdir, "--workers", str(args.workers),
+             "--queries", str(args.queries)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        workers = result["workers"]
+
+        def mean(key):
+            return sum(w[key] for w in workers) / len(workers) / 1024 / 1024
+
+        print(f"  {mode:<8} {result['master']['rss'] / 1024 / 1024:10.1f} {mean('rss'):10.1f} "
+              f"{mean('private'):8.1f} {mean('shared'):8.1f} {mean('pss'):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
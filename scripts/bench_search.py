@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure SearchIndex build time and query latency on a synthetic catalog.
+
+Builds an index over generated courses and badges whose text is drawn from
+the real catalog's vocabulary, then runs a mix of exact, prefix, typo,
+multi-word and filtered queries and prints p50/p99 latency per kind.
+
+Usage:
+    python scripts/bench_search.py [--courses 100000] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.loader.dataLoader import load_courses
+from src.models.badge import Badge
+from src.models.course import Course
+from src.planner.search import SearchIndex, tokenize
+
+LEVELS = ("basic", "intermediate", "expert")
+
+
+def synthetic_catalog(course_count: int, badge_count: int, rng: random.Random):
+    words = sorted({token for c in load_courses().values()
+                    for token in tokenize(" ".join([c["title"], c["description"], *c.get("topics", [])]))})
+    # A larger vocabulary than the real catalog, so posting lists are not all huge
+    words += [f"{word}{suffix}" for word in words[:400] for suffix in ("ing", "er", "ed", "ly")]
+
+    def text(n):
+        return " ".join(rng.choice(words) for _ in range(n))
+
+    badges = {}
+    for i in range(badge_count):
+        level = LEVELS[i % 3]
+        badges[f"{level}_badge_{i}"] = Badge(f"{level}_badge_{i}", text(3), text(20), level=level,
+                                             skills=[text(2) for _ in range(4)])
+    badge_ids = list(badges)
+    courses = {}
+    for i in range(course_count):
+        course_id = f"course_{i:06d}_{i % 3 + 1}01"
+        courses[course_id] = Course(course_id, text(4), text(25), badges=[badge_ids[i % badge_count]],
+                                    hours=4 + i % 40, topics=[text(2) for _ in range(3)],
+                                    projects=[text(3)])
+    return courses, badges, words
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=100000)
+    parser.add_argument("--badges", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    courses, badges, words = synthetic_catalog(args.courses, args.badges, rng)
+    level_of = {badge_id: badge.level for badge_id, badge in badges.items()}
+
+    started = time.perf_counter()
+    index = SearchIndex(courses, badges, lambda course_id: level_of[courses[course_id].badges[0]],
+                        lambda badge_id: level_of[badge_id])
+    print(f"Indexed {len(index)} documents, {len(index.vocabulary)} terms "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    def typo(word):
+        i = rng.randrange(len(word))
+        return word[:i] + word[i + 1:] if len(word) > 4 else word
+
+    kinds = {
+        "exact": lambda: {"query": rng.choice(words)},
+        "prefix": lambda: {"query": rng.choice(words)[:3]},
+        "typo": lambda: {"query": typo(rng.choice(words))},
+        "two words": lambda: {"query": f"{rng.choice(words)} {rng.choice(words)[:4]}"},
+        "filtered": lambda: {"query": rng.choice(words), "level": rng.choice(LEVELS), "max_hours": 20},
+    }
+    print(f"{'query kind':<12} {'p50 ms':>8} {'p99 ms':>8} {'avg hits':>9}")
+    for kind, make in kinds.items():
+        latencies, hits = [], 0
+        for _ in range(args.queries):
+            params = make()
+            started = time.perf_counter()
+            result = index.search(**params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += result["total"]
+        print(f"{kind:<12} {percentile(latencies, 0.5):8.2f} {percentile(latencies, 0.99):8.2f} "
+              f"{hits / args.queries:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compare the pluggable serializer with the stdlib path the services used before.
+
+Encodes the skill-tree and user-list payloads and decodes a streamed Ollama
+response, printing the mean time per operation for each approach.
+
+Usage:
+    python scripts/bench_serialization.py [--users 10000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.common import serialization
+from src.loader.dataLoader import load_badges, load_courses, load_users
+
+
+def build_payloads(user_count: int):
+    courses = load_courses()
+    badges = load_badges()
+    users = list(load_users().values())
+    skill_tree = {
+        "nodes": [
+            {"id": f"course_{c['id']}", "name": c["title"], "type": "course", "description": c["description"]}
+            for c in courses.values()
+        ] + [
+            {"id": f"badge_{b['id']}", "name": b["title"], "type": "badge", "description": b["description"]}
+            for b in badges.values()
+        ],
+        "links": [
+            {"source": f"course_{p}", "target": f"course_{c['id']}", "type": "prerequisite"}
+            for c in courses.values() for p in c.get("prerequisites", [])
+        ],
+    }
+    user_list = [dict(users[i % len(users)], id=f"user_{i:06d}") for i in range(user_count)]
+    ollama_stream = [
+        json.dumps({"model": "llama3.3", "response": "token ", "done": False}).encode()
+        for _ in range(2000)
+    ]
+    return {"skill_tree": skill_tree, "users": user_list}, ollama_stream
+
+
+def bench(label: str, func, repeat: int):
+    seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"  {label:<28} {seconds * 1000:9.3f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads, ollama_stream = build_payloads(args.users)
+    print(f"Serializer backend: {serialization.BACKEND}")
+
+    for name, payload in payloads.items():
+        print(f"\nEncode {name}:")
+        # jsonify used json.dumps(...) and then encoded the str to bytes
+        baseline = bench("stdlib json.dumps + encode", lambda: json.dumps(payload).encode("utf-8"), args.repeat)
+        fast = bench(f"{serialization.BACKEND} dumps", lambda: serialization.dumps(payload), args.repeat)
+        print(f"  speedup: {baseline / fast:.1f}x")
+
+    print("\nDecode Ollama stream (2000 lines):")
+    baseline = bench("stdlib json.loads", lambda: [json.loads(line) for line in ollama_stream], args.repeat)
+    fast = bench(f"{serialization.BACKEND} loads", lambda: [serialization.loads(line) for line in ollama_stream], args.repeat)
+    print(f"  speedup: {baseline / fast:.1f}x")
+
+    llm_output = json.dumps([
+        {"description": "Path", "courses": [{"id": "c1", "name": "C1", "requiredOrder": 1}] * 5,
+         "badges": ["b1", "b2"], "estimatedTime": "6 months", "milestones": ["m1", "m2", "m3"]}
+    ] * 3).encode()
+    print("\nDecode + validate career paths:")
+    baseline = bench("stdlib json.loads", lambda: json.loads(llm_output), args.repeat * 50)
+    fast = bench("decode_career_paths", lambda: serialization.decode_career_paths(llm_output), args.repeat * 50)
+    print(f"  speedup: {baseline / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
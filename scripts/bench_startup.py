@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Measure backend import time and time-to-ready.
+
+Each measurement runs in a fresh interpreter. "cold" starts without a catalog
+snapshot; "warm" reuses the snapshot written by the cold run. Exits non-zero
+if warm time-to-ready misses the target.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--target-ms 300]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import src.planner.training_planner
+imported = time.perf_counter()
+import src.api.server as server
+assert server.planner, "planner failed to initialize"
+ready = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "ready_ms": (ready - start) * 1000}))
+"""
+
+
+def run_probe(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=PROJECT_ROOT, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = dict(
+        os.environ,
+        PYTHONPATH=PROJECT_ROOT,
+        CATALOG_SNAPSHOT_PATH=os.path.join(workdir, "catalog.pickle"),
+        USER_DB_PATH=os.path.join(workdir, "users.db"),
+    )
+
+    cold = run_probe(env)
+    warm = [run_probe(env) for _ in range(args.runs)]
+
+    warm_import = statistics.median(r["import_ms"] for r in warm)
+    warm_ready = statistics.median(r["ready_ms"] for r in warm)
+    print(f"cold: import {cold['import_ms']:.1f} ms, ready {cold['ready_ms']:.1f} ms")
+    print(f"warm (median of {args.runs}): import {warm_import:.1f} ms, ready {warm_ready:.1f} ms")
+    print(f"target: ready < {args.target_ms:.0f} ms -> {'PASS' if warm_ready < args.target_ms else 'FAIL'}")
+    sys.exit(0 if warm_ready < args.target_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
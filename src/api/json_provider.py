@@ -0,0 +1,22 @@
+from flask.json.provider import DefaultJSONProvider
+
+from src.common import serialization
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by src.common.serialization.
+
+    `jsonify` builds the response body from the encoder's bytes directly
+    instead of going through an intermediate str.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return serialization.dumps_str(obj)
+
+    def loads(self, s, **kwargs):
+        return serialization.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serialization.dumps(obj), mimetype=self.mimetype)
@@ -0,0 +1,124 @@
+import math
+import threading
+from flask import Response, g, jsonify, request
+
+from src.common.profiling import (
+    MemorySnapshots,
+    SlowRequestProfiler,
+    is_admin_request,
+    profile_cpu,
+    top_object_types,
+)
+
+# CPU profiles sample for ?seconds=N, clamped to this range
+MIN_PROFILE_SECONDS = 1
+MAX_PROFILE_SECONDS = 120
+# Rows returned for ?limit=N, clamped to 1..MAX_PROFILE_LIMIT
+MAX_PROFILE_LIMIT = 500
+
+memory_snapshots = MemorySnapshots()
+slow_requests = SlowRequestProfiler()
+_cpu_profile_lock = threading.Lock()
+
+
+def register_profiling_routes(app):
+    """Register admin-only profiling endpoints and the slow-request hooks."""
+
+    def limit_arg() -> int:
+        return min(max(request.args.get('limit', 25, type=int), 1), MAX_PROFILE_LIMIT)
+
+    @app.before_request
+    def _begin_slow_request_profile():
+        if slow_requests.enabled:
+            g.slow_request_key = object()
+            slow_requests.begin(g.slow_request_key, f"{request.method} {request.path}")
+
+    @app.teardown_request
+    def _end_slow_request_profile(exc=None):
+        key = g.pop('slow_request_key', None)
+        if key is not None:
+            slow_requests.end(key)
+
+    @app.route('/api/admin/profile/cpu')
+    def profile_cpu_endpoint():
+        """Sample all threads for ?seconds=N and return collapsed stacks or speedscope JSON."""
+        if not is_admin_request(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+
+        seconds = request.args.get('seconds', 10, type=float)
+        if not math.isfinite(seconds):
+            return jsonify({'error': 'seconds must be a number'}), 400
+        seconds = min(max(seconds, MIN_PROFILE_SECONDS), MAX_PROFILE_SECONDS)
+        output_format = request.args.get('format', 'collapsed')
+        if output_format not in ('collapsed', 'speedscope'):
+            return jsonify({'error': "format must be 'collapsed' or 'speedscope'"}), 400
+        if not _cpu_profile_lock.acquire(blocking=False):
+            return jsonify({'error': 'A CPU profile is already running'}), 409
+
+        try:
+            sampler = profile_cpu(seconds)
+        finally:
+            _cpu_profile_lock.release()
+
+        if output_format == 'speedscope':
+            return jsonify(sampler.to_speedscope(name='backend'))
+        return Response(sampler.to_collapsed(), mimetype='text/plain')
+
+    @app.route('/api/admin/profile/memory/snapshot', methods=['POST'])
+    def memory_snapshot_endpoint():
+        """Take a named tracemalloc snapshot (?label=...)."""
+        if not is_admin_request(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+        label = request.args.get('label', 'baseline')
+        return jsonify(memory_snapshots.take(label))
+
+    @app.route('/api/admin/profile/memory/diff')
+    def memory_diff_endpoint():
+        """Diff snapshot ?from=... against ?to=... or the current heap."""
+        if not is_admin_request(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+        try:
+            diff = memory_snapshots.diff(
+                request.args.get('from', 'baseline'),
+                request.args.get('to'),
+                limit=limit_arg()
+            )
+        except KeyError as e:
+            return jsonify({'error': f'Unknown snapshot: {e}'}), 404
+        return jsonify(diff)
+
+    @app.route('/api/admin/profile/memory/stop', methods=['POST'])
+    def memory_stop_endpoint():
+        """Stop tracemalloc and drop all snapshots."""
+        if not is_admin_request(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+        memory_snapshots.stop()
+        return jsonify({'status': 'stopped'})
+
+    @app.route('/api/admin/profile/objects')
+    def object_types_endpoint():
+        """Report the top live object types by total size."""
+        if not is_admin_request(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+        return jsonify(top_object_types(limit=limit_arg()))
+
+    @app.route('/api/admin/profile/slow-requests', methods=['GET', 'POST', 'DELETE'])
+    def slow_requests_endpoint():
+        """
+        GET returns captured slow-request profiles, POST ?threshold_ms=N enables
+        capture and DELETE disables it.
+        """
+        if not is_admin_request(request.headers):
+            return jsonify({'error': 'Forbidden'}), 403
+
+        if request.method == 'POST':
+            threshold_ms = request.args.get('threshold_ms', type=float)
+            if threshold_ms is None:
+                return jsonify({'error': 'Missing required parameter: threshold_ms'}), 400
+            if not math.isfinite(threshold_ms) or threshold_ms < 0:
+                return jsonify({'error': 'threshold_ms must be a non-negative number'}), 400
+            slow_requests.enable(threshold_ms)
+        elif request.method == 'DELETE':
+            slow_requests.disable()
+
+        return jsonify({**slow_requests.status(), 'profiles': list(slow_requests.profiles)})
@@ -1,17 +1,40 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, g, has_request_context, jsonify, request, stream_with_context
 from flask_cors import CORS
 import sys
 import os
 import json
+import base64
 import asyncio
+import gc
+import math
+import threading
+import time
+from contextlib import nullcontext
 from functools import wraps
 
+from werkzeug.local import LocalProxy
+
 # Add the project root directory to the Python path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
 sys.path.insert(0, project_root)
 
-from src.planner.training_planner import TrainingPlanner
-from src.llm.career_advisor import CareerAdvisor
+from src.api.profiling import register_profiling_routes
+from src.api.json_provider import FastJSONProvider
+from src.common import accounting, serialization
+from src.common.circuit_breaker import MCP_BREAKER_DEFAULTS, breaker_snapshots, get_breaker
+from src.common.memory import process_memory
+from src.common.profiling import is_admin_request
+from src.common.deadline import DEADLINE_HEADER, Deadline, DeadlineExceeded, deadline_stats
+from src.planner.layout import LayoutEngine
+from src.planner.executor import PlannerPool
+from src.planner.schedule import summarize_weeks
+from src.planner.tenants import DEFAULT_TENANT, TenantRegistry
+from src.store.career_path_store import (
+    DEFAULT_CAREER_PREFERENCES,
+    open_career_path_store,
+    profile_data,
+    profile_hash,
+)
 
 # Async wrapper for Flask routes
 def async_route(f):
@@ -21,51 +44,601 @@ def async_route(f):
     return wrapper
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+app.json = FastJSONProvider(app)
+CORS(app, expose_headers=['X-Refine-Session-Id', 'X-Career-Paths-Source', 'X-Career-Prefetch', 'X-Tenant'])  # Enable CORS for all routes
+register_profiling_routes(app)
 
 # Configure for development
 app.config['DEBUG'] = True
 app.config['ENV'] = 'development'
 PORT = 5002  # Changed to 5002 to avoid conflicts with AirPlay and other services
 
+# Budget for LLM-backed requests, kept below nginx's 300 s proxy_read_timeout.
+# Clients may ask for less with the X-Request-Deadline-Ms header.
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_SECONDS', '120'))
+# Batch analyses stream a line per profile, so nginx's read timeout applies between profiles, not to the batch
+BATCH_DEADLINE_SECONDS = float(os.getenv('BATCH_DEADLINE_SECONDS', '1800'))
+# Header in which an authenticating proxy in front of the backend names the signed-in user (e.g. X-Forwarded-User).
+# When set, LLM usage is accounted to that user alone; otherwise to the stored user a request is about.
+AUTH_USER_HEADER = os.getenv('AUTH_USER_HEADER')
+
+def request_deadline() -> Deadline:
+    """The deadline for the current request, set here at the edge and passed downstream."""
+    return Deadline.from_header(
+        request.headers.get(DEADLINE_HEADER), REQUEST_DEADLINE_SECONDS, max_seconds=REQUEST_DEADLINE_SECONDS
+    )
+
+# Each tenant (business unit) has its own catalog, chosen per request by the
+# X-Tenant header or a /t/<tenant>/ path prefix; see src/planner/tenants.py
+TENANT_HEADER = 'X-Tenant'
+TENANT_PATH_PREFIX = '/t/'
+TENANT_ENVIRON_KEY = 'training_planner.tenant'
+
+class TenantPathMiddleware:
+    """Serve /t/<tenant>/api/... as /api/... for that tenant; the prefix moves to SCRIPT_NAME."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(TENANT_PATH_PREFIX):
+            tenant_id, _, rest = path[len(TENANT_PATH_PREFIX):].partition('/')
+            environ[TENANT_ENVIRON_KEY] = tenant_id
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + TENANT_PATH_PREFIX + tenant_id
+            environ['PATH_INFO'] = '/' + rest
+        return self.wsgi_app(environ, start_response)
+
+app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+
 try:
-    planner = TrainingPlanner()
-    career_advisor = CareerAdvisor()
+    tenants = TenantRegistry.from_env()
+    # Load the default catalog now so the service is ready when it starts; others load on first use
+    tenants.get(DEFAULT_TENANT)
 except Exception as e:
     print(f"Error initializing services: {e}")
-    planner = None
-    career_advisor = None
+    tenants = None
+
+# Batch analytics run in worker processes so they do not hold the GIL against other requests.
+# Started before serving so workers fork from a single-threaded process with the default catalog loaded.
+# Workers replacing a broken pool import this module as __mp_main__ when it is the
+# entry point; they must not start a pool of their own.
+planner_pool = PlannerPool.from_env()
+if tenants is not None and __name__ != '__mp_main__':
+    planner_pool.start(preload=[tenants.loaded(DEFAULT_TENANT).planner])
+
+def preload_for_fork():
+    """
+    Get a preloading master (see gunicorn.conf.py) ready to fork workers that share its memory.
+
+    Builds the default catalog's indexes once here instead of in every worker,
+    stops the planner pool (each worker starts its own), and moves every object
+    allocated so far out of the cyclic GC's reach: a collection in a worker
+    would otherwise write to every page holding a Python object, and copy-on-write
+    would then copy them all.
+    """
+    planner_pool.shutdown(wait=True)
+    if tenants is not None:
+        tenant = tenants.loaded(DEFAULT_TENANT)
+        tenant.planner.build_indexes()
+        tenant.progress_tracker.recommender = tenant.planner.recommender
+    gc.collect()
+    gc.freeze()
+
+def after_fork():
+    """Start a forked worker's own planner pool, sharing the master's preloaded catalog."""
+    if tenants is not None:
+        planner_pool.start(preload=[tenants.loaded(DEFAULT_TENANT).planner])
+        # Take in what was recorded since the master built the recommender
+        default_planner = tenants.loaded(DEFAULT_TENANT).planner
+        default_planner.recommender.catch_up(default_planner.user_store, force=True)
+
+def current_tenant():
+    """The tenant serving this request, or the default tenant outside requests."""
+    if has_request_context() and 'tenant' in g:
+        return g.tenant
+    return tenants.loaded(DEFAULT_TENANT) if tenants is not None else None
+
+# The current tenant's planner and progress tracker; falsy when its catalog failed to load
+planner = LocalProxy(lambda: getattr(current_tenant(), 'planner', None))
+progress_tracker = LocalProxy(lambda: getattr(current_tenant(), 'progress_tracker', None))
+
+@app.before_request
+def select_tenant():
+    """Resolve the request's tenant, loading its catalog on first use."""
+    if tenants is None or request.method == 'OPTIONS':
+        return None
+    tenant_id = (request.environ.get(TENANT_ENVIRON_KEY) or request.headers.get(TENANT_HEADER)
+                 or DEFAULT_TENANT)
+    if tenant_id not in tenants:
+        return jsonify({'error': f'Unknown tenant: {tenant_id}'}), 404
+    try:
+        g.tenant = tenants.get(tenant_id)
+    except Exception as e:
+        print(f"Error loading catalog for tenant {tenant_id}: {e}")
+        return jsonify({'error': f'Catalog for tenant {tenant_id} could not be loaded'}), 503
+    return None
+
+@app.before_request
+def tag_llm_usage():
+    """
+    Account the request's LLM calls, here and on the MCP server, to its route, tenant and user.
+
+    The user is the one AUTH_USER_HEADER names; without it, calls are accounted to
+    accounting.UNTRUSTED until account_llm_usage_to() names a stored user.
+    """
+    tenant = g.get('tenant')
+    user = request.headers.get(AUTH_USER_HEADER) if AUTH_USER_HEADER else None
+    accounting.reset_tags({
+        'route': request.url_rule.rule if request.url_rule else request.path,
+        'tenant': tenant.id if tenant is not None else None,
+        'user': user or accounting.UNTRUSTED
+    })
+
+def account_llm_usage_to(user_id):
+    """
+    Account the request's LLM calls to the stored user `user_id`, if there is one.
+
+    Ids the user store does not know are ignored, so a request cannot open a
+    budget under a name of its choosing; with AUTH_USER_HEADER set, the
+    authenticated user is kept whatever the request names.
+    """
+    if AUTH_USER_HEADER or not isinstance(user_id, str) or not planner:
+        return
+    if user_id in planner.user_store:
+        accounting.tag(user=user_id)
+
+@app.after_request
+def tag_tenant(response):
+    """Name the tenant that served the request and evict idle tenants if indexes built during it went over budget."""
+    tenant = g.get('tenant')
+    if tenant is not None:
+        response.headers[TENANT_HEADER] = tenant.id
+        if len(tenants.loaded_tenants()) > 1:
+            tenants.enforce_budget(keep=(tenant.id,))
+    return response
+
+layout_engine = LayoutEngine()
+career_path_store = open_career_path_store()
+
+_career_advisor = None
+
+def get_career_advisor():
+    """Create the MCP-based CareerAdvisor on first use, so aiohttp is not imported at startup."""
+    global _career_advisor
+    if _career_advisor is None:
+        try:
+            from src.llm.career_advisor import CareerAdvisor
+            _career_advisor = CareerAdvisor()
+        except Exception as e:
+            print(f"Error initializing CareerAdvisor: {e}")
+    return _career_advisor
+
+_prefetcher = None
+
+def get_prefetcher():
+    """Create the career-analysis prefetcher on first use, for the same reason as get_career_advisor."""
+    global _prefetcher
+    if _prefetcher is None:
+        try:
+            from src.llm.prefetch import CareerPathPrefetcher
+            _prefetcher = CareerPathPrefetcher.from_env()
+        except Exception as e:
+            print(f"Error initializing career prefetcher: {e}")
+    return _prefetcher
+
+def get_recommender():
+    """The current tenant's course co-occurrence recommender, caught up with progress recorded by any process."""
+    if not planner:
+        return None
+    recommender = progress_tracker.recommender = planner.recommender
+    recommender.catch_up(planner.user_store)
+    return recommender
+
+def warm_recommender(tenant):
+    """Load (or build) a tenant's recommender off the request path and have its progress tracker feed it."""
+    def warm():
+        try:
+            tenant.progress_tracker.recommender = tenant.planner.recommender
+        except Exception as e:
+            print(f"Error loading course recommender for tenant {tenant.id}: {e}")
+    threading.Thread(target=warm, name='recommender-warmup', daemon=True).start()
+
+# A preloading master (gunicorn.conf.py) builds it in preload_for_fork instead, since it must not fork with threads running
+if tenants is not None and os.getenv('BACKEND_PRELOAD') != '1':
+    warm_recommender(tenants.loaded(DEFAULT_TENANT))
+
+def prefetch_career_paths(user) -> str:
+    """Start a background analysis for a user's profile with the default preferences."""
+    user_data = profile_data(user)
+    key = profile_hash(user_data, DEFAULT_CAREER_PREFERENCES)
+    if career_path_store is not None and career_path_store.has(key, planner.catalog_version):
+        return 'precomputed'
+    prefetcher = get_prefetcher()
+    if prefetcher is None:
+        return 'disabled'
+    return prefetcher.prefetch(key, user_data, DEFAULT_CAREER_PREFERENCES)
 
 @app.route('/api/health')
 def health_check():
-    """Health check endpoint for Docker health checks."""
-    return jsonify({'status': 'healthy', 'service': 'ai-training-planner-backend'})
+    """Health check endpoint for Docker health checks; open circuits mark the service degraded."""
+    get_breaker('mcp', **MCP_BREAKER_DEFAULTS)
+    breakers = breaker_snapshots()
+    return jsonify({
+        'status': 'healthy',
+        'service': 'ai-training-planner-backend',
+        'degraded': any(b['state'] != 'closed' for b in breakers.values()),
+        'circuit_breakers': breakers
+    })
+
+# /api/ready is polled by orchestrators, so an unresponsive Ollama must not hold it up
+READY_LLM_TIMEOUT_SECONDS = float(os.getenv('READY_LLM_TIMEOUT_SECONDS', '0.5'))
+
+@app.route('/api/ready')
+def readiness_check():
+    """Catalog readiness and LLM availability, reported separately."""
+    catalog_ready = bool(planner)
+    return jsonify({
+        'ready': catalog_ready,
+        'catalog': {
+            'loaded': catalog_ready,
+            'version': planner.catalog_version if catalog_ready else None,
+            'courses': len(planner.courses) if catalog_ready else 0,
+            'badges': len(planner.badges) if catalog_ready else 0
+        },
+        'llm_available': planner.llm_available(timeout=READY_LLM_TIMEOUT_SECONDS) if catalog_ready else False,
+        'mcp_circuit': get_breaker('mcp', **MCP_BREAKER_DEFAULTS).state
+    }), 200 if catalog_ready else 503
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_PAGE_SIZE = 500
+
+def encode_cursor(user_id: str) -> str:
+    return base64.urlsafe_b64encode(user_id.encode()).decode()
+
+def decode_cursor(cursor: str) -> str:
+    return base64.urlsafe_b64decode(cursor.encode()).decode()
+
+def stream_users(fields, job_title, badge_id, stream_format):
+    """Yield users page by page so memory stays constant regardless of headcount."""
+    if stream_format == 'json':
+        yield b'['
+    first = True
+    after_id = None
+    while True:
+        page = planner.user_store.list_users(
+            after_id=after_id, limit=STREAM_PAGE_SIZE,
+            job_title=job_title, badge_id=badge_id, fields=fields
+        )
+        for user in page:
+            if stream_format == 'ndjson':
+                yield serialization.dumps(user) + b'\n'
+            else:
+                yield (b'' if first else b',') + serialization.dumps(user)
+            first = False
+        if len(page) < STREAM_PAGE_SIZE:
+            break
+        after_id = page[-1]['id']
+    if stream_format == 'json':
+        yield b']'
 
 @app.route('/api/users')
 def get_users():
+    """
+    List users with cursor pagination, field projection and indexed filters.
+
+    Query parameters:
+        limit: Page size (default 100, max 1000)
+        cursor: Opaque cursor from a previous page's `next_cursor`
+        fields: Comma-separated fields to return, e.g. `id,name,job_title`
+        job_title: Only users with this exact job title
+        badge: Only users who completed this badge
+        stream: `ndjson` or `json` to stream every matching user instead of paginating
+    """
     try:
         if not planner:
             return jsonify({'error': 'Training planner not initialized'}), 500
-        
-        users_data = []
-        for user_id, user in planner.users.items():
-            users_data.append({
-                'id': user.id,
-                'name': user.name,
-                'job_title': user.job_title,
-                'description': user.description,
-                'completed_badges': user.completed_badges,
-                'completed_courses': user.completed_courses,
-                'in_progress_courses': user.in_progress_courses
-            })
-        
-        return jsonify(users_data)
+
+        fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+        job_title = request.args.get('job_title')
+        badge_id = request.args.get('badge')
+        stream_format = request.args.get('stream')
+
+        if stream_format:
+            if stream_format not in ('ndjson', 'json'):
+                return jsonify({'error': "stream must be 'ndjson' or 'json'"}), 400
+            # Validate the projection before the response starts streaming
+            planner.user_store.list_users(limit=0, fields=fields)
+            mimetype = 'application/x-ndjson' if stream_format == 'ndjson' else 'application/json'
+            return Response(
+                stream_with_context(stream_users(fields, job_title, badge_id, stream_format)),
+                mimetype=mimetype
+            )
+
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+        cursor = request.args.get('cursor')
+        try:
+            after_id = decode_cursor(cursor) if cursor else None
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        # Fetch one extra row to know whether another page exists
+        users_data = planner.user_store.list_users(
+            after_id=after_id, limit=limit + 1,
+            job_title=job_title, badge_id=badge_id, fields=fields
+        )
+        has_more = len(users_data) > limit
+        users_data = users_data[:limit]
+
+        return jsonify({
+            'users': users_data,
+            'next_cursor': encode_cursor(users_data[-1]['id']) if has_more else None
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error in get_users: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/users/<user_id>')
+def get_user(user_id):
+    """
+    Get one user.
+
+    Opening a profile also starts a speculative background career analysis
+    for it (disable with ?prefetch=false); the outcome is reported in the
+    X-Career-Prefetch header.
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        user = planner.user_store.get_user(user_id)
+        if user is None:
+            return jsonify({'error': f'Unknown user: {user_id}'}), 404
+
+        response = jsonify(user)
+        if request.args.get('prefetch', 'true').lower() != 'false':
+            account_llm_usage_to(user_id)
+            response.headers['X-Career-Prefetch'] = prefetch_career_paths(user)
+        return response
+    except Exception as e:
+        print(f"Error in get_user: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/<user_id>/events', methods=['POST'])
+def post_progress_events(user_id):
+    """
+    Record course progress events and award any badges they complete.
+
+    Accepts a single event `{"type": "course_completed", "course_id": "..."}`,
+    a list of events, or `{"events": [...]}`. Event types are `course_started`
+    and `course_completed`.
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+        if planner.user_store.read_only:
+            return jsonify({'error': 'User store is read-only'}), 503
+
+        data = request.get_json(silent=True)
+        if isinstance(data, dict) and 'events' in data:
+            data = data['events']
+        events = [data] if isinstance(data, dict) else data
+        if not isinstance(events, list) or not events:
+            return jsonify({'error': 'Request body must be an event, a list of events, or {"events": [...]}'}), 400
+
+        try:
+            events = progress_tracker.validate_events(events)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        result = progress_tracker.apply_events(user_id, events)
+        if result is None:
+            return jsonify({'error': f'User {user_id} not found'}), 404
+        return jsonify(result)
+    except Exception as e:
+        print(f"Error in post_progress_events: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/<user_id>/next-courses')
+def get_next_courses(user_id):
+    """Courses the user can start now, read from the materialized per-user list."""
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        next_courses = progress_tracker.next_courses(user_id)
+        if next_courses is None:
+            return jsonify({'error': f'User {user_id} not found'}), 404
+        return jsonify({'user_id': user_id, 'next_courses': next_courses})
+    except Exception as e:
+        print(f"Error in get_next_courses: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/<user_id>/recommendations')
+def get_recommendations(user_id):
+    """
+    "People like you took" next courses: eligible courses most often completed
+    by users who completed the same courses or share the user's job title.
+
+    Query parameters:
+        limit: Number of courses (default 10, max 50)
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        user = planner.user_store.get_user(user_id)
+        if user is None:
+            return jsonify({'error': f'User {user_id} not found'}), 404
+
+        recommendations = get_recommender().recommend(
+            user['completed_courses'],
+            job_title=user.get('job_title'),
+            candidates=progress_tracker.next_courses(user_id),
+            limit=limit
+        )
+        for recommendation in recommendations:
+            course = planner.courses[recommendation['course_id']]
+            recommendation.update({
+                'title': course.name,
+                'level': planner.course_level(course.id),
+                'hours': course.hours,
+                'related_badge': course.related_badge,
+            })
+        return jsonify({'user_id': user_id, 'recommendations': recommendations})
+    except Exception as e:
+        print(f"Error in get_recommendations: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/users/<user_id>/tracks')
+def get_user_tracks(user_id):
+    """
+    Expert badges reachable from the user's badges along the badge progressions,
+    ranked by the course hours still to do, from the precomputed track index.
+
+    Query parameters:
+        limit: Number of expert badges (default 10)
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        limit = max(1, request.args.get('limit', 10, type=int))
+        user = planner.user_store.get_user(user_id)
+        if user is None:
+            return jsonify({'error': f'User {user_id} not found'}), 404
+
+        tracks = planner.track_index.reachable_experts(
+            user['completed_badges'], user['completed_courses'], limit=limit
+        )
+        for track in tracks:
+            track['title'] = planner.badges[track['expert_badge']].name
+        return jsonify({'user_id': user_id, 'tracks': tracks})
+    except Exception as e:
+        print(f"Error in get_user_tracks: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def schedule_options(data):
+    """Validated target badges, weekly hours and concurrency from a schedule request body."""
+    target_badges = data.get('target_badges')
+    if isinstance(target_badges, str):
+        target_badges = [target_badges]
+    if (not isinstance(target_badges, list) or not target_badges
+            or not all(isinstance(badge_id, str) for badge_id in target_badges)):
+        raise ValueError('target_badges must be a non-empty list of badge ids')
+    try:
+        weekly_hours = float(data.get('weekly_hours', 6))
+        max_concurrent = int(data.get('max_concurrent', 2))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('weekly_hours and max_concurrent must be numbers')
+    # NaN and infinity would otherwise reach the scheduler's week arithmetic
+    if not (math.isfinite(weekly_hours) and weekly_hours > 0):
+        raise ValueError('weekly_hours must be a positive number')
+    if max_concurrent < 1:
+        raise ValueError('max_concurrent must be at least 1')
+    return target_badges, weekly_hours, max_concurrent
+
+@app.route('/api/schedule', methods=['POST'])
+def post_schedule():
+    """
+    Week-by-week calendar for earning the target badges within a weekly hours budget.
+
+    Body: `target_badges`, `weekly_hours` (default 6), `max_concurrent` (default 2)
+    and either `user_id` or `completed_courses` / `in_progress_courses`.
+    Set `detail` to false for the summary only.
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        data = request.get_json(silent=True) or {}
+        target_badges, weekly_hours, max_concurrent = schedule_options(data)
+        if data.get('user_id'):
+            user = planner.user_store.get_user(data['user_id'])
+            if user is None:
+                return jsonify({'error': f"User {data['user_id']} not found"}), 404
+        else:
+            user = data
+
+        return jsonify(planner.scheduler.schedule(
+            target_badges,
+            user.get('completed_courses') or [],
+            weekly_hours,
+            max_concurrent,
+            in_progress=user.get('in_progress_courses') or [],
+            detail=data.get('detail', True) is not False
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in post_schedule: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/schedule/batch', methods=['POST'])
+def post_schedule_batch():
+    """
+    Weeks to finish the target badges for many users, for workforce planning.
+
+    Body: `target_badges`, `weekly_hours`, `max_concurrent`, and optionally
+    `user_ids` and/or `job_title` to narrow the population (default: every user).
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        data = request.get_json(silent=True) or {}
+        target_badges, weekly_hours, max_concurrent = schedule_options(data)
+        user_ids = data.get('user_ids')
+        job_title = data.get('job_title')
+        if user_ids is not None:
+            users = planner.user_store.get_users(user_ids).values()
+        else:
+            users = planner.user_store.iter_users()
+        # Only what scheduling needs is sent to the worker
+        users = [
+            {
+                'id': user.get('id'),
+                'completed_courses': user.get('completed_courses') or [],
+                'in_progress_courses': user.get('in_progress_courses') or [],
+            }
+            for user in users
+            if not job_title or user.get('job_title') == job_title
+        ]
+
+        started = time.perf_counter()
+        results = planner_pool.run(
+            planner, 'schedule_many', users, target_badges, weekly_hours, max_concurrent,
+            size=len(users), deadline=request_deadline()
+        )
+        elapsed = time.perf_counter() - started
+        return jsonify({
+            'target_badges': target_badges,
+            'weekly_hours': weekly_hours,
+            'max_concurrent': max_concurrent,
+            'weeks': summarize_weeks([result['weeks'] for result in results]),
+            'users': results,
+            'elapsed_ms': round(elapsed * 1000, 1)
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except DeadlineExceeded as e:
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        print(f"Error in post_schedule_batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/skill-tree-data')
 def get_skill_tree_data():
+    """
+    Skill-tree nodes and links with precomputed layered-layout coordinates.
+
+    Each node carries `x`, `y` and `rank`; links that span several layers
+    carry bend `points`. The layout is computed once per catalog version.
+    """
     try:
         if not planner:
             return jsonify({'error': 'Training planner not initialized'}), 500
@@ -73,71 +646,210 @@ def get_skill_tree_data():
         # Get all nodes and links from the training planner
         nodes = []
         links = []
-        
-        print("Loading badges...")  # Debug print
+
         # Add badge nodes
         for badge_id, badge in planner.badges.items():
             nodes.append({
                 'id': f'badge_{badge_id}',
                 'name': badge.name,
                 'type': 'badge',
-                'level': get_badge_level(badge_id),
+                'level': planner.badge_level(badge_id),
                 'description': badge.description
             })
+
+        # Add course nodes
+        for course_id, course in planner.courses.items():
+            nodes.append({
+                'id': f'course_{course_id}',
+                'name': course.name,
+                'type': 'course',
+                'level': planner.course_level(course_id),
+                'description': course.description
+            })
+
+        # Add links from relationships
+        for course_id, course in planner.courses.items():
+            # Add links from courses to badges
+            for badge_id in course.badges:
+                links.append({
+                    'source': f'course_{course_id}',
+                    'target': f'badge_{badge_id}',
+                    'type': 'contributes'
+                })
+
+            # Add prerequisite links between courses
+            for prereq_id in course.prerequisites:
+                links.append({
+                    'source': f'course_{prereq_id}',
+                    'target': f'course_{course_id}',
+                    'type': 'prerequisite'
+                })
+
+        layout = layout_engine.get_layout(
+            planner.catalog_version,
+            {node['id']: node['level'] for node in nodes},
+            [(link['source'], link['target']) for link in links]
+        )
+        for node in nodes:
+            node.update(layout.node_coordinates(node['id']) or {})
+        for link in links:
+            points = layout.edge_points.get((link['source'], link['target']))
+            if points:
+                link['points'] = [{'x': x, 'y': y} for x, y in points]
+
+        return jsonify({
+            'nodes': nodes,
+            'links': links,
+            'layout': {**layout.to_dict(), 'catalog_version': planner.catalog_version}
+        })
     except Exception as e:
         print(f"Error in get_skill_tree_data: {e}")
         return jsonify({'error': str(e)}), 500
-    
-    # Add course nodes
-    for course_id, course in planner.courses.items():
-        nodes.append({
-            'id': f'course_{course_id}',
-            'name': course.name,
-            'type': 'course',
-            'level': get_course_level(course_id),
-            'description': course.description
+
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+@app.route('/api/search')
+def search_catalog():
+    """
+    BM25 full-text search over courses and badges, with facets.
+
+    Query parameters:
+        q: Search text; the last word matches as a prefix and unknown words
+           match within one typo. Empty lists everything that passes the filters.
+        type: `course` or `badge`
+        level: `basic`, `intermediate` or `expert`
+        min_hours, max_hours: Course hours range
+        badge: Related badge id
+        offset, limit: Page of results (default limit 20, max 100)
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        query = request.args.get('q', '')
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), MAX_SEARCH_PAGE_SIZE))
+        result = planner.search_index.search(
+            query,
+            offset=offset,
+            limit=limit,
+            doc_type=request.args.get('type'),
+            level=request.args.get('level'),
+            min_hours=request.args.get('min_hours', type=float),
+            max_hours=request.args.get('max_hours', type=float),
+            badge=request.args.get('badge')
+        )
+        return jsonify({
+            'query': query,
+            'offset': offset,
+            'limit': limit,
+            'catalog_version': planner.catalog_version,
+            **result
         })
-    
-    # Add links from relationships
-    for course_id, course in planner.courses.items():
-        # Add links from courses to badges
-        for badge_id in course.badges:
-            links.append({
-                'source': f'course_{course_id}',
-                'target': f'badge_{badge_id}',
-                'type': 'contributes'
-            })
-        
-        # Add prerequisite links between courses
-        for prereq_id in course.prerequisites:
-            links.append({
-                'source': f'course_{prereq_id}',
-                'target': f'course_{course_id}',
-                'type': 'prerequisite'
-            })
-    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error in search_catalog: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/courses/<course_id>/similar')
+def get_similar_courses(course_id):
+    """
+    Courses most similar to this one by TF-IDF cosine similarity of their topics, descriptions and projects.
+
+    Query parameters:
+        limit: Number of courses to return (default 10, at most the precomputed k)
+    """
+    try:
+        if not planner:
+            return jsonify({'error': 'Training planner not initialized'}), 500
+
+        limit = max(1, request.args.get('limit', 10, type=int))
+        similar = planner.similar_courses.similar(course_id, limit)
+        if similar is None:
+            return jsonify({'error': f'Unknown course: {course_id}'}), 404
+
+        course = planner.courses[course_id]
+        return jsonify({
+            'course_id': course_id,
+            'catalog_version': planner.catalog_version,
+            'similar': [
+                {
+                    'id': similar_id,
+                    'title': planner.courses[similar_id].name,
+                    'score': round(score, 4),
+                    'level': planner.course_level(similar_id),
+                    'hours': planner.courses[similar_id].hours,
+                    'related_badge': planner.courses[similar_id].related_badge,
+                    'same_badge': bool(course.related_badge) and
+                                  planner.courses[similar_id].related_badge == course.related_badge,
+                }
+                for similar_id, score in similar
+            ]
+        })
+    except Exception as e:
+        print(f"Error in get_similar_courses: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def career_paths_response(analysis, source):
+    """The body stays a plain list of paths; the refine session and source travel in headers."""
+    response = jsonify(analysis['career_paths'])
+    response.headers['X-Career-Paths-Source'] = source
+    if analysis.get('session_id'):
+        response.headers['X-Refine-Session-Id'] = analysis['session_id']
+    return response
+
+@app.route('/api/metrics')
+def metrics():
+    """Deadline outcomes, circuit breakers, tenants, the planner pool and (once used) prefetch and recommender counters."""
+    get_breaker('mcp', **MCP_BREAKER_DEFAULTS)
     return jsonify({
-        'nodes': nodes,
-        'links': links
+        'deadlines': {'default_seconds': REQUEST_DEADLINE_SECONDS, **deadline_stats.snapshot()},
+        'circuit_breakers': breaker_snapshots(),
+        'prefetch': _prefetcher.stats() if _prefetcher else None,
+        'recommender': progress_tracker.recommender.stats() if progress_tracker and progress_tracker.recommender else None,
+        'tenants': tenants.stats() if tenants is not None else None,
+        'planner_pool': planner_pool.stats(),
+        'process': {'pid': os.getpid(), 'gc_frozen_objects': gc.get_freeze_count(), 'memory': process_memory()},
+        'accounting': accounting.get_ledger().stats() if accounting.get_ledger() else None
     })
 
-def get_badge_level(badge_id: str) -> str:
-    if 'basic_' in badge_id:
-        return 'basic'
-    elif 'intermediate_' in badge_id:
-        return 'intermediate'
-    elif 'expert_' in badge_id:
-        return 'expert'
-    return 'basic'
-
-def get_course_level(course_id: str) -> str:
-    if 'basic_' in course_id:
-        return 'basic'
-    elif 'intermediate_' in course_id:
-        return 'intermediate'
-    elif 'expert_' in course_id:
-        return 'expert'
-    return 'basic'
+@app.route('/api/accounting/report')
+def accounting_report():
+    """
+    LLM token usage on one UTC day, for both services: totals and the routes,
+    tenants, users and prompts that used the most. Admin only, as it names users.
+
+    Query parameters:
+        day: YYYY-MM-DD (default: today)
+        top: Rows per breakdown (default 10)
+    """
+    if not is_admin_request(request.headers):
+        return jsonify({'error': 'Forbidden'}), 403
+    ledger = accounting.get_ledger()
+    if ledger is None:
+        return jsonify({'error': 'LLM usage ledger not available'}), 500
+    day = request.args.get('day') or time.strftime('%Y-%m-%d', time.gmtime())
+    try:
+        return jsonify(ledger.daily_report(day, max(1, request.args.get('top', 10, type=int))))
+    except ValueError:
+        return jsonify({'error': 'day must be YYYY-MM-DD'}), 400
+
+@app.route('/api/tenants')
+def list_tenants():
+    """Configured tenants: whether each is loaded, load and eviction counts, and memory by component."""
+    if tenants is None:
+        return jsonify({'error': 'Tenant registry not initialized'}), 500
+    return jsonify(tenants.stats())
+
+@app.route('/api/career/prefetch/stats')
+def prefetch_stats():
+    """Prefetch counters with hit and waste rates."""
+    prefetcher = get_prefetcher()
+    if prefetcher is None:
+        return jsonify({'enabled': False})
+    return jsonify(prefetcher.stats())
 
 @app.route('/api/career/paths', methods=['POST'])
 @async_route
@@ -146,18 +858,45 @@ async def get_career_paths():
         from flask import request
         data = request.get_json()
         user_data = data.get('user_data')
-        career_preferences = data.get('career_preferences')
+        # Without stated preferences the precomputed default analysis applies
+        career_preferences = data.get('career_preferences') or DEFAULT_CAREER_PREFERENCES
 
-        if not user_data or not career_preferences:
+        if not user_data:
             return jsonify({
-                'error': 'Missing required fields: user_data and career_preferences'
+                'error': 'Missing required field: user_data'
             }), 400
 
+        key = profile_hash(user_data, career_preferences)
+        deadline = request_deadline()
+        account_llm_usage_to(user_data.get('id'))
+
+        # Serve the analysis precomputed by the batch job when this profile has one
+        if career_path_store is not None and planner:
+            stored = career_path_store.get(key, planner.catalog_version)
+            if stored is not None:
+                response = jsonify(stored)
+                response.headers['X-Career-Paths-Source'] = 'precomputed'
+                return response
+
+        # Attach to a speculative prefetch for the same inputs, finished or still running
+        prefetcher = get_prefetcher()
+        future = prefetcher.claim(key) if prefetcher else None
+        if future is not None:
+            try:
+                # Shielded so giving up on the wait does not cancel the prefetch itself
+                analysis = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                                  deadline.remaining())
+                return career_paths_response(analysis, 'prefetch')
+            except Exception as e:
+                print(f"Prefetched career analysis failed, generating live: {e}")
+
         # Use the MCP-based CareerAdvisor
+        career_advisor = get_career_advisor()
         if career_advisor:
             try:
-                career_paths = await career_advisor.get_career_paths(user_data, career_preferences)
-                return jsonify(career_paths)
+                with prefetcher.interactive(key) if prefetcher else nullcontext():
+                    analysis = await career_advisor.analyze(user_data, career_preferences, deadline=deadline)
+                return career_paths_response(analysis, 'live')
             except Exception as e:
                 print(f"Error calling MCP CareerAdvisor: {e}")
                 # Fall through to sample data
@@ -261,6 +1000,83 @@ async def get_career_paths():
         print(f"Error in get_career_paths: {e}")
         return jsonify({'error': str(e)}), 500
 
+def stream_batch_analysis(lines, loop):
+    """Yield NDJSON from an async generator of batch results, driving it on its own event loop."""
+    try:
+        while True:
+            try:
+                line = loop.run_until_complete(lines.__anext__())
+            except StopAsyncIteration:
+                break
+            yield serialization.dumps(line) + b'\n'
+    except Exception as e:
+        # The status line has been sent already, so the failure is reported in the stream
+        print(f"Error streaming batch career analysis: {e}")
+        yield serialization.dumps({'error': str(e)}) + b'\n'
+    finally:
+        loop.run_until_complete(lines.aclose())
+        loop.close()
+
+@app.route('/api/career/analyze:batch', methods=['POST'])
+def analyze_career_batch():
+    """
+    Career analyses for many profiles, streamed as NDJSON as each finishes.
+
+    The body holds either `profiles` (each with `user_data` and optionally
+    `career_preferences` and an `id`) or `user_ids` to analyze stored users,
+    plus `career_preferences` for profiles without their own and
+    `allow_fallback`. Each profile gets one line with its `index` and a
+    `status` of `ok`, `invalid` or `failed`; the stream ends with a `summary`
+    line, or an `error` line if the batch was cut short.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        profiles = data.get('profiles')
+        user_ids = data.get('user_ids')
+        if user_ids:
+            if not planner:
+                return jsonify({'error': 'Training planner not initialized'}), 500
+            users = {user_id: planner.user_store.get_user(user_id) for user_id in user_ids}
+            missing = [user_id for user_id, user in users.items() if user is None]
+            if missing:
+                return jsonify({'error': f'Unknown users: {", ".join(missing[:20])}'}), 404
+            profiles = [{'id': user_id, 'user_data': profile_data(users[user_id])} for user_id in user_ids]
+        if not isinstance(profiles, list) or not profiles:
+            return jsonify({'error': 'Missing required field: profiles or user_ids'}), 400
+
+        from src.llm.mcp_client import MCPClient
+
+        async def batch_lines(client):
+            async with client:
+                async for line in client.analyze_batch(
+                    profiles, data.get('career_preferences') or DEFAULT_CAREER_PREFERENCES,
+                    allow_fallback=bool(data.get('allow_fallback', False)), deadline=deadline
+                ):
+                    yield line
+
+        deadline = Deadline.from_header(
+            request.headers.get(DEADLINE_HEADER), BATCH_DEADLINE_SECONDS, max_seconds=BATCH_DEADLINE_SECONDS
+        )
+        lines = batch_lines(MCPClient())
+        loop = asyncio.new_event_loop()
+        # Wait for the first result here, so an unreachable MCP server is still a plain error response
+        try:
+            first = loop.run_until_complete(lines.__anext__())
+        except Exception as e:
+            loop.run_until_complete(lines.aclose())
+            loop.close()
+            print(f"Error calling MCP batch career analysis: {e}")
+            return jsonify({'error': f'Career analysis unavailable: {e}'}), 503
+
+        def stream():
+            yield serialization.dumps(first) + b'\n'
+            yield from stream_batch_analysis(lines, loop)
+
+        return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
+    except Exception as e:
+        print(f"Error in analyze_career_batch: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/career/refine', methods=['POST'])
 @async_route
 async def refine_career_path():
@@ -275,11 +1091,19 @@ async def refine_career_path():
             return jsonify({
                 'error': 'Missing required fields: user_data, selected_path, and user_feedback'
             }), 400
+        account_llm_usage_to(user_data.get('id'))
 
         # Use the MCP-based CareerAdvisor
+        career_advisor = get_career_advisor()
         if career_advisor:
             try:
-                refined_path = await career_advisor.refine_path(user_data, selected_path, user_feedback)
+                prefetcher = get_prefetcher()
+                with prefetcher.interactive() if prefetcher else nullcontext():
+                    refined_path = await career_advisor.refine_path(
+                        user_data, selected_path, user_feedback,
+                        session_id=data.get('session_id'),
+                        deadline=request_deadline()
+                    )
                 return jsonify(refined_path)
             except Exception as e:
                 print(f"Error calling MCP CareerAdvisor refine_path: {e}")
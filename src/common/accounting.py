@@ -0,0 +1,421 @@
+"""
+Token accounting for LLM calls.
+
+Every Ollama generation records its prompt and generated token counts and
+the GPU time it took (model load, prompt evaluation and generation, as
+Ollama reports them), tagged with the route, user and tenant it was made
+for, in an append-only SQLite ledger shared by the backend and the MCP
+server. Tags travel with the work in a context variable, and between the
+services in X-LLM-* headers. The MCP server honours those headers only from
+callers that also send LLM_SERVICE_TOKEN; everyone else's calls are
+accounted to the UNTRUSTED user and tenant.
+
+The ledger also enforces rolling token budgets per user and per tenant
+(LLM_USER_TOKEN_BUDGET and LLM_TENANT_TOKEN_BUDGET over the last
+LLM_BUDGET_WINDOW_HOURS); callers over budget get cached or fallback answers
+instead of new generations. Daily reports aggregate usage by route, tenant,
+user and prompt:
+
+    python -m src.common.accounting report [--day 2026-10-18]
+    python -m src.common.accounting prune --days 90
+"""
+
+import argparse
+import calendar
+import contextvars
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Mapping, Optional
+
+from src.common import serialization
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "llm_usage.db"
+)
+# Budget lookups are reused for this long; calls recorded in this process update them in between
+BUDGET_CACHE_SECONDS = 5.0
+
+# Tags forwarded from the backend to the MCP server
+ROUTE_HEADER = "X-LLM-Route"
+USER_HEADER = "X-LLM-User"
+TENANT_HEADER = "X-LLM-Tenant"
+TAG_HEADERS = {"route": ROUTE_HEADER, "user": USER_HEADER, "tenant": TENANT_HEADER}
+# Shared secret (LLM_SERVICE_TOKEN) by which the MCP server knows the tag headers come from the backend
+SERVICE_TOKEN_HEADER = "X-LLM-Service-Token"
+# User and tenant of the calls made for callers whose tag headers are not trusted
+UNTRUSTED = "untrusted"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS calls (
+    ts REAL NOT NULL,
+    route INTEGER,
+    user INTEGER,
+    tenant INTEGER,
+    model INTEGER,
+    prompt INTEGER,
+    prompt_tokens INTEGER NOT NULL,
+    eval_tokens INTEGER NOT NULL,
+    gpu_ms INTEGER NOT NULL,
+    total_ms INTEGER NOT NULL,
+    abandoned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS calls_ts ON calls (ts);
+CREATE INDEX IF NOT EXISTS calls_user ON calls (user, ts);
+CREATE INDEX IF NOT EXISTS calls_tenant ON calls (tenant, ts);
+"""
+
+INSERT_CALL = """
+INSERT INTO calls (ts, route, user, tenant, model, prompt, prompt_tokens, eval_tokens, gpu_ms, total_ms, abandoned)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+TOTALS = """
+SELECT COUNT(*), COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(eval_tokens), 0),
+       COALESCE(SUM(gpu_ms), 0) / 1000.0, COALESCE(SUM(abandoned), 0),
+       COALESCE(SUM(CASE WHEN abandoned THEN eval_tokens ELSE 0 END), 0)
+FROM calls WHERE ts >= ? AND ts < ?
+"""
+# Grouped usage over a time range; {column} is one of the tag columns
+GROUPED = """
+SELECT labels.label, COUNT(*), SUM(prompt_tokens), SUM(eval_tokens), SUM(gpu_ms) / 1000.0
+FROM calls LEFT JOIN labels ON labels.id = calls.{column}
+WHERE ts >= ? AND ts < ?
+GROUP BY calls.{column} ORDER BY SUM(prompt_tokens + eval_tokens) DESC LIMIT ?
+"""
+TOP_PROMPTS = """
+SELECT prompt, labels.label, COUNT(*), SUM(prompt_tokens), SUM(eval_tokens), SUM(gpu_ms) / 1000.0
+FROM calls LEFT JOIN labels ON labels.id = calls.route
+WHERE ts >= ? AND ts < ? AND prompt IS NOT NULL
+GROUP BY prompt, calls.route ORDER BY SUM(prompt_tokens + eval_tokens) DESC LIMIT ?
+"""
+
+_tags: contextvars.ContextVar = contextvars.ContextVar("llm_accounting_tags", default={})
+
+
+class BudgetExceeded(Exception):
+    """Raised instead of starting a generation for a user or tenant over its token budget."""
+
+
+def tag(**tags: Optional[str]) -> contextvars.Token:
+    """Add tags (route, user, tenant) to the calls made from the current context; None leaves a tag as it is."""
+    current = _tags.get()
+    return _tags.set({**current, **{name: str(value) for name, value in tags.items() if value is not None}})
+
+
+def reset_tags(tags: Optional[Mapping[str, str]] = None) -> contextvars.Token:
+    """Replace the current context's tags, e.g. at the start of a request."""
+    return _tags.set({name: str(value) for name, value in (tags or {}).items() if value is not None})
+
+
+def restore_tags(token: contextvars.Token):
+    """Undo the tag() or reset_tags() call that returned `token`."""
+    _tags.reset(token)
+
+
+def current_tags() -> Dict[str, str]:
+    return dict(_tags.get())
+
+
+def tag_headers() -> Dict[str, str]:
+    """The current tags as headers for a call to another service."""
+    tags = _tags.get()
+    headers = {header: tags[name] for name, header in TAG_HEADERS.items() if tags.get(name)}
+    token = os.getenv("LLM_SERVICE_TOKEN")
+    if token:
+        headers[SERVICE_TOKEN_HEADER] = token
+    return headers
+
+
+def trusted_caller(headers: Mapping[str, str]) -> bool:
+    """
+    Check the service token header against the LLM_SERVICE_TOKEN environment variable.
+
+    No caller is trusted when LLM_SERVICE_TOKEN is not set.
+    """
+    expected = os.getenv("LLM_SERVICE_TOKEN")
+    if not expected:
+        return False
+    provided = headers.get(SERVICE_TOKEN_HEADER, "")
+    return hmac.compare_digest(provided.encode(), expected.encode())
+
+
+def tags_from_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    """The tags a trusted caller forwarded; an untrusted caller's calls go to the UNTRUSTED user and tenant."""
+    if not trusted_caller(headers):
+        return {"user": UNTRUSTED, "tenant": UNTRUSTED}
+    return {name: headers[header] for name, header in TAG_HEADERS.items() if headers.get(header)}
+
+
+def check_service_token():
+    """
+    Refuse per-user or per-tenant budgets in a service that takes its tags from headers without LLM_SERVICE_TOKEN.
+
+    Every call would be accounted to UNTRUSTED, so the budget would be one
+    shared by everyone, which a single heavy user could use up.
+
+    Raises:
+        RuntimeError: If a budget is set but LLM_SERVICE_TOKEN is not
+    """
+    budgets = [name for name in ("LLM_USER_TOKEN_BUDGET", "LLM_TENANT_TOKEN_BUDGET") if int(os.getenv(name, "0"))]
+    if budgets and not os.getenv("LLM_SERVICE_TOKEN"):
+        raise RuntimeError(
+            f"{' and '.join(budgets)} set without LLM_SERVICE_TOKEN; every call would be accounted to "
+            f"the shared {UNTRUSTED!r} user and tenant"
+        )
+
+
+def prompt_fingerprint(prompt: str) -> int:
+    """A 60-bit hash of a prompt, so reports can group calls by prompt without storing it."""
+    return int(hashlib.sha256(prompt.encode()).hexdigest()[:15], 16)
+
+
+def _day_bounds(day: str):
+    start = calendar.timegm(datetime.date.fromisoformat(day).timetuple())
+    return start, start + 86400
+
+
+class TokenLedger:
+    """
+    Append-only record of LLM calls, with rolling budgets over it.
+
+    Thread-safe; every process opens its own ledger on the shared file.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, user_budget: int = 0, tenant_budget: int = 0,
+                 window_seconds: float = 86400.0, busy_timeout: float = 1.0):
+        """
+        Args:
+            db_path: SQLite file shared by every process that records calls
+            user_budget: Tokens (prompt and generated) a user may use per window; 0 for no limit
+            tenant_budget: The same for a tenant
+            window_seconds: Length of the rolling budget window
+            busy_timeout: Seconds to wait for another process's write
+        """
+        self.db_path = db_path
+        self.budgets = {"user": user_budget, "tenant": tenant_budget}
+        self.window_seconds = window_seconds
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._labels: Dict[str, int] = {}
+        # (kind, label) -> [tokens used in the window, when that was read]
+        self._usage: Dict[tuple, list] = {}
+        self._counters = {"recorded": 0, "errors": 0, "over_budget_user": 0, "over_budget_tenant": 0}
+
+    @classmethod
+    def from_env(cls, db_path: Optional[str] = None) -> "TokenLedger":
+        return cls(
+            db_path=db_path or os.getenv("LLM_USAGE_DB_PATH", DEFAULT_DB_PATH),
+            user_budget=int(os.getenv("LLM_USER_TOKEN_BUDGET", "0")),
+            tenant_budget=int(os.getenv("LLM_TENANT_TOKEN_BUDGET", "0")),
+            window_seconds=float(os.getenv("LLM_BUDGET_WINDOW_HOURS", "24")) * 3600,
+        )
+
+    def _label_id(self, label: Optional[str]) -> Optional[int]:
+        """Called with the lock held."""
+        if not label:
+            return None
+        label_id = self._labels.get(label)
+        if label_id is None:
+            self._conn.execute("INSERT OR IGNORE INTO labels (label) VALUES (?)", (label,))
+            label_id = self._conn.execute("SELECT id FROM labels WHERE label = ?", (label,)).fetchone()[0]
+            self._labels[label] = label_id
+        return label_id
+
+    def record(self, final: Dict, model: str, prompt: Optional[int] = None, abandoned: bool = False,
+               tags: Optional[Mapping[str, str]] = None):
+        """
+        Record one call from Ollama's final response chunk.
+
+        Args:
+            final: The chunk with prompt_eval_count, eval_count and the *_duration
+                fields (nanoseconds); for an abandoned stream, what is known of them
+            model: The model that served the call
+            prompt: The prompt's prompt_fingerprint, for per-prompt reports
+            abandoned: Whether the caller stopped the generation before it finished
+            tags: route, user and tenant; the current context's tags by default
+        """
+        tags = current_tags() if tags is None else tags
+        prompt_tokens = int(final.get("prompt_eval_count") or 0)
+        eval_tokens = int(final.get("eval_count") or 0)
+        gpu_ns = sum(int(final.get(field) or 0) for field in ("load_duration", "prompt_eval_duration", "eval_duration"))
+        total_ns = int(final.get("total_duration") or 0) or gpu_ns
+        try:
+            with self._lock:
+                self._conn.execute(INSERT_CALL, (
+                    time.time(), self._label_id(tags.get("route")), self._label_id(tags.get("user")),
+                    self._label_id(tags.get("tenant")), self._label_id(model), prompt,
+                    prompt_tokens, eval_tokens, gpu_ns // 1_000_000, total_ns // 1_000_000, int(abandoned)
+                ))
+                self._counters["recorded"] += 1
+                for kind in ("user", "tenant"):
+                    usage = self._usage.get((kind, tags.get(kind)))
+                    if usage is not None:
+                        usage[0] += prompt_tokens + eval_tokens
+        except sqlite3.Error as e:
+            # Accounting must never fail the call it accounts for
+            with self._lock:
+                self._counters["errors"] += 1
+            logger.warning(f"Could not record LLM usage: {e}")
+
+    def used(self, kind: str, label: str) -> int:
+        """Tokens `label` (a user or tenant, by `kind`) used in the current budget window."""
+        now = time.monotonic()
+        with self._lock:
+            usage = self._usage.get((kind, label))
+            if usage is not None and now - usage[1] < BUDGET_CACHE_SECONDS:
+                return usage[0]
+            row = self._conn.execute("SELECT id FROM labels WHERE label = ?", (label,)).fetchone()
+            tokens = self._conn.execute(
+                f"SELECT COALESCE(SUM(prompt_tokens + eval_tokens), 0) FROM calls WHERE {kind} = ? AND ts >= ?",
+                (row[0], time.time() - self.window_seconds)
+            ).fetchone()[0] if row else 0
+            self._usage[(kind, label)] = [tokens, now]
+            return tokens
+
+    def over_budget(self, tags: Optional[Mapping[str, str]] = None) -> Optional[str]:
+        """
+        Which budget ("user" or "tenant") the tagged caller has used up, if any.
+
+        Counted, so callers should check once per call they would otherwise make.
+        """
+        tags = current_tags() if tags is None else tags
+        for kind in ("user", "tenant"):
+            budget, label = self.budgets[kind], tags.get(kind)
+            if not budget or not label:
+                continue
+            try:
+                if self.used(kind, label) >= budget:
+                    with self._lock:
+                        self._counters[f"over_budget_{kind}"] += 1
+                    return kind
+            except sqlite3.Error as e:
+                logger.warning(f"Could not check LLM budget: {e}")
+        return None
+
+    def check_budget(self, tags: Optional[Mapping[str, str]] = None):
+        """Raise BudgetExceeded if the tagged caller is over a budget."""
+        kind = self.over_budget(tags)
+        if kind:
+            tags = current_tags() if tags is None else tags
+            raise BudgetExceeded(f"LLM token budget exceeded for {kind} {tags.get(kind)}")
+
+    def daily_report(self, day: str, top: int = 10) -> Dict:
+        """Usage on a UTC day (YYYY-MM-DD): totals, and the routes, tenants, users and prompts that used the most."""
+        start, end = _day_bounds(day)
+
+        def grouped(column: str) -> List[Dict]:
+            rows = self._conn.execute(GROUPED.format(column=column), (start, end, top)).fetchall()
+            return [
+                {column: label, "calls": calls, "prompt_tokens": prompt_tokens, "eval_tokens": eval_tokens,
+                 "gpu_seconds": round(gpu_seconds, 1)}
+                for label, calls, prompt_tokens, eval_tokens, gpu_seconds in rows
+            ]
+
+        with self._lock:
+            calls, prompt_tokens, eval_tokens, gpu_seconds, abandoned, abandoned_tokens = \
+                self._conn.execute(TOTALS, (start, end)).fetchone()
+            report = {
+                "day": day,
+                "calls": calls,
+                "prompt_tokens": prompt_tokens,
+                "eval_tokens": eval_tokens,
+                "gpu_seconds": round(gpu_seconds, 1),
+                "abandoned_calls": abandoned,
+                "abandoned_eval_tokens": abandoned_tokens,
+                "by_route": grouped("route"),
+                "by_tenant": grouped("tenant"),
+                "top_users": grouped("user"),
+                "by_model": grouped("model"),
+                "top_prompts": [
+                    {"prompt": f"{prompt:015x}", "route": route, "calls": calls, "prompt_tokens": prompt_tokens,
+                     "eval_tokens": eval_tokens, "gpu_seconds": round(gpu_seconds, 1)}
+                    for prompt, route, calls, prompt_tokens, eval_tokens, gpu_seconds
+                    in self._conn.execute(TOP_PROMPTS, (start, end, top)).fetchall()
+                ],
+            }
+        return report
+
+    def prune(self, days: float) -> int:
+        """Drop calls older than `days`; the ledger is otherwise only appended to."""
+        with self._lock:
+            return self._conn.execute("DELETE FROM calls WHERE ts < ?", (time.time() - days * 86400,)).rowcount
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "user_budget": self.budgets["user"],
+            "tenant_budget": self.budgets["tenant"],
+            "window_hours": self.window_seconds / 3600,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_ledger: Optional[TokenLedger] = None
+_ledger_opened = False
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Optional[TokenLedger]:
+    """This process's ledger, opened on first use; None (calls go unrecorded) if it cannot be opened."""
+    global _ledger, _ledger_opened
+    if not _ledger_opened:
+        with _ledger_lock:
+            if not _ledger_opened:
+                try:
+                    _ledger = TokenLedger.from_env()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not open the LLM usage ledger ({e}); calls will not be recorded")
+                _ledger_opened = True
+    return _ledger
+
+
+def _forget_ledger():
+    # A forked child opens its own connection rather than share the parent's
+    global _ledger, _ledger_opened, _ledger_lock
+    _ledger, _ledger_opened, _ledger_lock = None, False, threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_ledger)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM token usage reports")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", help="Usage on one UTC day")
+    report.add_argument("--day", default=(datetime.datetime.now(datetime.timezone.utc).date() - datetime.timedelta(days=1)).isoformat(),
+                        help="YYYY-MM-DD (default: yesterday)")
+    report.add_argument("--top", type=int, default=10, help="Rows per breakdown")
+    prune = commands.add_parser("prune", help="Drop old calls")
+    prune.add_argument("--days", type=float, default=90, help="Keep calls from this many days")
+    args = parser.parse_args()
+
+    ledger = TokenLedger.from_env()
+    if args.command == "report":
+        print(serialization.dumps_str(ledger.daily_report(args.day, args.top)))
+    else:
+        print(f"Removed {ledger.prune(args.days)} calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Circuit breaker for calls to slow or unreliable dependencies (MCP server, Ollama).
+
+The breaker keeps a rolling window of recent calls. When enough of them fail,
+or take longer than the slow-call threshold, it opens and callers fail fast
+instead of waiting for a timeout. After `open_seconds` it lets a limited number
+of probe calls through (half-open); if they succeed it closes again, and if
+any fails it reopens.
+
+Breakers are registered by name so health endpoints can report every breaker
+without importing the clients that use them.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a rolling time window.
+
+    Args:
+        name: Name reported in health output and errors
+        failure_rate: Fraction of failed calls in the window that opens the circuit
+        slow_call_seconds: Calls slower than this count as slow
+        slow_call_rate: Fraction of slow calls in the window that opens the circuit
+        window_seconds: Only calls this recent are considered
+        window_size: At most this many recent calls are considered
+        min_calls: Calls needed in the window before the rates are evaluated
+        open_seconds: How long the circuit stays open before probing
+        half_open_calls: Probe calls allowed (and successes needed to close) when half-open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        slow_call_rate: float = 0.8,
+        window_seconds: float = 60.0,
+        window_size: int = 50,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self._calls: deque = deque(maxlen=window_size)  # (timestamp, failed, slow)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._transitions: deque = deque(maxlen=20)
+        self._counters = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, **defaults) -> "CircuitBreaker":
+        """
+        Build a breaker whose thresholds can be overridden with PREFIX_* environment variables.
+
+        Keyword arguments replace the constructor defaults for settings not set in the environment.
+        """
+        def env(key, default, cast=float):
+            return cast(os.getenv(f"{prefix}_{key.upper()}", defaults.get(key, default)))
+
+        return cls(
+            name,
+            failure_rate=env("failure_rate", 0.5),
+            slow_call_seconds=env("slow_call_seconds", 30.0),
+            slow_call_rate=env("slow_call_rate", 0.8),
+            window_seconds=env("window_seconds", 60.0),
+            window_size=env("window_size", 50, int),
+            min_calls=env("min_calls", 5, int),
+            open_seconds=env("open_seconds", 30.0),
+            half_open_calls=env("half_open_calls", 1, int),
+        )
+
+    # -- state machine ----------------------------------------------------
+
+    def _transition(self, state: str, now: float, reason: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = now
+        if state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._calls.clear()
+        self._transitions.append({"at": time.time(), "from": previous, "to": state, "reason": reason})
+        print(f"Circuit '{self.name}' {previous} -> {state}: {reason}")
+
+    def _retry_after(self, now: float) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - now)
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead now.
+
+        A True result while half-open reserves a probe slot, so every allowed
+        call must be followed by record_success, record_failure or release.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and self._retry_after(now) == 0:
+                self._transition(HALF_OPEN, now, f"probing after {self.open_seconds:.0f}s open")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_calls:
+                self._probes_in_flight += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def would_reject(self) -> bool:
+        """
+        Whether allow() would refuse a call right now, without reserving a probe slot.
+
+        Callers use this to skip work before even preparing a call, so a True
+        result is counted as a rejection.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                rejected = self._retry_after(time.monotonic()) > 0
+            else:
+                rejected = self.state == HALF_OPEN and self._probes_in_flight >= self.half_open_calls
+            self._counters["rejected"] += int(rejected)
+            return rejected
+
+    def check(self):
+        """allow(), raising CircuitOpenError when the call is refused."""
+        if not self.allow():
+            with self._lock:
+                retry_after = self._retry_after(time.monotonic()) if self.state == OPEN else 0.0
+            raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self, latency: float):
+        self._record(failed=False, slow=latency >= self.slow_call_seconds,
+                     reason=f"slow call ({latency:.1f}s)")
+
+    def record_failure(self, latency: float = 0.0):
+        self._record(failed=True, slow=latency >= self.slow_call_seconds, reason="call failed")
+
+    def release(self):
+        """Give back a half-open probe slot for a call that was abandoned without a result."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes_in_flight:
+                self._probes_in_flight -= 1
+
+    def _record(self, failed: bool, slow: bool, reason: str):
+        now = time.monotonic()
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["failures"] += int(failed)
+            self._counters["slow_calls"] += int(slow)
+
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._transition(OPEN, now, f"probe failed: {reason}")
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._transition(CLOSED, now, "probes succeeded")
+                return
+            if self.state == OPEN:
+                # A call that started before the circuit opened
+                return
+
+            self._calls.append((now, failed, slow))
+            while self._calls and now - self._calls[0][0] > self.window_seconds:
+                self._calls.popleft()
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failure_rate = sum(1 for _, f, _ in self._calls if f) / total
+            slow_rate = sum(1 for _, _, s in self._calls if s) / total
+            if failure_rate >= self.failure_rate:
+                self._transition(OPEN, now, f"failure rate {failure_rate:.0%} over {total} calls")
+            elif slow_rate >= self.slow_call_rate:
+                self._transition(OPEN, now, f"slow call rate {slow_rate:.0%} over {total} calls")
+
+    # -- reporting --------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            recent = [call for call in self._calls if now - call[0] <= self.window_seconds]
+            total = len(recent)
+            return {
+                "state": self.state,
+                "retry_after": round(self._retry_after(now), 1) if self.state == OPEN else None,
+                "window": {
+                    "calls": total,
+                    "failure_rate": sum(1 for _, f, _ in recent if f) / total if total else 0.0,
+                    "slow_call_rate": sum(1 for _, _, s in recent if s) / total if total else 0.0,
+                },
+                **self._counters,
+                "transitions": list(self._transitions),
+            }
+
+
+# A 70B generation routinely takes tens of seconds, so only calls close to
+# the 60 s request timeouts count as slow
+MCP_BREAKER_DEFAULTS = {"slow_call_seconds": 50.0}
+OLLAMA_BREAKER_DEFAULTS = {"slow_call_seconds": 55.0}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, prefix: Optional[str] = None, **defaults) -> CircuitBreaker:
+    """
+    Return the process-wide breaker for `name`, creating it from the environment on first use.
+
+    Settings come from `{NAME}_BREAKER_*` variables (or `{prefix}_*`), then `defaults`.
+    """
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker.from_env(name, prefix or f"{name.upper()}_BREAKER", **defaults)
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_snapshots() -> Dict[str, Dict]:
+    with _registry_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,105 @@
+"""
+Request deadlines propagated from the Flask edge down to Ollama.
+
+A deadline travels between services as the remaining budget in milliseconds
+(the X-Request-Deadline-Ms header) rather than an absolute time, so hosts
+with skewed clocks still agree on it. Every hop turns the header back into a
+local monotonic deadline, sizes its own timeouts from what is left, and stops
+work the moment the deadline passes or its caller goes away.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+DEADLINE = "deadline"
+DISCONNECT = "disconnect"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is abandoned because its deadline passed or its caller left."""
+
+    def __init__(self, reason: str = DEADLINE):
+        super().__init__("Client disconnected" if reason == DISCONNECT else "Request deadline exceeded")
+        self.reason = reason
+
+
+class Deadline:
+    """
+    A point in (monotonic) time by which a request must be answered.
+
+    Args:
+        expires_at: time.monotonic() value at which the deadline passes
+        client_gone: Optional callable returning True once the caller has
+            disconnected, so work can stop before the deadline itself
+    """
+
+    def __init__(self, expires_at: float, client_gone: Optional[Callable[[], bool]] = None):
+        self.expires_at = expires_at
+        self.client_gone = client_gone
+
+    @classmethod
+    def after(cls, seconds: float, client_gone: Optional[Callable[[], bool]] = None) -> "Deadline":
+        return cls(time.monotonic() + seconds, client_gone)
+
+    @classmethod
+    def from_header(cls, value: Optional[str], default_seconds: float,
+                    max_seconds: Optional[float] = None,
+                    client_gone: Optional[Callable[[], bool]] = None) -> "Deadline":
+        """
+        Build a deadline from a DEADLINE_HEADER value, or `default_seconds` if it is missing or invalid.
+
+        `max_seconds` caps what callers may ask for.
+        """
+        seconds = default_seconds
+        if value:
+            try:
+                requested = float(value) / 1000
+            except ValueError:
+                requested = math.nan
+            # inf or nan would overflow every timeout sized from the deadline
+            if math.isfinite(requested):
+                seconds = max(0.0, requested)
+        if max_seconds is not None:
+            seconds = min(seconds, max_seconds)
+        return cls.after(seconds, client_gone)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def abandon_reason(self) -> Optional[str]:
+        """DEADLINE or DISCONNECT if the work should stop now, otherwise None."""
+        if self.expired():
+            return DEADLINE
+        if self.client_gone is not None and self.client_gone():
+            return DISCONNECT
+        return None
+
+    def header_value(self) -> str:
+        return str(int(self.remaining() * 1000))
+
+
+class DeadlineStats:
+    """Thread-safe counters of deadline outcomes for a service's metrics output."""
+
+    def __init__(self):
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+
+# One set of counters per process
+deadline_stats = DeadlineStats()
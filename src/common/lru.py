@@ -0,0 +1,115 @@
+"""Small thread-safe LRU cache with per-entry time-to-live."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+
+class TTLCache:
+    """
+    Bounded mapping that evicts the least recently used entry when full and
+    treats entries older than `ttl` seconds as missing.
+
+    Expired entries are dropped lazily on access and when inserting, or
+    eagerly with `purge_expired()`. If given, `on_evict(key, value)` is called
+    (outside the lock) for every entry dropped by expiry or size, but not for
+    `pop`, `clear` or overwrites.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _notify(self, evicted: List[tuple]):
+        if self.on_evict is not None:
+            for key, value in evicted:
+                self.on_evict(key, value)
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, stored_at = item
+            if not self._expired(stored_at, now):
+                self._data.move_to_end(key)
+                return value
+            del self._data[key]
+        self._notify([(key, value)])
+        return default
+
+    def set(self, key: Hashable, value: Any):
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            self._data[key] = (value, now)
+            self._data.move_to_end(key)
+            # Expired entries sit at the old end, so drop them before evicting live ones
+            while self._data:
+                oldest_key, (oldest_value, stored_at) = next(iter(self._data.items()))
+                if len(self._data) > self.maxsize or self._expired(stored_at, now):
+                    del self._data[oldest_key]
+                    evicted.append((oldest_key, oldest_value))
+                else:
+                    break
+        self._notify(evicted)
+
+    def touch(self, key: Hashable) -> bool:
+        """Reset an entry's age; returns False if it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False
+            if not self._expired(item[1], now):
+                self._data[key] = (item[0], now)
+                self._data.move_to_end(key)
+                return True
+            del self._data[key]
+        self._notify([(key, item[0])])
+        return False
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry now; returns how many were dropped."""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            # get() reorders without resetting age, so scan every entry
+            for key, (value, stored_at) in list(self._data.items()):
+                if self._expired(stored_at, now):
+                    del self._data[key]
+                    evicted.append((key, value))
+        self._notify(evicted)
+        return len(evicted)
+
+    def values(self) -> List[Any]:
+        """Snapshot of the stored values, including ones that have expired but not been purged."""
+        with self._lock:
+            return [value for value, _ in self._data.values()]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
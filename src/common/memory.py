@@ -0,0 +1,73 @@
+"""Rough in-memory size estimates for reporting and memory budgets."""
+
+import sys
+from typing import Any, Dict
+
+import numpy as np
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Bytes held by an object graph: containers, their items, instance __dict__
+    and __slots__ values, and NumPy array buffers, each object counted once.
+
+    Modules, classes and functions are not followed.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, (type, type(sys), type(deep_sizeof))):
+            continue
+        seen.add(id(item))
+        # An ndarray's size includes the buffer it owns
+        total += sys.getsizeof(item)
+        if isinstance(item, (np.ndarray, str, bytes, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        if hasattr(item, "__dict__"):
+            stack.append(item.__dict__)
+        for cls in type(item).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+# /proc/self/smaps_rollup fields reported by process_memory(), in kB there
+SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    This process's resident memory in bytes, split into shared and private pages.
+
+    For forked workers, "private" is what copy-on-write failed to share with
+    the parent (and each other); PSS charges shared pages pro rata. Linux
+    only; empty elsewhere.
+    """
+    usage: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in SMAPS_FIELDS:
+                    usage[SMAPS_FIELDS[name]] = int(value.split()[0]) * 1024
+    except OSError:
+        return {}
+    if usage:
+        usage["private"] = usage.get("private_clean", 0) + usage.get("private_dirty", 0)
+        usage["shared"] = usage.get("shared_clean", 0) + usage.get("shared_dirty", 0)
+    return usage
@@ -0,0 +1,296 @@
+"""
+On-demand profiling helpers shared by the Flask backend and the MCP server.
+
+Everything here is framework-agnostic; the web layers only translate HTTP
+requests into calls on these objects. Nothing is active until an admin asks
+for it, so the cost in normal operation is a dictionary lookup per request.
+"""
+
+import gc
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional
+
+
+def is_admin_request(headers) -> bool:
+    """
+    Check the admin token header against the ADMIN_TOKEN environment variable.
+
+    Profiling endpoints are disabled entirely when ADMIN_TOKEN is not set.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        return False
+    provided = headers.get("X-Admin-Token", "")
+    return hmac.compare_digest(provided.encode(), expected.encode())
+
+
+def _frame_stack(frame) -> List[str]:
+    """Return the stack for a frame, outermost call first."""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class StackSampler:
+    """
+    Wall-clock sampling profiler based on sys._current_frames().
+
+    A daemon thread wakes up every `interval` seconds and records the stack of
+    every other thread (or only the threads in `thread_ids`). The profiled code
+    is never instrumented, so overhead is bounded by the sampling rate.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Iterable[int]] = None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.stopped_at = time.time()
+        return self
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                self.samples[tuple(_frame_stack(frame))] += 1
+                self.sample_count += 1
+
+    def to_collapsed(self) -> str:
+        """Render samples in Brendan Gregg's collapsed-stack format."""
+        return "\n".join(
+            f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()
+        ) + "\n"
+
+    def to_speedscope(self, name: str = "cpu profile") -> Dict:
+        """Render samples as a speedscope 'sampled' profile."""
+        frame_index: Dict[str, int] = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            indices = []
+            for entry in stack:
+                if entry not in frame_index:
+                    frame_index[entry] = len(frames)
+                    frames.append({"name": entry})
+                indices.append(frame_index[entry])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "name": name,
+            "exporter": "ai-training-planner",
+        }
+
+
+def profile_cpu(seconds: float, interval: float = 0.005) -> StackSampler:
+    """Sample every thread for `seconds` and return the stopped sampler."""
+    sampler = StackSampler(interval=interval).start()
+    time.sleep(seconds)
+    return sampler.stop()
+
+
+class MemorySnapshots:
+    """Named tracemalloc snapshots that can be diffed against each other."""
+
+    def __init__(self, max_snapshots: int = 10, frames: int = 10):
+        self.max_snapshots = max_snapshots
+        self.frames = frames
+        self.snapshots: Dict[str, tracemalloc.Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def take(self, label: str) -> Dict:
+        """Take a snapshot, starting tracemalloc on first use."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            self.snapshots.pop(label, None)
+            while len(self.snapshots) >= self.max_snapshots:
+                self.snapshots.pop(next(iter(self.snapshots)))
+            self.snapshots[label] = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {"label": label, "traced_bytes": current, "peak_bytes": peak}
+
+    def diff(self, from_label: str, to_label: Optional[str] = None, limit: int = 25) -> Dict:
+        """
+        Compare two snapshots, or one snapshot against the current heap.
+
+        Raises:
+            KeyError: If a label has not been captured
+        """
+        with self._lock:
+            older = self.snapshots[from_label]
+            newer = self.snapshots[to_label] if to_label else None
+        if newer is None:
+            newer = tracemalloc.take_snapshot()
+
+        stats = newer.compare_to(older, "lineno")
+        return {
+            "from": from_label,
+            "to": to_label or "now",
+            "total_size_diff": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "location": str(stat.traceback[0]) if stat.traceback else "?",
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+    def stop(self):
+        with self._lock:
+            self.snapshots.clear()
+        tracemalloc.stop()
+
+
+def top_object_types(limit: int = 25) -> List[Dict]:
+    """Count live GC-tracked objects by type, largest total shallow size first."""
+    counts: Counter = Counter()
+    sizes: Counter = Counter()
+    for obj in gc.get_objects():
+        type_name = type(obj).__qualname__
+        counts[type_name] += 1
+        try:
+            sizes[type_name] += sys.getsizeof(obj)
+        except TypeError:
+            pass
+
+    return [
+        {"type": type_name, "count": counts[type_name], "size_bytes": size}
+        for type_name, size in sizes.most_common(limit)
+    ]
+
+
+class SlowRequestProfiler:
+    """
+    Profile only requests that exceed a latency threshold.
+
+    While enabled, a single sampler thread records stacks of the threads that
+    are currently serving requests. When a request finishes its samples are
+    kept if it took longer than `threshold_ms` and dropped otherwise.
+
+    In the asyncio server all requests share the event loop thread, so samples
+    taken while several requests overlap are attributed to each of them.
+    """
+
+    def __init__(self, interval: float = 0.005, max_profiles: int = 50):
+        self.interval = interval
+        self.threshold_ms: Optional[float] = None
+        self.profiles: deque = deque(maxlen=max_profiles)
+        self._active: Dict[object, Dict] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def enable(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+            self._thread.start()
+
+    def disable(self):
+        self.threshold_ms = None
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._active.clear()
+
+    def begin(self, key, label: str):
+        """Start collecting samples for a request served by the current thread."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._active[key] = {
+                "label": label,
+                "thread_id": threading.get_ident(),
+                "started": time.perf_counter(),
+                "samples": Counter(),
+            }
+
+    def end(self, key):
+        """Finish a request and keep its samples if it was slow."""
+        with self._lock:
+            entry = self._active.pop(key, None)
+        if entry is None or self.threshold_ms is None:
+            return
+        elapsed_ms = (time.perf_counter() - entry["started"]) * 1000
+        if elapsed_ms < self.threshold_ms:
+            return
+        self.profiles.append({
+            "request": entry["label"],
+            "elapsed_ms": round(elapsed_ms, 2),
+            "finished_at": time.time(),
+            "collapsed": "\n".join(
+                f"{';'.join(stack)} {count}" for stack, count in entry["samples"].most_common()
+            ),
+        })
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for entry in self._active.values():
+                    frame = frames.get(entry["thread_id"])
+                    if frame is not None:
+                        entry["samples"][tuple(_frame_stack(frame))] += 1
+
+    def status(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "captured": len(self.profiles),
+        }
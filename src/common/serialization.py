@@ -0,0 +1,179 @@
+"""
+JSON serialization used by every route and HTTP client in both services.
+
+orjson is preferred for encoding and decoding, then msgspec, then the stdlib.
+`dumps` always returns UTF-8 bytes so responses and request bodies can be
+written without an intermediate str. When msgspec is installed, career-path
+payloads from the LLM are decoded straight into typed structs, which validates
+and parses in a single pass.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+CONTENT_TYPE = "application/json"
+
+
+def _default(obj):
+    """Fallback for types none of the backends encode natively."""
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "__slots__") or hasattr(obj, "__dict__"):
+        return to_builtins(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def to_builtins(obj) -> Any:
+    """Convert model objects (plain, slotted or structs) into JSON-compatible dicts."""
+    if msgspec is not None and isinstance(obj, msgspec.Struct):
+        return msgspec.to_builtins(obj)
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if hasattr(obj, "__dict__"):
+        return dict(obj.__dict__)
+    return {slot: getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot)}
+
+
+if BACKEND == "orjson":
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return orjson.loads(data)
+
+elif BACKEND == "msgspec":
+    _encoder = msgspec.json.Encoder(enc_hook=_default)
+    _decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj)
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return _decoder.decode(data)
+
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return json.loads(data)
+
+DecodeError = (ValueError, msgspec.DecodeError) if msgspec is not None else (ValueError,)
+
+
+def dumps_str(obj: Any) -> str:
+    """Encode to str, for APIs (like Flask's JSON provider) that insist on text."""
+    return dumps(obj).decode("utf-8")
+
+
+# -- typed career-path payloads ---------------------------------------------
+#
+# One schema for both decoders: the fields below, in this order, with these
+# defaults. Unknown fields are dropped and list items and free-text fields are
+# taken as the LLM wrote them, so the result does not depend on whether msgspec
+# is installed.
+
+CAREER_PATH_LISTS = ("courses", "badges", "milestones")
+
+if msgspec is not None:
+    class CareerPath(msgspec.Struct):
+        description: str
+        courses: List[Any] = []
+        badges: List[Any] = []
+        estimatedTime: Any = ""
+        milestones: List[Any] = []
+
+    class RefinedPathResponse(msgspec.Struct):
+        refined_path: Dict[str, Any]
+        personalized_advice: Any = ""
+        resources: List[Any] = []
+
+    _career_paths_decoder = msgspec.json.Decoder(List[CareerPath])
+    _refined_path_decoder = msgspec.json.Decoder(RefinedPathResponse)
+
+
+def _career_path(path: Any) -> Optional[Dict]:
+    """The CareerPath struct's checks and normalization, for the stdlib decoder."""
+    if not isinstance(path, dict) or not isinstance(path.get("description"), str):
+        return None
+    if not all(isinstance(path.get(key, []), list) for key in CAREER_PATH_LISTS):
+        return None
+    return {
+        "description": path["description"],
+        "courses": path.get("courses", []),
+        "badges": path.get("badges", []),
+        "estimatedTime": path.get("estimatedTime", ""),
+        "milestones": path.get("milestones", []),
+    }
+
+
+def decode_career_paths(data: Union[bytes, str]) -> Optional[List[Dict]]:
+    """
+    Decode and validate an LLM career-path array.
+
+    Returns:
+        The paths as plain dicts, or None if the payload is not a non-empty
+        list of career paths
+    """
+    if msgspec is not None:
+        try:
+            paths = _career_paths_decoder.decode(data)
+        except msgspec.DecodeError:
+            return None
+        return msgspec.to_builtins(paths) if paths else None
+
+    try:
+        paths = loads(data)
+    except DecodeError:
+        return None
+    if not isinstance(paths, list) or not paths:
+        return None
+    normalized = [_career_path(path) for path in paths]
+    return normalized if all(path is not None for path in normalized) else None
+
+
+def decode_refined_path(data: Union[bytes, str]) -> Optional[Dict]:
+    """
+    Decode and validate an LLM refinement response.
+
+    Returns:
+        The refinement as a plain dict, or None if it is not a valid object
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.to_builtins(_refined_path_decoder.decode(data))
+        except msgspec.DecodeError:
+            return None
+
+    try:
+        refined = loads(data)
+    except DecodeError:
+        return None
+    if not isinstance(refined, dict) or not isinstance(refined.get("refined_path"), dict):
+        return None
+    if not isinstance(refined.get("resources", []), list):
+        return None
+    return {
+        "refined_path": refined["refined_path"],
+        "personalized_advice": refined.get("personalized_advice", ""),
+        "resources": refined.get("resources", []),
+    }
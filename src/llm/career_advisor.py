@@ -1,6 +1,8 @@
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 from .mcp_client import MCPClient
+from ..common.circuit_breaker import CircuitOpenError
+from ..common.deadline import Deadline, DeadlineExceeded
 from ..config.mcp_config import MCPConfig
 
 class CareerAdvisor:
@@ -23,26 +25,70 @@ class CareerAdvisor:
         Returns:
             Dictionary containing suggested career paths and required learning paths
         """
+        analysis = await self.analyze(user_data, career_preferences)
+        return analysis["career_paths"]
+    
+    async def analyze(
+        self,
+        user_data: Dict,
+        career_preferences: str,
+        deadline: Optional[Deadline] = None
+    ) -> Dict:
+        """
+        Get career path recommendations together with a refine session.
+        
+        Args:
+            user_data: Dictionary containing user profile and progress
+            career_preferences: String describing career goals and preferences
+            deadline: Request deadline, propagated to the MCP server
+            
+        Returns:
+            Dictionary with 'career_paths' and 'session_id' (None when the
+            MCP server was unavailable and fallback paths were returned)
+        """
+        if self.client.breaker.would_reject():
+            # The MCP server is known to be down; answer with the fallback right away
+            return {
+                "career_paths": self._get_fallback_career_paths(user_data, career_preferences),
+                "session_id": None
+            }
+        
         async with self.client as client:
             try:
-                response = await client.analyze_career_path(user_data, career_preferences)
+                response = await client.analyze_career_path(user_data, career_preferences, deadline=deadline)
                 
                 if response and "career_paths" in response:
-                    return response["career_paths"]
+                    return {
+                        "career_paths": response["career_paths"],
+                        "session_id": response.get("session_id")
+                    }
                 else:
                     # Return fallback career paths if API response is malformed
-                    return self._get_fallback_career_paths(user_data, career_preferences)
+                    return {
+                        "career_paths": self._get_fallback_career_paths(user_data, career_preferences),
+                        "session_id": None
+                    }
                     
+            except (CircuitOpenError, DeadlineExceeded):
+                return {
+                    "career_paths": self._get_fallback_career_paths(user_data, career_preferences),
+                    "session_id": None
+                }
             except Exception as e:
                 print(f"Error calling MCP API for career paths: {e}")
                 # Return fallback career paths if API call fails
-                return self._get_fallback_career_paths(user_data, career_preferences)
+                return {
+                    "career_paths": self._get_fallback_career_paths(user_data, career_preferences),
+                    "session_id": None
+                }
     
     async def refine_path(
         self,
         user_data: Dict,
         selected_path: str,
-        user_feedback: str
+        user_feedback: str,
+        session_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None
     ) -> Dict:
         """
         Refine a career path based on user feedback.
@@ -51,13 +97,20 @@ class CareerAdvisor:
             user_data: Dictionary containing user profile
             selected_path: The selected career path to refine
             user_feedback: User's feedback on the path
+            session_id: Refine session from analyze(), if any
+            deadline: Request deadline, propagated to the MCP server
             
         Returns:
             Dictionary containing refined path recommendations
         """
+        if self.client.breaker.would_reject():
+            return self._get_fallback_refinement(user_data, selected_path, user_feedback)
+        
         async with self.client as client:
             try:
-                response = await client.refine_career_path(user_data, selected_path, user_feedback)
+                response = await client.refine_career_path(
+                    user_data, selected_path, user_feedback, session_id=session_id, deadline=deadline
+                )
                 
                 if response:
                     return response
@@ -65,6 +118,8 @@ class CareerAdvisor:
                     # Return fallback refinement if API response is empty
                     return self._get_fallback_refinement(user_data, selected_path, user_feedback)
                     
+            except (CircuitOpenError, DeadlineExceeded):
+                return self._get_fallback_refinement(user_data, selected_path, user_feedback)
             except Exception as e:
                 print(f"Error calling MCP API for path refinement: {e}")
                 # Return fallback refinement if API call fails
@@ -19,13 +19,24 @@ class MCPClient:
 
     import json
 import aiohttp
+import asyncio
 import os
-from typing import Dict, List, Optional
+import time
+from typing import AsyncIterator, Dict, List, Optional
+from ..common import accounting, serialization
+from ..common.circuit_breaker import MCP_BREAKER_DEFAULTS, CircuitOpenError, get_breaker
+from ..common.deadline import DEADLINE_HEADER, Deadline, DeadlineExceeded, deadline_stats
 from ..config.mcp_config import MCPConfig
 
+# Status the MCP server answers with when the LLM produced nothing usable and the
+# caller allowed no fallback; the server's own Ollama breaker judges Ollama's part in it
+LLM_FAILED_STATUS = 502
+
 class MCPClient:
     def __init__(self, config: MCPConfig = None):
         self.config = config or MCPConfig()
+        # Shared by every client in the process, configured with MCP_BREAKER_* variables
+        self.breaker = get_breaker("mcp", **MCP_BREAKER_DEFAULTS)
         # Use environment variable for MCP server URL when running in Docker
         mcp_server_url = os.getenv("MCP_SERVER_URL")
         if mcp_server_url:
@@ -46,7 +57,10 @@ class MCPClient:
         self,
         user_data: Dict,
         career_preferences: str,
-        timeout: int = 60
+        timeout: int = 60,
+        open_session: bool = True,
+        allow_fallback: bool = True,
+        deadline: Optional[Deadline] = None
     ) -> Optional[Dict]:
         """
         Call the career analysis endpoint.
@@ -54,7 +68,11 @@ class MCPClient:
         Args:
             user_data: Dictionary containing user profile and progress
             career_preferences: String describing career goals and preferences
-            timeout: Request timeout in seconds
+            timeout: Request timeout in seconds, used when no deadline is given
+            open_session: Whether the server should keep a refine session
+            allow_fallback: If False the server fails instead of returning
+                canned paths when the LLM is unavailable
+            deadline: Request deadline, forwarded to the server
             
         Returns:
             Dictionary containing the analysis response or None if failed
@@ -63,20 +81,14 @@ class MCPClient:
             raise RuntimeError("Client session not initialized. Use 'async with' context manager.")
         
         try:
-            async with self.session.post(
-                f"{self.base_url}/api/career/analyze",
-                json={
-                    "user_data": user_data,
-                    "career_preferences": career_preferences
-                },
-                timeout=aiohttp.ClientTimeout(total=timeout)
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"API request failed with status {response.status}: {error_text}")
-                    
+            return await self._post("/api/career/analyze", {
+                "user_data": user_data,
+                "career_preferences": career_preferences,
+                "open_session": open_session,
+                "allow_fallback": allow_fallback
+            }, deadline or Deadline.after(timeout))
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except aiohttp.ClientError as e:
             raise Exception(f"Network error calling MCP server: {e}")
         except Exception as e:
@@ -87,7 +99,9 @@ class MCPClient:
         user_data: Dict,
         selected_path: str,
         user_feedback: str,
-        timeout: int = 60
+        timeout: int = 60,
+        session_id: Optional[str] = None,
+        deadline: Optional[Deadline] = None
     ) -> Optional[Dict]:
         """
         Call the career refinement endpoint.
@@ -96,7 +110,10 @@ class MCPClient:
             user_data: Dictionary containing user profile
             selected_path: The selected career path to refine
             user_feedback: User's feedback on the path
-            timeout: Request timeout in seconds
+            timeout: Request timeout in seconds, used when no deadline is given
+            session_id: Refine session returned by the analysis, so the server
+                can continue from the model's earlier context
+            deadline: Request deadline, forwarded to the server
             
         Returns:
             Dictionary containing the refinement response or None if failed
@@ -105,26 +122,159 @@ class MCPClient:
             raise RuntimeError("Client session not initialized. Use 'async with' context manager.")
         
         try:
-            async with self.session.post(
-                f"{self.base_url}/api/career/refine",
-                json={
-                    "user_data": user_data,
-                    "selected_path": selected_path,
-                    "user_feedback": user_feedback
-                },
-                timeout=aiohttp.ClientTimeout(total=timeout)
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    error_text = await response.text()
-                    raise Exception(f"API request failed with status {response.status}: {error_text}")
-                    
+            return await self._post("/api/career/refine", {
+                "user_data": user_data,
+                "selected_path": selected_path,
+                "user_feedback": user_feedback,
+                "session_id": session_id
+            }, deadline or Deadline.after(timeout))
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except aiohttp.ClientError as e:
             raise Exception(f"Network error calling MCP server: {e}")
         except Exception as e:
             raise Exception(f"Error calling refinement API: {e}")
 
+    async def analyze_batch(
+        self,
+        profiles: List[Dict],
+        career_preferences: str = "",
+        allow_fallback: bool = False,
+        timeout: int = 1800,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream career analyses for many profiles from the batch endpoint.
+        
+        Args:
+            profiles: Dictionaries with 'user_data', optionally
+                'career_preferences' and an 'id' echoed back in the results
+            career_preferences: Preferences for profiles that have none
+            allow_fallback: If True, profiles the LLM fails on get the canned
+                paths instead of a 'failed' result
+            timeout: Seconds for the whole batch, used when no deadline is given
+            deadline: Deadline for the whole batch, forwarded to the server
+            
+        Yields:
+            One result per profile, in the order they finish, each with its
+            'index' in `profiles` and a 'status' of 'ok' (with 'career_paths'),
+            'invalid' or 'failed' (with 'error'); then the batch 'summary'
+            
+        Raises:
+            CircuitOpenError, DeadlineExceeded: Before any result, as for the single analysis
+            Exception: If the request fails, or the stream ends before its summary
+        """
+        if not self.session:
+            raise RuntimeError("Client session not initialized. Use 'async with' context manager.")
+        
+        deadline = deadline or Deadline.after(timeout)
+        if deadline.expired():
+            deadline_stats.increment("expired_before_call")
+            raise DeadlineExceeded()
+        self.breaker.check()
+        started = time.monotonic()
+        try:
+            response = await self.session.post(
+                f"{self.base_url}/api/career/analyze:batch",
+                data=serialization.dumps({
+                    "profiles": profiles,
+                    "career_preferences": career_preferences,
+                    "allow_fallback": allow_fallback
+                }),
+                headers={
+                    "Content-Type": serialization.CONTENT_TYPE,
+                    DEADLINE_HEADER: deadline.header_value(),
+                    **accounting.tag_headers()
+                },
+                timeout=aiohttp.ClientTimeout(total=deadline.remaining())
+            )
+        except aiohttp.ClientError as e:
+            self.breaker.record_failure(time.monotonic() - started)
+            raise Exception(f"Network error calling MCP server: {e}")
+        except BaseException:
+            self.breaker.release()
+            raise
+        
+        # The breaker judges how quickly the server answered, not how long the batch takes
+        async with response:
+            self._record_status(response.status, time.monotonic() - started)
+            if response.status != 200:
+                body = await response.read()
+                raise Exception(f"API request failed with status {response.status}: {body.decode(errors='replace')}")
+            try:
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    result = serialization.loads(line)
+                    yield result
+                    if "summary" in result:
+                        return
+            except asyncio.TimeoutError:
+                deadline_stats.increment("abandoned_deadline")
+                raise DeadlineExceeded()
+            except aiohttp.ClientError as e:
+                raise Exception(f"Batch career analysis stream failed: {e}")
+        raise Exception("Batch career analysis stream ended before its summary")
+
+    async def _post(self, path: str, payload: Dict, deadline: Deadline) -> Dict:
+        """
+        POST to the MCP server through the circuit breaker, within the deadline.
+        
+        The remaining budget is sent in the deadline header and bounds the
+        request timeout. Network errors, server-side timeouts and 5xx
+        responses other than LLM_FAILED_STATUS count as breaker failures;
+        calls slower than the breaker's slow-call threshold count against it
+        too. Raises CircuitOpenError
+        while the circuit is open and DeadlineExceeded when the deadline
+        passes, before or during the call.
+        """
+        if deadline.expired():
+            deadline_stats.increment("expired_before_call")
+            raise DeadlineExceeded()
+        self.breaker.check()
+        started = time.monotonic()
+        try:
+            async with self.session.post(
+                f"{self.base_url}{path}",
+                data=serialization.dumps(payload),
+                headers={
+                    "Content-Type": serialization.CONTENT_TYPE,
+                    DEADLINE_HEADER: deadline.header_value(),
+                    # Who the MCP server's LLM calls are accounted to
+                    **accounting.tag_headers()
+                },
+                timeout=aiohttp.ClientTimeout(total=deadline.remaining())
+            ) as response:
+                body = await response.read()
+        except asyncio.TimeoutError:
+            if deadline.expired():
+                # Our own budget ran out; that says nothing about the server's health
+                self.breaker.release()
+                deadline_stats.increment("abandoned_deadline")
+                deadline_stats.increment("seconds_abandoned", time.monotonic() - started)
+                raise DeadlineExceeded()
+            self.breaker.record_failure(time.monotonic() - started)
+            raise
+        except aiohttp.ClientError:
+            self.breaker.record_failure(time.monotonic() - started)
+            raise
+        except BaseException:
+            # Cancelled by the caller; says nothing about the server's health
+            self.breaker.release()
+            raise
+        
+        self._record_status(response.status, time.monotonic() - started)
+        if response.status != 200:
+            raise Exception(f"API request failed with status {response.status}: {body.decode(errors='replace')}")
+        return serialization.loads(body)
+
+    def _record_status(self, status: int, latency: float):
+        """Record a response with the breaker; an LLM that failed is not the MCP server failing."""
+        if status >= 500 and status != LLM_FAILED_STATUS:
+            self.breaker.record_failure(latency)
+        else:
+            self.breaker.record_success(latency)
+
     async def health_check(self) -> bool:
         """
         Check if the MCP server is healthy.
@@ -4,9 +4,15 @@ import time
 from typing import Dict, Any, Optional
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
+from ..common import accounting, serialization
+from ..common.deadline import Deadline, DeadlineExceeded, deadline_stats
+
+# Budget for a generation whose caller passes no deadline; the Flask edge's default
+DEFAULT_DEADLINE_SECONDS = 120
 
 class OllamaAPI:
-    def __init__(self, base_url: str = "http://ollama:11434", model: str = "llama3.3:70b-instruct-q2_K", max_retries: int = 5):
+    def __init__(self, base_url: str = "http://ollama:11434", model: str = "llama3.3:70b-instruct-q2_K", max_retries: int = 5,
+                 wait_for_model: bool = True):
         self.base_url = base_url.rstrip('/')
         self.model = model
         
@@ -25,7 +31,7 @@ class OllamaAPI:
         self.session.mount("https://", adapter)
         
         # Try to connect to Ollama with a longer timeout for initial setup
-        if not self._wait_for_ollama(timeout=180):  # 3 minutes for initial setup
+        if wait_for_model and not self._wait_for_ollama(timeout=180):  # 3 minutes for initial setup
             print("Warning: Could not connect to Ollama during initialization. Will retry on first use.")
             # Don't raise exception immediately - allow lazy connection
 
@@ -58,7 +64,7 @@ class OllamaAPI:
             try:
                 response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
                 response.raise_for_status()
-                models = response.json().get('models', [])
+                models = serialization.loads(response.content).get('models', [])
                 
                 if not models:
                     print("No models available yet, waiting for model initialization...")
@@ -86,7 +92,19 @@ class OllamaAPI:
         print("Note: You may need to manually pull the model or check the ollama-init container logs")
         return False
 
-    def generate(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7) -> str:
+    def is_model_available(self, timeout: float = 2) -> bool:
+        """Single, retry-free check that Ollama is up and has this model."""
+        try:
+            response = requests.get(f"{self.base_url}/api/tags", timeout=timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            return False
+        target_model = self.model.split(':')[0]
+        models = serialization.loads(response.content).get('models', [])
+        return any(model['name'].split(':')[0] == target_model for model in models)
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7,
+                 deadline: Optional[Deadline] = None) -> str:
         """
         Generate a response using the Ollama model.
         
@@ -94,11 +112,22 @@ class OllamaAPI:
             prompt (str): The user prompt
             system_prompt (str, optional): System prompt to set context
             temperature (float): Controls randomness in the response (0.0 to 1.0)
+            deadline (Deadline, optional): Stop reading and close the stream once it passes;
+                DEFAULT_DEADLINE_SECONDS from now by default
         
         Returns:
             str: The generated response
+        
+        Raises:
+            DeadlineExceeded: If the deadline passed before the generation finished
+            BudgetExceeded: If the caller's user or tenant has used up its token budget
         """
         url = f"{self.base_url}/api/generate"
+        deadline = deadline or Deadline.after(DEFAULT_DEADLINE_SECONDS)
+        ledger = accounting.get_ledger()
+        if ledger:
+            ledger.check_budget()
+        started = time.monotonic()
         
         payload = {
             "model": self.model,
@@ -110,24 +139,49 @@ class OllamaAPI:
             payload["system"] = system_prompt
             
         try:
-            response = self.session.post(url, json=payload, stream=True)
+            response = self.session.post(
+                url,
+                data=serialization.dumps(payload),
+                headers={"Content-Type": serialization.CONTENT_TYPE},
+                stream=True,
+                # The read timeout bounds the wait for each chunk, not the whole generation
+                timeout=(10, deadline.remaining())
+            )
             response.raise_for_status()
             
             # Ollama streams responses, so we need to process them
-            full_response = ""
+            chunks = []
             for line in response.iter_lines():
+                if deadline.expired():
+                    # Closing the connection makes Ollama stop generating
+                    response.close()
+                    deadline_stats.increment("abandoned_deadline")
+                    deadline_stats.increment("tokens_abandoned", len(chunks))
+                    if ledger:
+                        elapsed_ns = int((time.monotonic() - started) * 1e9)
+                        ledger.record({"eval_count": len(chunks), "eval_duration": elapsed_ns}, self.model,
+                                      accounting.prompt_fingerprint(prompt), abandoned=True)
+                    raise DeadlineExceeded()
                 if line:
-                    json_response = json.loads(line)
+                    json_response = serialization.loads(line)
                     if 'response' in json_response:
-                        full_response += json_response['response']
+                        chunks.append(json_response['response'])
                     
                     # Check if this is the last message
                     if json_response.get('done', False):
+                        if ledger:
+                            ledger.record(json_response, self.model, accounting.prompt_fingerprint(prompt))
                         break
             
-            return full_response.strip()
+            return "".join(chunks).strip()
             
         except requests.exceptions.RequestException as e:
+            # A read timeout mid-stream surfaces from iter_lines as a ConnectionError
+            if deadline.expired():
+                deadline_stats.increment("abandoned_deadline")
+                raise DeadlineExceeded()
+            if isinstance(e, requests.exceptions.Timeout):
+                raise Exception(f"Timed out waiting for Ollama at {self.base_url}: {e}")
             error_msg = f"Error communicating with Ollama at {self.base_url}: {str(e)}"
             print(error_msg)  # Add logging
             if isinstance(e, requests.exceptions.ConnectionError):
@@ -144,7 +198,7 @@ class OllamaAPI:
         try:
             response = self.session.get(f"{self.base_url}/api/tags")
             response.raise_for_status()
-            return [model['name'] for model in response.json()['models']]
+            return [model['name'] for model in serialization.loads(response.content)['models']]
         except requests.exceptions.RequestException as e:
             error_msg = f"Error getting models from Ollama: {str(e)}"
             print(error_msg)  # Add logging
@@ -155,7 +209,8 @@ class OllamaAPI:
     def analyze_course_overlaps(self,
                             courses_to_badges: Dict[str, Dict],
                             target_badge: str,
-                            current_skills: list) -> str:
+                            current_skills: list,
+                            deadline: Optional[Deadline] = None) -> str:
         """
         Analyze course overlaps and provide strategic recommendations using the LLM.
         
@@ -163,6 +218,7 @@ class OllamaAPI:
             courses_to_badges: Dictionary mapping courses to the badges they contribute to
             target_badge: The badge the user wants to achieve
             current_skills: List of current skills/completed courses
+            deadline: Passed to generate
         
         Returns:
             str: Strategic analysis and recommendations
@@ -194,14 +250,15 @@ class OllamaAPI:
         earn multiple credentials efficiently.
         """
 
-        return self.generate(prompt, system_prompt=system_prompt, temperature=0.7)
+        return self.generate(prompt, system_prompt=system_prompt, temperature=0.7, deadline=deadline)
 
     def create_training_plan(self, 
                            current_skills: list,
                            target_badge: str,
                            available_courses: Dict[str, Any],
                            available_badges: Dict[str, Any],
-                           course_overlaps: Optional[Dict] = None) -> str:
+                           course_overlaps: Optional[Dict] = None,
+                           deadline: Optional[Deadline] = None) -> str:
         """
         Generate a personalized training plan using the LLM.
         
@@ -211,6 +268,7 @@ class OllamaAPI:
             available_courses: Dictionary of available courses
             available_badges: Dictionary of available badges
             course_overlaps: Optional dictionary of course overlap information
+            deadline: Passed to generate
         
         Returns:
             str: A detailed training plan
@@ -251,4 +309,4 @@ class OllamaAPI:
         maximizing the value of each course taken.
         """
 
-        return self.generate(prompt, system_prompt=system_prompt, temperature=0.7)
+        return self.generate(prompt, system_prompt=system_prompt, temperature=0.7, deadline=deadline)
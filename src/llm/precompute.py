@@ -0,0 +1,171 @@
+"""
+Offline batch precomputation of career-path analyses for every user.
+
+Walks the user store, sends each profile through the MCP server's analysis
+pipeline and stores the result keyed by profile hash and catalog version.
+Profiles that already have an analysis for the current catalog are skipped,
+so the job is resumable and a nightly run only regenerates users whose
+profile changed since the last one.
+
+    python -m src.llm.precompute --parallel 2
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict, Set
+
+from .mcp_client import MCPClient
+from ..common import accounting
+from ..loader.dataLoader import load_catalog
+from ..store.career_path_store import (
+    DEFAULT_CAREER_PREFERENCES,
+    open_career_path_store,
+    profile_data,
+    profile_hash,
+)
+from ..store.user_store import open_user_store
+
+
+class PrecomputeProgress:
+    """Counters for a batch run, printed every `report_every` users."""
+
+    def __init__(self, total: int, report_every: int = 25):
+        self.total = total
+        self.report_every = report_every
+        self.processed = 0
+        self.generated = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def record(self, outcome: str):
+        self.processed += 1
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        if self.processed % self.report_every == 0 or self.processed == self.total:
+            self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.processed / elapsed if elapsed else 0.0
+        remaining = (self.total - self.processed) / rate if rate else 0.0
+        print(f"[precompute] {self.processed}/{self.total} users "
+              f"(generated {self.generated}, unchanged {self.unchanged}, failed {self.failed}) "
+              f"{rate:.2f} users/s, ETA {remaining / 60:.1f} min")
+
+    def to_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "processed": self.processed,
+            "generated": self.generated,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "seconds": round(time.monotonic() - self.started, 1),
+        }
+
+
+async def precompute_career_paths(
+    user_store,
+    path_store,
+    catalog_version: str,
+    client: MCPClient,
+    parallel: int = 1,
+    career_preferences: str = DEFAULT_CAREER_PREFERENCES,
+    timeout: int = 300,
+    report_every: int = 25
+) -> PrecomputeProgress:
+    """
+    Generate and store analyses for every user whose profile hash is new.
+
+    Args:
+        user_store: Store to read users from
+        path_store: CareerPathStore to write results to
+        catalog_version: Catalog version the analyses are generated against
+        client: Open MCPClient
+        parallel: Concurrent generations; match Ollama's OLLAMA_NUM_PARALLEL
+        career_preferences: Preferences sent with every profile
+        timeout: Per-request timeout in seconds
+        report_every: Print progress after this many users
+
+    Returns:
+        The progress counters of the finished run
+    """
+    progress = PrecomputeProgress(user_store.count(), report_every)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=parallel * 2)
+    # Hashes handled in this run, so identical profiles are generated once
+    seen: Set[str] = set()
+
+    async def worker():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            key, user_data = item
+            try:
+                response = await client.analyze_career_path(
+                    user_data, career_preferences, timeout=timeout,
+                    open_session=False, allow_fallback=False
+                )
+                path_store.put(key, catalog_version, response["career_paths"])
+                progress.record("generated")
+            except Exception as e:
+                # Left unstored, so the next run retries this profile
+                print(f"[precompute] Failed to generate paths for user {user_data.get('id')}: {e}")
+                seen.discard(key)
+                progress.record("failed")
+
+    workers = [asyncio.create_task(worker()) for _ in range(parallel)]
+    for user in user_store.iter_users():
+        user_data = profile_data(user)
+        key = profile_hash(user_data, career_preferences)
+        if key in seen or path_store.has(key, catalog_version):
+            progress.record("unchanged")
+            continue
+        seen.add(key)
+        await queue.put((key, {**user_data, "id": user["id"]}))
+
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+    return progress
+
+
+async def main(parallel: int, limit_versions: bool, timeout: int):
+    user_store = open_user_store()
+    path_store = open_career_path_store()
+    if path_store is None:
+        raise SystemExit(1)
+    _, _, catalog_version = load_catalog()
+
+    print(f"[precompute] Catalog version {catalog_version}, {parallel} parallel generation(s)")
+    # Accounted as background work, not to the users it analyzes
+    accounting.tag(route="precompute")
+    async with MCPClient() as client:
+        if not await client.health_check():
+            print("[precompute] MCP server is not reachable")
+            raise SystemExit(1)
+        progress = await precompute_career_paths(
+            user_store, path_store, catalog_version, client,
+            parallel=parallel, timeout=timeout
+        )
+
+    if limit_versions and not progress.failed:
+        removed = path_store.delete_other_versions(catalog_version)
+        print(f"[precompute] Removed {removed} analyses for older catalog versions")
+    print(f"[precompute] Done: {progress.to_dict()}")
+    if progress.failed:
+        raise SystemExit(2)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Precompute career-path analyses for all users")
+    parser.add_argument("--parallel", type=int, default=int(os.getenv("OLLAMA_NUM_PARALLEL", "1")),
+                        help="Concurrent generations (defaults to OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--timeout", type=int, default=300, help="Per-user request timeout in seconds")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete analyses for older catalog versions after a clean run")
+    args = parser.parse_args()
+
+    asyncio.run(main(max(1, args.parallel), args.prune, args.timeout))
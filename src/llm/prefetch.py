@@ -0,0 +1,234 @@
+"""
+Speculative background prefetch of career analyses.
+
+When a user profile is opened, the backend starts a low-priority analysis for
+it with the default preferences on a background event loop. A later
+/api/career/paths request with the same inputs attaches to the in-flight
+generation or takes the finished result instead of starting its own.
+
+Prefetches are budgeted so they never hold up interactive work: only a few
+run at once, starts are rate limited, none start while interactive requests
+occupy Ollama's parallel slots, and running prefetches are cancelled when an
+interactive request needs their slot.
+"""
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .mcp_client import MCPClient
+from ..common import accounting
+from ..common.circuit_breaker import MCP_BREAKER_DEFAULTS, get_breaker
+from ..common.lru import TTLCache
+
+STARTED = "started"
+CACHED = "cached"
+IN_FLIGHT = "in_flight"
+OVER_BUDGET = "over_budget"
+CIRCUIT_OPEN = "circuit_open"
+DISABLED = "disabled"
+
+
+class _Prefetch:
+    __slots__ = ("future", "started_at", "used")
+
+    def __init__(self, future: concurrent.futures.Future):
+        self.future = future
+        self.started_at = time.monotonic()
+        self.used = False
+
+    def failed(self) -> bool:
+        """Cancelled or finished with an error; a new prefetch may replace it."""
+        return self.future.cancelled() or (self.future.done() and self.future.exception() is not None)
+
+
+class CareerPathPrefetcher:
+    """Runs budgeted background analyses keyed by profile hash."""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        max_in_flight: int = 1,
+        max_per_minute: int = 10,
+        llm_slots: int = 1,
+        ttl: float = 600,
+        max_entries: int = 256,
+        timeout: int = 120
+    ):
+        self.enabled = enabled
+        self.max_in_flight = max_in_flight
+        self.max_per_minute = max_per_minute
+        self.llm_slots = llm_slots
+        self.timeout = timeout
+        self._entries = TTLCache(maxsize=max_entries, ttl=ttl, on_evict=self._on_evict)
+        self._recent_starts: deque = deque()
+        self._interactive = 0
+        # Re-entrant: cancelling a future runs its done callback in the cancelling thread
+        self._lock = threading.RLock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters = {
+            "started": 0,
+            "hits": 0,
+            "hits_in_flight": 0,
+            "misses": 0,
+            "wasted": 0,
+            "cancelled": 0,
+            "failed": 0,
+            "over_budget": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "CareerPathPrefetcher":
+        return cls(
+            enabled=os.getenv("PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes"),
+            max_in_flight=int(os.getenv("PREFETCH_MAX_IN_FLIGHT", "1")),
+            max_per_minute=int(os.getenv("PREFETCH_MAX_PER_MINUTE", "10")),
+            llm_slots=int(os.getenv("OLLAMA_NUM_PARALLEL", "1")),
+            ttl=float(os.getenv("PREFETCH_TTL", "600")),
+        )
+
+    # -- background loop --------------------------------------------------
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="career-prefetch", daemon=True).start()
+        return self._loop
+
+    async def _generate(self, user_data: Dict, career_preferences: str) -> Dict:
+        # Runs in a copy of the requesting thread's context, so the tenant and user tags carry over
+        accounting.tag(route="prefetch")
+        async with MCPClient() as client:
+            response = await client.analyze_career_path(
+                user_data, career_preferences, timeout=self.timeout, allow_fallback=False
+            )
+        return {"career_paths": response["career_paths"], "session_id": response.get("session_id")}
+
+    # -- budget -----------------------------------------------------------
+
+    def _in_flight(self) -> list:
+        return [entry for entry in self._entries.values() if not entry.future.done()]
+
+    def _within_budget(self, now: float) -> bool:
+        while self._recent_starts and now - self._recent_starts[0] > 60:
+            self._recent_starts.popleft()
+        if len(self._recent_starts) >= self.max_per_minute:
+            return False
+        in_flight = len(self._in_flight())
+        return in_flight < self.max_in_flight and in_flight + self._interactive < self.llm_slots
+
+    # -- public API -------------------------------------------------------
+
+    def prefetch(self, key: str, user_data: Dict, career_preferences: str) -> str:
+        """
+        Start a background analysis for a profile unless one exists or the budget is spent.
+
+        Returns:
+            One of "started", "cached", "in_flight", "over_budget",
+            "circuit_open" or "disabled"
+        """
+        if not self.enabled:
+            return DISABLED
+        if get_breaker("mcp", **MCP_BREAKER_DEFAULTS).would_reject():
+            return CIRCUIT_OPEN
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.failed():
+                return CACHED if entry.future.done() else IN_FLIGHT
+            now = time.monotonic()
+            if not self._within_budget(now):
+                self._counters["over_budget"] += 1
+                return OVER_BUDGET
+            future = asyncio.run_coroutine_threadsafe(
+                self._generate(user_data, career_preferences), self._get_loop()
+            )
+            future.add_done_callback(self._on_done)
+            self._entries.set(key, _Prefetch(future))
+            self._recent_starts.append(now)
+            self._counters["started"] += 1
+            return STARTED
+
+    def claim(self, key: str) -> Optional[concurrent.futures.Future]:
+        """
+        Take the prefetch for a profile, if there is a usable one.
+
+        Returns:
+            A future resolving to {"career_paths", "session_id"}, already done
+            or still running, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.failed():
+                self._counters["misses"] += 1
+                return None
+            if not entry.used:
+                entry.used = True
+                self._counters["hits"] += 1
+                if not entry.future.done():
+                    self._counters["hits_in_flight"] += 1
+            return entry.future
+
+    @contextmanager
+    def interactive(self, key: Optional[str] = None):
+        """
+        Mark an interactive LLM request for the duration of the block.
+
+        Prefetches (other than the one for `key`) are cancelled if they would
+        otherwise leave the interactive request waiting for an Ollama slot.
+        """
+        with self._lock:
+            self._interactive += 1
+            in_flight = sorted(self._in_flight(), key=lambda entry: entry.started_at, reverse=True)
+            excess = len(in_flight) + self._interactive - self.llm_slots
+            for entry in in_flight:
+                if excess <= 0:
+                    break
+                if entry.used or self._entries.get(key) is entry:
+                    continue
+                entry.future.cancel()
+                excess -= 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._interactive -= 1
+
+    def stats(self) -> Dict:
+        self._entries.purge_expired()
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = len(self._in_flight())
+        started = counters["started"]
+        return {
+            **counters,
+            "enabled": self.enabled,
+            "in_flight": in_flight,
+            "interactive": self._interactive,
+            "hit_rate": counters["hits"] / started if started else 0.0,
+            "waste_rate": counters["wasted"] / started if started else 0.0,
+        }
+
+    # -- bookkeeping ------------------------------------------------------
+
+    def _on_done(self, future: concurrent.futures.Future):
+        with self._lock:
+            if future.cancelled():
+                self._counters["cancelled"] += 1
+                self._counters["wasted"] += 1
+            elif future.exception() is not None:
+                self._counters["failed"] += 1
+
+    def _on_evict(self, key: str, entry: _Prefetch):
+        if not entry.future.done():
+            # Nobody can claim it any more; _on_done counts the cancellation
+            entry.future.cancel()
+            return
+        # A finished prefetch nobody used was wasted work
+        if not entry.used and not entry.future.cancelled() and entry.future.exception() is None:
+            with self._lock:
+                self._counters["wasted"] += 1
@@ -1,22 +1,29 @@
 # src/loader/dataLoader.py
+import hashlib
 import json
 import os
+import pickle
+
+SNAPSHOT_FORMAT = 1
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def default_catalog_dir():
+    """The catalog shipped with the app; other tenants' catalogs have the same layout"""
+    return os.path.join(BASE_DIR, "data", "badge-course-creation")
 
 def load_users():
     """Load user data from JSON file"""
     try:
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        users_file = os.path.join(base_dir, "data", "users.json")
+        users_file = os.path.join(BASE_DIR, "data", "users.json")
         with open(users_file, 'r') as f:
             return json.load(f)
     except Exception as e:
         print(f"Error loading users: {e}")
         return {}
 
-def load_courses():
+def load_courses(catalog_dir=None):
     courses = {}
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    courses_dir = os.path.join(base_dir, "data", "badge-course-creation", "courses")
+    courses_dir = os.path.join(catalog_dir or default_catalog_dir(), "courses")
     for root, _, files in os.walk(courses_dir):
         for filename in files:
             if filename.endswith('.json'):
@@ -25,10 +32,9 @@ def load_courses():
                     courses[course_data['id']] = course_data
     return courses
 
-def load_badges():
+def load_badges(catalog_dir=None):
     badges = {}
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    badges_dir = os.path.join(base_dir, "data", "badge-course-creation", "badges")
+    badges_dir = os.path.join(catalog_dir or default_catalog_dir(), "badges")
     for root, _, files in os.walk(badges_dir):
         for filename in files:
             if filename.endswith('.json'):
@@ -37,8 +43,69 @@ def load_badges():
                     badges[badge_data['id']] = badge_data
     return badges
 
-def load_relationships():
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    relationships_path = os.path.join(base_dir, "data", "badge-course-creation", "relationships.json")
+def load_relationships(catalog_dir=None):
+    relationships_path = os.path.join(catalog_dir or default_catalog_dir(), "relationships.json")
     with open(relationships_path, "r") as f:
         return json.load(f)
+
+def catalog_fingerprint(catalog_dir=None):
+    """Cheap fingerprint of the catalog files (paths, sizes and mtimes), used to validate snapshots"""
+    catalog_dir = catalog_dir or default_catalog_dir()
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(catalog_dir):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith('.json'):
+                stat = os.stat(os.path.join(root, filename))
+                digest.update(f"{os.path.relpath(os.path.join(root, filename), catalog_dir)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+def catalog_version(courses, badges):
+    """Content hash of the catalog; identical catalogs get the same version on every host"""
+    digest = hashlib.sha1()
+    digest.update(json.dumps([courses, badges], sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+def catalog_snapshot_path():
+    """Where the catalog snapshot lives; artifacts derived from the catalog are stored next to it"""
+    return os.getenv("CATALOG_SNAPSHOT_PATH", os.path.join(BASE_DIR, "data", ".catalog_snapshot.pickle"))
+
+def load_catalog(snapshot_path=None, catalog_dir=None):
+    """
+    Load courses and badges, using a pickled snapshot when the catalog files have not changed.
+
+    The snapshot is written next to the data (or to CATALOG_SNAPSHOT_PATH) on a cold start.
+    Failing to read or write it is never fatal. `catalog_dir` selects another
+    catalog (e.g. a tenant's); give it its own `snapshot_path`.
+
+    Returns:
+        Tuple of (courses, badges, version)
+    """
+    snapshot_path = snapshot_path or catalog_snapshot_path()
+    fingerprint = catalog_fingerprint(catalog_dir)
+
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+        if snapshot.get('format') == SNAPSHOT_FORMAT and snapshot.get('fingerprint') == fingerprint:
+            return snapshot['courses'], snapshot['badges'], snapshot['version']
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    courses = load_courses(catalog_dir)
+    badges = load_badges(catalog_dir)
+    version = catalog_version(courses, badges)
+    try:
+        tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'format': SNAPSHOT_FORMAT,
+                'fingerprint': fingerprint,
+                'version': version,
+                'courses': courses,
+                'badges': badges,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except OSError as e:
+        print(f"Could not write catalog snapshot to {snapshot_path}: {e}")
+    return courses, badges, version
@@ -0,0 +1,190 @@
+"""
+State shared by the MCP server's worker processes, in one SQLite database.
+
+With several workers behind one port (see supervisor.py), a refine request
+can land on a different worker than the analysis it continues, and two
+workers can receive the same prompt at once. Refine sessions, finished
+Ollama results and single-flight leases therefore live in a WAL-mode SQLite
+file that every worker opens, which also keeps them across worker restarts.
+
+Every statement is a point lookup or a single-row write, but a write can
+wait up to the busy timeout for another worker's, so the server makes these
+calls from a thread (AITrainingPlannerAPI.off_loop) rather than its event loop.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.common import serialization
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "mcp_results.db"
+)
+# Expired rows are purged (and namespaces trimmed to their size limit) every this many writes
+PURGE_EVERY = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expiry ON entries (namespace, expires_at);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+SELECT_ENTRY = "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?"
+UPSERT_ENTRY = """
+INSERT INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+"""
+TOUCH_ENTRY = "UPDATE entries SET expires_at = ? WHERE namespace = ? AND key = ? AND expires_at > ?"
+# Take a lease that is free or has expired; a no-op while someone else holds it
+ACQUIRE_LEASE = """
+INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+WHERE leases.expires_at <= ? OR leases.owner = excluded.owner
+"""
+
+
+class ResultStore:
+    """
+    Namespaced key/value entries with expiry, and leases for single-flight work.
+
+    Values are anything the fast serializer can encode. Times are wall-clock,
+    since they are compared across processes.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, busy_timeout: float = 1.0):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._limits: Dict[str, int] = {}
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    # -- entries ----------------------------------------------------------
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._execute(SELECT_ENTRY, (namespace, key, time.time())).fetchone()
+        return serialization.loads(row[0]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float):
+        self._execute(UPSERT_ENTRY, (namespace, key, serialization.dumps(value), time.time() + ttl))
+        self._writes += 1
+        if self._writes % PURGE_EVERY == 0:
+            self.purge()
+
+    def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        """Extend a live entry's expiry; False if it is missing or expired."""
+        now = time.time()
+        return self._execute(TOUCH_ENTRY, (now + ttl, namespace, key, now)).rowcount > 0
+
+    def delete(self, namespace: str, key: str):
+        self._execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def limit(self, namespace: str, maxsize: int):
+        """Keep at most `maxsize` entries in a namespace, dropping those expiring soonest at each purge."""
+        self._limits[namespace] = maxsize
+
+    def purge(self) -> int:
+        """Drop expired entries and leases, and trim namespaces over their limit."""
+        now = time.time()
+        removed = self._execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        self._execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+        for namespace, maxsize in self._limits.items():
+            removed += self._execute(
+                "DELETE FROM entries WHERE namespace = ? AND key IN ("
+                " SELECT key FROM entries WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, maxsize)
+            ).rowcount
+        return removed
+
+    def count(self, namespace: str) -> int:
+        return self._execute("SELECT COUNT(*) FROM entries WHERE namespace = ? AND expires_at > ?",
+                             (namespace, time.time())).fetchone()[0]
+
+    # -- leases -----------------------------------------------------------
+
+    def acquire(self, key: str, owner: str, ttl: float) -> bool:
+        """Take the lease on `key` for `ttl` seconds unless another owner holds a live one."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(ACQUIRE_LEASE, (key, owner, now + ttl, now))
+            row = self._conn.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+        return row is not None and row[0] == owner
+
+    def held(self, key: str) -> bool:
+        """Whether anyone holds a live lease on `key`."""
+        return self._execute("SELECT 1 FROM leases WHERE key = ? AND expires_at > ?",
+                             (key, time.time())).fetchone() is not None
+
+    def release(self, key: str, owner: str):
+        self._execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SharedTTLCache:
+    """
+    One namespace of a ResultStore with the get/set/touch interface of TTLCache.
+
+    Unlike TTLCache, values are copies: changes to a value must be written
+    back with `set`.
+    """
+
+    def __init__(self, store: ResultStore, namespace: str, ttl: float, maxsize: Optional[int] = None):
+        self.store = store
+        self.namespace = namespace
+        self.ttl = ttl
+        if maxsize:
+            store.limit(namespace, maxsize)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.store.get(self.namespace, key)
+        return default if value is None else value
+
+    def set(self, key: str, value: Any):
+        self.store.set(self.namespace, key, value, self.ttl)
+
+    def touch(self, key: str) -> bool:
+        return self.store.touch(self.namespace, key, self.ttl)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        value = self.get(key, default)
+        self.store.delete(self.namespace, key)
+        return value
+
+    def __len__(self) -> int:
+        return self.store.count(self.namespace)
+
+
+def open_result_store(db_path: Optional[str] = None) -> Optional[ResultStore]:
+    """Open the store at MCP_RESULT_STORE_PATH; None (per-process state only) if it cannot be opened."""
+    db_path = db_path or os.getenv("MCP_RESULT_STORE_PATH", DEFAULT_DB_PATH)
+    try:
+        return ResultStore(db_path)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not open result store at {db_path} ({e}); sessions and results stay per process")
+        return None
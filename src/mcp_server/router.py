@@ -0,0 +1,216 @@
+"""
+Routing of the MCP server's Ollama calls between a small and a large model.
+
+Simple requests go to a small, fast model (SMALL_MODEL_NAME) and everything
+else to the large one (MODEL_NAME). A request is simple when its prompt is
+short, the output it needs is short (a refinement, not a full analysis with
+several paths), and any feedback it carries asks for one or two things.
+While the large model already has ROUTER_LARGE_QUEUE_DEPTH generations in
+flight from this worker, requests are offloaded to the small model rather
+than queue behind them. Requests the small model fails (no response, or
+output that fails schema validation) are generated again by the large model
+("escalated").
+
+Each model keeps its own generation speed estimates (num_predict is sized
+from them), latency and acceptance rate. Without SMALL_MODEL_NAME every
+request goes to the large model.
+"""
+
+import os
+import re
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+# Weight of the newest measurement in the generation speed estimates
+SPEED_SMOOTHING = 0.2
+# Generations kept per model for latency percentiles
+LATENCY_WINDOW = 500
+# Rough prompt size in tokens from its length
+CHARS_PER_TOKEN = 4
+# Tokens of output each kind of request needs
+OUTPUT_TOKENS = {"analysis": 1200, "refinement": 400}
+
+# Why a request went where it did
+ONLY_MODEL = "only_model"
+SIMPLE = "simple"
+OFFLOADED = "offloaded"
+LONG_PROMPT = "long_prompt"
+LONG_OUTPUT = "long_output"
+COMPLEX_FEEDBACK = "complex_feedback"
+
+_CLAUSE_SPLIT = re.compile(r"[.;:!?,\n]|\band\b|\balso\b|\bplus\b")
+
+
+def feedback_asks(feedback: str) -> int:
+    """Roughly how many separate things a piece of feedback asks for."""
+    return sum(1 for clause in _CLAUSE_SPLIT.split(feedback.lower()) if len(clause.split()) >= 2)
+
+
+def _percentiles(values: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {
+        "p50": round(ordered[int(len(ordered) * 0.5)] * 1000, 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "max": round(ordered[-1] * 1000, 1),
+    }
+
+
+class ModelStats:
+    """Speed estimates, load and outcomes of one model."""
+
+    def __init__(self, name: str, tokens_per_second: float, prompt_seconds: float):
+        self.name = name
+        # Generation speed estimates used to fit num_predict to a deadline,
+        # refined from the timings Ollama reports on every request
+        self.tokens_per_second = tokens_per_second
+        self.prompt_seconds = prompt_seconds
+        self.in_flight = 0
+        self.counters = {"generations": 0, "accepted": 0, "rejected": 0}
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def observe(self, final: Dict, seconds: float):
+        """Update the speed estimates from Ollama's timing fields on the last stream chunk."""
+        self.counters["generations"] += 1
+        self.latencies.append(seconds)
+        eval_count = final.get("eval_count") or 0
+        eval_ns = final.get("eval_duration") or 0
+        if eval_count and eval_ns:
+            rate = eval_count / (eval_ns / 1e9)
+            self.tokens_per_second += SPEED_SMOOTHING * (rate - self.tokens_per_second)
+        prompt_ns = (final.get("prompt_eval_duration") or 0) + (final.get("load_duration") or 0)
+        if prompt_ns:
+            self.prompt_seconds += SPEED_SMOOTHING * (prompt_ns / 1e9 - self.prompt_seconds)
+
+    def snapshot(self) -> Dict:
+        judged = self.counters["accepted"] + self.counters["rejected"]
+        return {
+            **self.counters,
+            "acceptance_rate": round(self.counters["accepted"] / judged, 3) if judged else None,
+            "in_flight": self.in_flight,
+            "latency_ms": _percentiles(self.latencies),
+            "tokens_per_second": round(self.tokens_per_second, 2),
+            "prompt_seconds": round(self.prompt_seconds, 2),
+        }
+
+
+class ModelRouter:
+    """Picks the model for each request; one per server process, used from its event loop."""
+
+    def __init__(self, large: str, small: Optional[str] = None, prompt_tokens: int = 1500,
+                 feedback_words: int = 30, feedback_asks: int = 2, small_max_output: int = 800,
+                 large_queue_depth: int = 4, large_speed=(10.0, 5.0), small_speed=(40.0, 1.0)):
+        """
+        Args:
+            large: The model for complex requests, and the only one when `small` is None
+            small: The model for simple requests
+            prompt_tokens: Longer prompts (estimated) go to the large model
+            feedback_words: Longer feedback goes to the large model
+            feedback_asks: Feedback asking for more things than this goes to the large model
+            small_max_output: Requests needing more output tokens go to the large model
+            large_queue_depth: Large-model generations in flight at which requests are offloaded to the small model
+            large_speed, small_speed: Initial (tokens per second, prompt seconds) estimates
+        """
+        self.large = large
+        self.small = small if small and small != large else None
+        self.prompt_tokens = prompt_tokens
+        self.feedback_words = feedback_words
+        self.feedback_asks = feedback_asks
+        self.small_max_output = small_max_output
+        self.large_queue_depth = large_queue_depth
+        self.models = {large: ModelStats(large, *large_speed)}
+        if self.small:
+            self.models[self.small] = ModelStats(self.small, *small_speed)
+        self.routes: Dict[str, int] = {}
+        self.escalations = 0
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        return cls(
+            large=os.getenv("MODEL_NAME", "llama3.3:70b-instruct-q2_K"),
+            small=os.getenv("SMALL_MODEL_NAME") or None,
+            prompt_tokens=int(os.getenv("ROUTER_PROMPT_TOKENS", "1500")),
+            feedback_words=int(os.getenv("ROUTER_FEEDBACK_WORDS", "30")),
+            feedback_asks=int(os.getenv("ROUTER_FEEDBACK_ASKS", "2")),
+            small_max_output=int(os.getenv("ROUTER_SMALL_MAX_OUTPUT", "800")),
+            large_queue_depth=int(os.getenv("ROUTER_LARGE_QUEUE_DEPTH", "4")),
+            large_speed=(float(os.getenv("OLLAMA_TOKENS_PER_SECOND", "10")),
+                         float(os.getenv("OLLAMA_PROMPT_SECONDS", "5"))),
+            small_speed=(float(os.getenv("SMALL_MODEL_TOKENS_PER_SECOND", "40")),
+                         float(os.getenv("SMALL_MODEL_PROMPT_SECONDS", "1"))),
+        )
+
+    def stats(self, model: str) -> ModelStats:
+        stats = self.models.get(model)
+        if stats is None:
+            # A model named only by a caller; it starts with the large model's estimates
+            large = self.models[self.large]
+            stats = self.models[model] = ModelStats(model, large.tokens_per_second, large.prompt_seconds)
+        return stats
+
+    def _count(self, reason: str):
+        self.routes[reason] = self.routes.get(reason, 0) + 1
+
+    def complexity(self, kind: str, prompt: str, feedback: str = "") -> Optional[str]:
+        """Why a request needs the large model, or None if it is simple."""
+        if len(prompt) / CHARS_PER_TOKEN > self.prompt_tokens:
+            return LONG_PROMPT
+        if OUTPUT_TOKENS.get(kind, 0) > self.small_max_output:
+            return LONG_OUTPUT
+        if feedback and (len(feedback.split()) > self.feedback_words or feedback_asks(feedback) > self.feedback_asks):
+            return COMPLEX_FEEDBACK
+        return None
+
+    def choose(self, kind: str, prompt: str, feedback: str = "") -> str:
+        """
+        The model for a request.
+
+        Args:
+            kind: A key of OUTPUT_TOKENS, e.g. "analysis" or "refinement"
+            prompt: The full prompt, as if no session held earlier turns
+            feedback: User feedback the request carries, if any
+        """
+        if not self.small:
+            self._count(ONLY_MODEL)
+            return self.large
+        reason = self.complexity(kind, prompt, feedback)
+        if reason is None:
+            self._count(SIMPLE)
+            return self.small
+        if self.models[self.large].in_flight >= self.large_queue_depth:
+            self._count(OFFLOADED)
+            return self.small
+        self._count(reason)
+        return self.large
+
+    def escalation(self, model: str) -> Optional[str]:
+        """The model to retry with when `model`'s output was unusable, if any."""
+        if model == self.large:
+            return None
+        self.escalations += 1
+        return self.large
+
+    @contextmanager
+    def generating(self, model: str):
+        """Count a generation as in flight on `model` while the block runs."""
+        stats = self.stats(model)
+        stats.in_flight += 1
+        try:
+            yield stats
+        finally:
+            stats.in_flight -= 1
+
+    def record_validation(self, model: str, accepted: bool):
+        self.stats(model).counters["accepted" if accepted else "rejected"] += 1
+
+    def snapshot(self) -> Dict:
+        return {
+            "large": self.large,
+            "small": self.small,
+            "large_queue_depth": self.large_queue_depth,
+            "routes": dict(self.routes),
+            "escalations": self.escalations,
+            "models": {name: stats.snapshot() for name, stats in self.models.items()},
+        }
@@ -5,12 +5,68 @@ Provides LLM capabilities via simple HTTP API
 """
 
 import asyncio
-import json
+import hashlib
 import logging
-from typing import Any, Dict, List, Optional
-from aiohttp import web, ClientSession
+import math
+from typing import Any, Callable, Dict, List, Optional
+from aiohttp import web, ClientSession, ClientTimeout
 import aiohttp_cors
 import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.common import accounting, serialization
+from src.common.circuit_breaker import (
+    OLLAMA_BREAKER_DEFAULTS,
+    CircuitOpenError,
+    breaker_snapshots,
+    get_breaker,
+)
+from src.common.deadline import DEADLINE_HEADER, DISCONNECT, Deadline, DeadlineExceeded, deadline_stats
+from src.common.lru import TTLCache
+from src.common.profiling import (
+    MemorySnapshots,
+    SlowRequestProfiler,
+    StackSampler,
+    is_admin_request,
+    top_object_types,
+)
+from src.mcp_server.result_store import SharedTTLCache, open_result_store
+from src.mcp_server.router import ModelRouter
+
+# CPU profiles sample for ?seconds=N, clamped to this range
+MIN_PROFILE_SECONDS = 1
+MAX_PROFILE_SECONDS = 120
+# Rows returned for ?limit=N, clamped to 1..MAX_PROFILE_LIMIT
+MAX_PROFILE_LIMIT = 500
+
+# Chat-mode sessions keep at most this many messages after the initial analysis
+MAX_SESSION_MESSAGES = 20
+
+# Budget for requests that arrive without an X-Request-Deadline-Ms header, and the most one may ask for
+DEFAULT_DEADLINE_SECONDS = float(os.getenv("DEFAULT_DEADLINE_SECONDS", "60"))
+# How often a running generation checks whether its caller is still there
+DISCONNECT_POLL_SECONDS = 0.5
+# num_predict bounds: the configured maximum, and the least worth generating
+MAX_NUM_PREDICT = int(os.getenv("OLLAMA_MAX_NUM_PREDICT", "2048"))
+MIN_NUM_PREDICT = 64
+# Finished Ollama results are reused for identical requests for this long (0: only
+# while other workers wait for them, see RESULT_SHARE_SECONDS)
+RESULT_TTL = float(os.getenv("OLLAMA_RESULT_TTL", "3600"))
+RESULT_SHARE_SECONDS = 30
+# How often a worker waiting on another worker's generation checks for its result
+SINGLE_FLIGHT_POLL_SECONDS = 0.25
+# Batch analyses: profiles per request, and the budget for a whole batch when
+# the caller sends no X-Request-Deadline-Ms header (also the most it may ask for)
+MAX_BATCH_PROFILES = int(os.getenv("MAX_BATCH_PROFILES", "500"))
+BATCH_DEADLINE_SECONDS = float(os.getenv("BATCH_DEADLINE_SECONDS", "1800"))
+
+
+def json_response(data: Any, status: int = 200) -> web.Response:
+    """Like web.json_response, but encodes straight to bytes with the fast serializer."""
+    return web.Response(body=serialization.dumps(data), status=status, content_type=serialization.CONTENT_TYPE)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,19 +74,61 @@ logger = logging.getLogger(__name__)
 
 class AITrainingPlannerAPI:
     def __init__(self):
-        self.app = web.Application()
+        self.memory_snapshots = MemorySnapshots()
+        self.slow_requests = SlowRequestProfiler()
+        self.cpu_profile_running = False
+        self.app = web.Application(middlewares=[self.slow_request_middleware, self.accounting_middleware])
         self.setup_routes()
         self.setup_cors()
         
         # LLM Configuration
         self.model_url = os.getenv("OLLAMA_URL", "http://ollama:11434")
-        self.model_name = os.getenv("MODEL_NAME", "llama3.3:70b-instruct-q2_K")
+        # Simple requests go to SMALL_MODEL_NAME when it is set, the rest to MODEL_NAME;
+        # the router also keeps each model's speed estimates, latency and acceptance rate
+        self.router = ModelRouter.from_env()
+        self.model_name = self.router.large
+        
+        # Refine sessions keep Ollama's state from the analysis so follow-ups
+        # only send the new feedback. "generate" keeps the context token array,
+        # "chat" keeps the /api/chat message history.
+        self.session_mode = os.getenv("OLLAMA_SESSION_MODE", "generate")
+        # Fail fast to the fallback paths while Ollama is down (OLLAMA_BREAKER_* variables)
+        self.ollama_breaker = get_breaker("ollama", **OLLAMA_BREAKER_DEFAULTS)
+        # Sessions and finished results are shared with the other workers
+        # (see supervisor.py) through the result store when it is available
+        self.result_store = open_result_store()
+        # Store calls block on SQLite (and on other workers' writes), so they run here, off the event loop
+        self.store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-store")
+        session_max = int(os.getenv("REFINE_SESSION_MAX", "1000"))
+        session_ttl = float(os.getenv("REFINE_SESSION_TTL", "1800"))
+        if self.result_store is not None:
+            self.sessions = SharedTTLCache(self.result_store, "sessions", ttl=session_ttl, maxsize=session_max)
+        else:
+            self.sessions = TTLCache(maxsize=session_max, ttl=session_ttl)
+        # Identical Ollama requests in flight in this worker, by result key
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.lease_owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.result_stats = {"generated": 0, "cache_hits": 0, "joined": 0, "shared": 0, "store_errors": 0}
+        # Token usage of every generation, and the per-user and per-tenant budgets over it
+        self.ledger = accounting.get_ledger()
+        # Batch analyses in this worker share Ollama's parallel slots rather than queueing on them
+        self.batch_slots = asyncio.Semaphore(max(1, int(os.getenv("OLLAMA_NUM_PARALLEL", "1"))))
     
     def setup_routes(self):
         """Set up HTTP routes."""
         self.app.router.add_get("/health", self.health_check)
+        self.app.router.add_get("/metrics", self.metrics)
         self.app.router.add_post("/api/career/analyze", self.analyze_career_path)
+        self.app.router.add_post("/api/career/analyze:batch", self.analyze_career_batch)
         self.app.router.add_post("/api/career/refine", self.refine_career_path)
+        self.app.router.add_get("/admin/profile/cpu", self.profile_cpu)
+        self.app.router.add_post("/admin/profile/memory/snapshot", self.memory_snapshot)
+        self.app.router.add_get("/admin/profile/memory/diff", self.memory_diff)
+        self.app.router.add_post("/admin/profile/memory/stop", self.memory_stop)
+        self.app.router.add_get("/admin/profile/objects", self.object_types)
+        self.app.router.add_get("/admin/profile/slow-requests", self.slow_request_profiles)
+        self.app.router.add_post("/admin/profile/slow-requests", self.slow_request_profiles)
+        self.app.router.add_delete("/admin/profile/slow-requests", self.slow_request_profiles)
     
     def setup_cors(self):
         """Set up CORS."""
@@ -48,27 +146,198 @@ class AITrainingPlannerAPI:
             cors.add(route)
     
     async def health_check(self, request):
-        """Health check endpoint."""
-        return web.json_response({"status": "healthy", "service": "ai-training-planner"})
+        """Health check endpoint; an open Ollama circuit marks the service degraded."""
+        breakers = breaker_snapshots()
+        return json_response({
+            "status": "healthy",
+            "service": "ai-training-planner",
+            "degraded": any(b["state"] != "closed" for b in breakers.values()),
+            "circuit_breakers": breakers
+        })
+    
+    async def metrics(self, request):
+        """Deadline outcomes, per-model speed, latency and acceptance, and circuit breakers."""
+        large = self.router.stats(self.model_name)
+        return json_response({
+            "deadlines": {"default_seconds": DEFAULT_DEADLINE_SECONDS, **deadline_stats.snapshot()},
+            "ollama": {
+                "tokens_per_second": round(large.tokens_per_second, 2),
+                "prompt_seconds": round(large.prompt_seconds, 2),
+                "max_num_predict": MAX_NUM_PREDICT
+            },
+            "routing": self.router.snapshot(),
+            "results": {
+                **self.result_stats,
+                "ttl_seconds": RESULT_TTL,
+                "shared_store": self.result_store is not None,
+                "in_flight": len(self.in_flight),
+                "sessions": await self.off_loop(len, self.sessions)
+            },
+            "accounting": self.ledger.stats() if self.ledger else None,
+            "worker_pid": os.getpid(),
+            "circuit_breakers": breaker_snapshots()
+        })
+    
+    def request_deadline(self, request) -> Deadline:
+        """The caller's deadline from the request header, which also ends if the caller disconnects."""
+        return Deadline.from_header(
+            request.headers.get(DEADLINE_HEADER), DEFAULT_DEADLINE_SECONDS,
+            max_seconds=DEFAULT_DEADLINE_SECONDS,
+            client_gone=lambda: request.transport is None or request.transport.is_closing()
+        )
+    
+    @web.middleware
+    async def slow_request_middleware(self, request, handler):
+        """Collect samples for requests while slow-request profiling is enabled."""
+        if not self.slow_requests.enabled:
+            return await handler(request)
+        key = object()
+        self.slow_requests.begin(key, f"{request.method} {request.path}")
+        try:
+            return await handler(request)
+        finally:
+            self.slow_requests.end(key)
+    
+    @web.middleware
+    async def accounting_middleware(self, request, handler):
+        """Tag the request's LLM calls with the route, user and tenant the backend forwarded, if it is the backend."""
+        token = accounting.reset_tags({"route": request.path, **accounting.tags_from_headers(request.headers)})
+        try:
+            return await handler(request)
+        finally:
+            accounting.restore_tags(token)
+    
+    async def profile_cpu(self, request):
+        """Sample all threads for ?seconds=N and return collapsed stacks or speedscope JSON."""
+        if not is_admin_request(request.headers):
+            return json_response({"error": "Forbidden"}, status=403)
+        
+        try:
+            seconds = float(request.query.get("seconds", 10))
+        except ValueError:
+            return json_response({"error": "seconds must be a number"}, status=400)
+        if not math.isfinite(seconds):
+            return json_response({"error": "seconds must be a number"}, status=400)
+        seconds = min(max(seconds, MIN_PROFILE_SECONDS), MAX_PROFILE_SECONDS)
+        output_format = request.query.get("format", "collapsed")
+        if output_format not in ("collapsed", "speedscope"):
+            return json_response({"error": "format must be 'collapsed' or 'speedscope'"}, status=400)
+        if self.cpu_profile_running:
+            return json_response({"error": "A CPU profile is already running"}, status=409)
+        
+        # The sampler runs on its own thread, so the event loop keeps serving
+        # requests (and shows up in the profile) while we wait.
+        self.cpu_profile_running = True
+        sampler = StackSampler().start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+            self.cpu_profile_running = False
+        
+        if output_format == "speedscope":
+            return json_response(sampler.to_speedscope(name="mcp-server"))
+        return web.Response(text=sampler.to_collapsed(), content_type="text/plain")
+    
+    async def memory_snapshot(self, request):
+        """Take a named tracemalloc snapshot (?label=...)."""
+        if not is_admin_request(request.headers):
+            return json_response({"error": "Forbidden"}, status=403)
+        return json_response(self.memory_snapshots.take(request.query.get("label", "baseline")))
+    
+    async def memory_diff(self, request):
+        """Diff snapshot ?from=... against ?to=... or the current heap."""
+        if not is_admin_request(request.headers):
+            return json_response({"error": "Forbidden"}, status=403)
+        try:
+            limit = min(max(int(request.query.get("limit", 25)), 1), MAX_PROFILE_LIMIT)
+        except ValueError:
+            return json_response({"error": "limit must be an integer"}, status=400)
+        try:
+            diff = self.memory_snapshots.diff(
+                request.query.get("from", "baseline"),
+                request.query.get("to"),
+                limit=limit
+            )
+        except KeyError as e:
+            return json_response({"error": f"Unknown snapshot: {e}"}, status=404)
+        return json_response(diff)
+    
+    async def memory_stop(self, request):
+        """Stop tracemalloc and drop all snapshots."""
+        if not is_admin_request(request.headers):
+            return json_response({"error": "Forbidden"}, status=403)
+        self.memory_snapshots.stop()
+        return json_response({"status": "stopped"})
+    
+    async def object_types(self, request):
+        """Report the top live object types by total size."""
+        if not is_admin_request(request.headers):
+            return json_response({"error": "Forbidden"}, status=403)
+        try:
+            limit = min(max(int(request.query.get("limit", 25)), 1), MAX_PROFILE_LIMIT)
+        except ValueError:
+            return json_response({"error": "limit must be an integer"}, status=400)
+        return json_response(top_object_types(limit=limit))
+    
+    async def slow_request_profiles(self, request):
+        """
+        GET returns captured slow-request profiles, POST ?threshold_ms=N enables
+        capture and DELETE disables it.
+        """
+        if not is_admin_request(request.headers):
+            return json_response({"error": "Forbidden"}, status=403)
+        
+        if request.method == "POST":
+            if "threshold_ms" not in request.query:
+                return json_response({"error": "Missing required parameter: threshold_ms"}, status=400)
+            try:
+                threshold_ms = float(request.query["threshold_ms"])
+            except ValueError:
+                return json_response({"error": "threshold_ms must be a number"}, status=400)
+            if not math.isfinite(threshold_ms) or threshold_ms < 0:
+                return json_response({"error": "threshold_ms must be a non-negative number"}, status=400)
+            self.slow_requests.enable(threshold_ms)
+        elif request.method == "DELETE":
+            self.slow_requests.disable()
+        
+        return json_response({**self.slow_requests.status(), "profiles": list(self.slow_requests.profiles)})
     
     async def analyze_career_path(self, request):
         """Analyze user data and provide career path recommendations."""
         try:
-            data = await request.json()
+            data = serialization.loads(await request.read())
             user_data = data.get("user_data", {})
             career_preferences = data.get("career_preferences", "")
             
             if not user_data or not career_preferences:
-                return web.json_response(
+                return json_response(
                     {"error": "Missing required fields: user_data and career_preferences"}, 
                     status=400
                 )
             
-            # Create structured career path recommendations
-            career_paths = await self.generate_career_paths(user_data, career_preferences)
+            # Batch callers skip the refine session and want an error rather
+            # than the canned fallback paths when the LLM fails
+            open_session = data.get("open_session", True)
+            allow_fallback = data.get("allow_fallback", True)
+            
+            # Create structured career path recommendations, keeping the LLM
+            # state in a session so refinements can continue from it
+            session = {"user_data": user_data} if open_session else None
+            career_paths = await self.generate_career_paths(
+                user_data, career_preferences, session, allow_fallback=allow_fallback,
+                deadline=self.request_deadline(request)
+            )
+            if career_paths is None:
+                return json_response({"error": "LLM generation failed"}, status=502)
+            session_id = None
+            if open_session:
+                session_id = uuid.uuid4().hex
+                await self.off_loop(self.sessions.set, session_id, session)
             
             response = {
                 "career_paths": career_paths,
+                "session_id": session_id,
                 "user_analysis": {
                     "current_level": "intermediate" if len(user_data.get("completed_badges", [])) > 3 else "beginner",
                     "strengths": user_data.get("completed_badges", []),
@@ -76,71 +345,215 @@ class AITrainingPlannerAPI:
                 }
             }
             
-            return web.json_response(response)
+            return json_response(response)
             
         except Exception as e:
             logger.error(f"Error in analyze_career_path: {e}")
-            return web.json_response({"error": str(e)}, status=500)
+            return json_response({"error": str(e)}, status=500)
+    
+    async def analyze_career_batch(self, request):
+        """
+        Analyze many profiles, streaming an NDJSON line for each as it finishes.
+        
+        The body holds "profiles", each with "user_data", "career_preferences"
+        (or the batch-wide "career_preferences") and an optional "id" echoed
+        back. Profiles that produce the same prompt are generated once, and
+        at most OLLAMA_NUM_PARALLEL generations run at a time.
+        
+        Each profile gets exactly one line with its "index" and a "status":
+        "ok" with "career_paths", "invalid" or "failed" with an "error". The
+        batch does not stop at failed profiles, and the stream ends with a
+        "summary" line; a stream without one was cut short. Batch analyses do
+        not open refine sessions, and fail instead of returning the fallback
+        paths unless "allow_fallback" is set.
+        """
+        try:
+            data = serialization.loads(await request.read())
+        except ValueError:
+            return json_response({"error": "Request body must be JSON"}, status=400)
+        profiles = data.get("profiles") if isinstance(data, dict) else None
+        if not isinstance(profiles, list) or not profiles:
+            return json_response({"error": "Missing required field: profiles"}, status=400)
+        if len(profiles) > MAX_BATCH_PROFILES:
+            return json_response({"error": f"At most {MAX_BATCH_PROFILES} profiles per batch"}, status=400)
+        default_preferences = data.get("career_preferences", "")
+        allow_fallback = data.get("allow_fallback", False)
+        deadline = Deadline.from_header(
+            request.headers.get(DEADLINE_HEADER), BATCH_DEADLINE_SECONDS,
+            max_seconds=BATCH_DEADLINE_SECONDS,
+            client_gone=lambda: request.transport is None or request.transport.is_closing()
+        )
+        # Profile ids name the users to account to only when the backend sent them
+        trusted = accounting.trusted_caller(request.headers)
+        started = time.monotonic()
+        
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        counts = {"ok": 0, "invalid": 0, "failed": 0}
+        
+        async def emit(index: int, line: Dict):
+            counts[line["status"]] += 1
+            profile = profiles[index]
+            line = {"index": index, "id": profile.get("id") if isinstance(profile, dict) else None, **line}
+            await response.write(serialization.dumps(line) + b"\n")
+        
+        # Profiles by prompt, in order of first appearance
+        groups: Dict[str, List[int]] = {}
+        inputs: Dict[str, tuple] = {}
+        for index, profile in enumerate(profiles):
+            # The stream has started, so a malformed profile gets its own line rather than an error response
+            try:
+                if not isinstance(profile, dict):
+                    raise ValueError("Profile must be an object")
+                user_data = profile.get("user_data")
+                career_preferences = profile.get("career_preferences") or default_preferences
+                if not user_data or not career_preferences:
+                    raise ValueError("Missing user_data or career_preferences")
+                if not isinstance(user_data, dict) or not isinstance(career_preferences, str):
+                    raise ValueError("user_data must be an object and career_preferences a string")
+                prompt = self.create_career_analysis_prompt(user_data, career_preferences)
+            except ValueError as e:
+                await emit(index, {"status": "invalid", "error": str(e)})
+                continue
+            except TypeError as e:
+                await emit(index, {"status": "invalid", "error": f"Malformed user_data: {e}"})
+                continue
+            key = hashlib.sha256(prompt.encode()).hexdigest()
+            groups.setdefault(key, []).append(index)
+            inputs.setdefault(key, (user_data, career_preferences))
+        
+        tasks = [
+            asyncio.ensure_future(self.analyze_batch_profile(
+                key, *inputs[key], allow_fallback, deadline,
+                user=profiles[groups[key][0]].get("id") if trusted else None
+            ))
+            for key in groups
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                key, line = await finished
+                first, *duplicates = groups[key]
+                await emit(first, line)
+                for index in duplicates:
+                    await emit(index, {**line, "duplicate_of": first})
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        await response.write(serialization.dumps({"summary": {
+            "profiles": len(profiles),
+            "unique": len(groups),
+            **counts,
+            "seconds": round(time.monotonic() - started, 2)
+        }}) + b"\n")
+        await response.write_eof()
+        return response
+    
+    async def analyze_batch_profile(self, key: str, user_data: Dict, career_preferences: str,
+                                    allow_fallback: bool, deadline: Deadline, user: Optional[str] = None) -> tuple:
+        """One unique profile of a batch, generated in a free Ollama slot: (key, result line)."""
+        # Each task has its own copy of the request's context, so this tags only the profile's own calls
+        accounting.tag(user=user)
+        try:
+            async with self.batch_slots:
+                reason = deadline.abandon_reason()
+                if reason:
+                    return key, {"status": "failed", "error": f"Batch {reason} before this profile started"}
+                career_paths = await self.generate_career_paths(
+                    user_data, career_preferences, allow_fallback=allow_fallback, deadline=deadline
+                )
+        except Exception as e:
+            logger.error(f"Error in batch career analysis: {e}")
+            return key, {"status": "failed", "error": str(e)}
+        if career_paths is None:
+            reason = deadline.abandon_reason()
+            return key, {"status": "failed", "error": f"Batch {reason}" if reason else "LLM generation failed"}
+        return key, {"status": "ok", "career_paths": career_paths}
     
     async def refine_career_path(self, request):
         """Refine a career path based on user feedback."""
         try:
-            data = await request.json()
+            data = serialization.loads(await request.read())
             user_data = data.get("user_data", {})
             selected_path = data.get("selected_path", "")
             user_feedback = data.get("user_feedback", "")
             
             if not all([user_data, selected_path, user_feedback]):
-                return web.json_response(
+                return json_response(
                     {"error": "Missing required fields: user_data, selected_path, and user_feedback"}, 
                     status=400
                 )
             
+            # Continue the analysis session when the client has one
+            session_id = data.get("session_id")
+            session = await self.off_loop(self.sessions.get, session_id) if session_id else None
+            if session is not None and session.get("user_data") != user_data:
+                # The session holds the analysis of another profile (or an older version of
+                # this one), so the refinement starts a fresh session instead of continuing it
+                session_id = uuid.uuid4().hex
+                session = {"user_data": user_data}
+
             # Create refined recommendations based on feedback
-            refined_response = await self.generate_refined_path(user_data, selected_path, user_feedback)
+            refined_response = await self.generate_refined_path(
+                user_data, selected_path, user_feedback, session, deadline=self.request_deadline(request)
+            )
+            if session is not None:
+                # Written back rather than touched: the session is a copy when shared between workers
+                await self.off_loop(self.sessions.set, session_id, session)
+                refined_response = {**refined_response, "session_id": session_id}
             
-            return web.json_response(refined_response)
+            return json_response(refined_response)
             
         except Exception as e:
             logger.error(f"Error in refine_career_path: {e}")
-            return web.json_response({"error": str(e)}, status=500)
+            return json_response({"error": str(e)}, status=500)
     
-    async def generate_career_paths(self, user_data: Dict, career_preferences: str) -> List[Dict]:
-        """Generate career paths using LLM or fallback to structured responses."""
+    async def generate_career_paths(self, user_data: Dict, career_preferences: str,
+                                    session: Optional[Dict] = None,
+                                    allow_fallback: bool = True,
+                                    deadline: Optional[Deadline] = None) -> Optional[List[Dict]]:
+        """
+        Generate career paths using LLM or fallback to structured responses.
+        
+        Returns None instead of the fallback paths when allow_fallback is False.
+        """
         try:
             # Try to use Ollama for dynamic generation
             prompt = self.create_career_analysis_prompt(user_data, career_preferences)
-            llm_response = await self.call_ollama(prompt)
-            
-            if llm_response:
-                try:
-                    # Parse JSON response from LLM
-                    paths = json.loads(llm_response)
-                    if isinstance(paths, list) and len(paths) > 0:
-                        return paths
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse LLM response as JSON, using fallback")
+            # Parse and validate the JSON response from the LLM in one pass
+            paths = await self.generate_routed(
+                "analysis", prompt, serialization.decode_career_paths, deadline, session=session
+            )
+            if paths:
+                return paths
             
         except Exception as e:
             logger.warning(f"Error calling LLM: {e}, using fallback")
         
+        if not allow_fallback:
+            return None
+        
         # Fallback to structured career paths
         return self.create_fallback_career_paths(user_data, career_preferences)
     
-    async def generate_refined_path(self, user_data: Dict, selected_path: str, user_feedback: str) -> Dict:
+    async def generate_refined_path(self, user_data: Dict, selected_path: str, user_feedback: str,
+                                    session: Optional[Dict] = None,
+                                    deadline: Optional[Deadline] = None) -> Dict:
         """Generate refined career path based on feedback."""
         try:
             # Try to use Ollama for dynamic refinement
-            prompt = self.create_refinement_prompt(user_data, selected_path, user_feedback)
-            llm_response = await self.call_ollama(prompt)
-            
-            if llm_response:
-                try:
-                    refined = json.loads(llm_response)
-                    if isinstance(refined, dict):
-                        return refined
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse refinement response as JSON")
+            refined = await self.generate_routed(
+                "refinement",
+                self.create_refinement_prompt(user_data, selected_path, user_feedback),
+                serialization.decode_refined_path,
+                deadline,
+                session=session,
+                # Enough when the model already holds the profile and the analysis
+                followup_prompt=self.create_followup_refinement_prompt(selected_path, user_feedback),
+                feedback=user_feedback
+            )
+            if refined:
+                return refined
         
         except Exception as e:
             logger.warning(f"Error calling LLM for refinement: {e}")
@@ -205,32 +618,376 @@ class AITrainingPlannerAPI:
 
         Please provide a refined career path as JSON with 'refined_path', 'personalized_advice', and 'resources' fields."""
     
-    async def call_ollama(self, prompt: str) -> Optional[str]:
-        """Call Ollama API for LLM generation."""
+    def create_followup_refinement_prompt(self, selected_path, user_feedback: str) -> str:
+        """Create a short follow-up prompt for a session that already holds the analysis."""
+        if isinstance(selected_path, dict):
+            selected_path = selected_path.get("description", "")
+        return f"""The user selected this career path from your previous answer: {selected_path}
+        User Feedback: {user_feedback}
+
+        Please provide a refined career path as JSON with 'refined_path', 'personalized_advice', and 'resources' fields."""
+    
+    async def generate_routed(self, kind: str, prompt: str, decode: Callable[[str], Any],
+                              deadline: Optional[Deadline] = None, session: Optional[Dict] = None,
+                              followup_prompt: Optional[str] = None, feedback: str = "") -> Any:
+        """
+        Generate with the model the router picks for the request, and decode the response.
+        
+        When the small model's call fails (an error, a timeout, a model Ollama
+        does not have) or `decode` rejects its output (returns a falsy value
+        for it), the large model generates the response again while the
+        deadline allows, with the session as it was before the failed turn.
+        
+        Args:
+            kind: The kind of request, for the router ("analysis" or "refinement")
+            prompt: The complete prompt
+            decode: Parses and validates the response text
+            deadline: Budget for all attempts together
+            session: Refine session to continue and update
+            followup_prompt: Shorter prompt to send instead when the session already holds the conversation
+            feedback: The user feedback in the prompt, if any
+        
+        Returns:
+            The decoded response, or None if no model produced a usable one
+        """
+        # One deadline for all attempts, so an escalation only gets what the first attempt left
+        deadline = deadline or Deadline.after(DEFAULT_DEADLINE_SECONDS)
+        model = self.router.choose(kind, prompt, feedback)
+        saved = dict(session) if session is not None else None
+        while model:
+            if session is None:
+                llm_response = await self.call_ollama(prompt, deadline, model)
+            else:
+                continues = followup_prompt and self.session_continues(session, model)
+                llm_response = await self.call_ollama_session(
+                    followup_prompt if continues else prompt, session, deadline, model
+                )
+            
+            if llm_response is None:
+                failure = "No response from"
+            else:
+                value = decode(llm_response) if llm_response else None
+                self.router.record_validation(model, bool(value))
+                if value:
+                    return value
+                failure = "Failed to parse response from"
+            failed = model
+            model = None if deadline.abandon_reason() else self.router.escalation(failed)
+            logger.warning(f"{failure} {failed} for {kind}" + (f"; escalating to {model}" if model else ""))
+            if session is not None:
+                session.clear()
+                session.update(saved)
+        return None
+    
+    def session_continues(self, session: Dict, model: str) -> bool:
+        """Whether `model` can carry on the session's conversation without the full prompt."""
+        if self.session_mode == "chat":
+            return bool(session.get("messages"))
+        # Context token arrays only mean something to the model that produced them
+        return bool(session.get("context")) and session.get("model", self.model_name) == model
+    
+    async def call_ollama(self, prompt: str, deadline: Optional[Deadline] = None,
+                          model: Optional[str] = None) -> Optional[str]:
+        """Call Ollama API for LLM generation (with the large model unless `model` is given)."""
+        payload = {"model": model or self.model_name, "prompt": prompt}
+        result = await self.ollama_request("/api/generate", payload, deadline)
+        return result.get("response", "") if result else None
+    
+    async def call_ollama_session(self, prompt: str, session: Dict,
+                                  deadline: Optional[Deadline] = None,
+                                  model: Optional[str] = None) -> Optional[str]:
+        """
+        Call Ollama continuing a refine session, and store the updated state on it.
+        
+        In "generate" mode the previous context token array is sent back so the
+        model does not reprocess the earlier conversation, as long as the same
+        model produced it; in "chat" mode the message history is sent to
+        /api/chat, whichever model wrote the earlier replies.
+        """
+        model = model or self.model_name
+        if self.session_mode == "chat":
+            messages = session.get("messages", []) + [{"role": "user", "content": prompt}]
+            result = await self.ollama_request("/api/chat", {"model": model, "messages": messages}, deadline)
+            if not result:
+                return None
+            reply = result.get("message", {})
+            messages.append({"role": "assistant", "content": reply.get("content", "")})
+            # Keep the analysis exchange plus the most recent turns
+            if len(messages) > MAX_SESSION_MESSAGES:
+                messages = messages[:2] + messages[-(MAX_SESSION_MESSAGES - 2):]
+            session["messages"] = messages
+            return reply.get("content", "")
+        
+        payload = {"model": model, "prompt": prompt}
+        if session.get("context") and session.get("model", self.model_name) == model:
+            payload["context"] = session["context"]
+        result = await self.ollama_request("/api/generate", payload, deadline)
+        if not result:
+            return None
+        if result.get("context"):
+            session["context"] = result["context"]
+            session["model"] = model
+        return result.get("response", "")
+    
+    def num_predict_for(self, deadline: Deadline, model: str) -> int:
+        """
+        Token limit that lets the generation finish before the deadline.
+        
+        Based on the model's measured generation speed and prompt-processing
+        time over recent requests; 0 means there is not enough time left to be useful.
+        """
+        stats = self.router.stats(model)
+        budget = deadline.remaining() - stats.prompt_seconds
+        tokens = min(int(budget * stats.tokens_per_second), MAX_NUM_PREDICT)
+        return tokens if tokens >= MIN_NUM_PREDICT else 0
+    
+    def result_key(self, endpoint: str, payload: Dict) -> str:
+        """Identifies a request by model, endpoint and payload (prompt, context or messages)."""
+        request = serialization.dumps({"model": self.model_name, "endpoint": endpoint, **payload})
+        return hashlib.sha256(request).hexdigest()
+    
+    async def ollama_request(self, endpoint: str, payload: Dict,
+                             deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Ollama's response to a request, generated once for identical concurrent requests.
+        
+        A finished result is reused for OLLAMA_RESULT_TTL seconds. While one
+        is being generated, identical requests in this worker wait for it, and
+        those in other workers wait for it to appear in the result store
+        (the generating worker holds a lease on it) or for the lease to lapse,
+        in which case one of them generates it instead.
+        
+        Returns None as generate_once does.
+        """
+        deadline = deadline or Deadline.after(DEFAULT_DEADLINE_SECONDS)
+        key = self.result_key(endpoint, payload)
+        running = self.in_flight.get(key)
+        if running is not None:
+            self.result_stats["joined"] += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(running), timeout=deadline.remaining())
+            except asyncio.TimeoutError:
+                return None
+        
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        result = None
         try:
-            async with ClientSession() as session:
-                async with session.post(
-                    f"{self.model_url}/api/generate",
-                    json={
-                        "model": self.model_name,
-                        "prompt": prompt,
-                        "stream": False,
-                        "options": {
-                            "temperature": 0.7,
-                            "top_p": 0.9
-                        }
-                    },
-                    timeout=60
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("response", "")
-                    else:
-                        logger.error(f"Ollama API returned status {response.status}")
+            result = await self.shared_request(key, endpoint, payload, deadline)
+            return result
+        finally:
+            del self.in_flight[key]
+            future.set_result(result)
+    
+    async def off_loop(self, call: Callable, *args) -> Any:
+        """Run a blocking result-store or session call on the store's thread."""
+        return await asyncio.get_running_loop().run_in_executor(self.store_executor, call, *args)
+    
+    async def shared_request(self, key: str, endpoint: str, payload: Dict, deadline: Deadline) -> Optional[Dict]:
+        """The request's result from the result store, another worker's generation, or generate_once."""
+        store = self.result_store
+        if store is None:
+            return await self.generate_once(endpoint, payload, deadline)
+        try:
+            cached = await self.off_loop(store.get, "results", key)
+            if cached is not None:
+                self.result_stats["cache_hits"] += 1
+                return cached
+            while not await self.off_loop(store.acquire, key, self.lease_owner,
+                                          deadline.remaining() + DISCONNECT_POLL_SECONDS):
+                # Another worker is generating this; its lease lapses at its deadline at the latest
+                while await self.off_loop(store.held, key):
+                    if deadline.abandon_reason():
                         return None
+                    await asyncio.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+                cached = await self.off_loop(store.get, "results", key)
+                if cached is not None:
+                    self.result_stats["shared"] += 1
+                    return cached
+        except sqlite3.Error as e:
+            self.result_stats["store_errors"] += 1
+            logger.warning(f"Result store unavailable ({e}); generating without it")
+            return await self.generate_once(endpoint, payload, deadline)
+        
+        result = None
+        try:
+            result = await self.generate_once(endpoint, payload, deadline)
+            # Only complete generations are worth reusing, not ones cut short by num_predict
+            if result is not None and result.get("done_reason", "stop") == "stop":
+                await self.off_loop(store.set, "results", key, result, max(RESULT_TTL, RESULT_SHARE_SECONDS))
+            return result
+        except sqlite3.Error as e:
+            self.result_stats["store_errors"] += 1
+            logger.warning(f"Could not store Ollama result: {e}")
+            return result
+        finally:
+            try:
+                await self.off_loop(store.release, key, self.lease_owner)
+            except sqlite3.Error:
+                pass
+    
+    async def generate_once(self, endpoint: str, payload: Dict,
+                            deadline: Optional[Deadline] = None) -> Optional[Dict]:
+        """
+        Stream a request to Ollama and return the assembled response.
+        
+        The response has the same shape as a non-streaming Ollama reply. The
+        generation is limited with num_predict to fit the deadline, and the
+        stream is closed (which stops Ollama generating) as soon as the
+        deadline passes or the caller disconnects.
+        
+        Returns None (so callers use their fallback) on errors, when there is
+        not enough time left, when the caller's user or tenant has used up its
+        token budget, and immediately while the Ollama circuit breaker is open.
+        """
+        deadline = deadline or Deadline.after(DEFAULT_DEADLINE_SECONDS)
+        over_budget = self.ledger.over_budget() if self.ledger else None
+        if over_budget:
+            logger.warning(f"Skipping Ollama call: {over_budget} token budget used up")
+            return None
+        model = payload.get("model", self.model_name)
+        num_predict = self.num_predict_for(deadline, model)
+        if not num_predict:
+            deadline_stats.increment("skipped_insufficient_budget")
+            logger.warning(f"Skipping Ollama call: only {deadline.remaining():.1f}s left")
+            return None
+        try:
+            self.ollama_breaker.check()
+        except CircuitOpenError as e:
+            logger.warning(f"Skipping Ollama call: {e}")
+            return None
+        if num_predict < MAX_NUM_PREDICT:
+            deadline_stats.increment("num_predict_limited")
+        
+        self.result_stats["generated"] += 1
+        started = time.monotonic()
+        try:
+            # Counted while streaming, so the router sees how deep each model's queue is
+            with self.router.generating(model):
+                async with ClientSession() as session:
+                    async with session.post(
+                        f"{self.model_url}{endpoint}",
+                        data=serialization.dumps({
+                            "model": model,
+                            **payload,
+                            "stream": True,
+                            "options": {
+                                "temperature": 0.7,
+                                "top_p": 0.9,
+                                "num_predict": num_predict
+                            }
+                        }),
+                        headers={"Content-Type": serialization.CONTENT_TYPE},
+                        timeout=ClientTimeout(total=deadline.remaining())
+                    ) as response:
+                        if response.status != 200:
+                            status = response.status
+                            result = None
+                        else:
+                            status = 200
+                            result = await self.read_ollama_stream(response, endpoint, deadline, started,
+                                                                       self.prompt_fingerprint(payload), model)
+        except DeadlineExceeded as e:
+            # Our budget ran out (or our caller left); that says nothing about Ollama's health
+            self.ollama_breaker.release()
+            logger.warning(f"Abandoned Ollama generation after {time.monotonic() - started:.1f}s: {e}")
+            return None
+        except asyncio.CancelledError:
+            self.ollama_breaker.release()
+            raise
         except Exception as e:
+            self.ollama_breaker.record_failure(time.monotonic() - started)
             logger.error(f"Error calling Ollama API: {e}")
             return None
+        
+        latency = time.monotonic() - started
+        if status >= 500:
+            self.ollama_breaker.record_failure(latency)
+        else:
+            self.ollama_breaker.record_success(latency)
+        if status != 200:
+            logger.error(f"Ollama API returned status {status}")
+            return None
+        return result
+    
+    def prompt_fingerprint(self, payload: Dict) -> int:
+        """Identifies the prompt (the latest message in chat mode) in the token ledger."""
+        messages = payload.get("messages")
+        return accounting.prompt_fingerprint(messages[-1].get("content", "") if messages else payload.get("prompt", ""))
+    
+    def record_usage(self, final: Dict, model: str, prompt: int, abandoned: bool = False):
+        if self.ledger:
+            self.ledger.record(final, model, prompt, abandoned=abandoned)
+    
+    async def read_ollama_stream(self, response, endpoint: str, deadline: Deadline, started: float,
+                                 prompt: Optional[int] = None, model: Optional[str] = None) -> Dict:
+        """
+        Collect streamed chunks until Ollama reports done.
+        
+        Checks the deadline and the caller's connection at least every
+        DISCONNECT_POLL_SECONDS, even while Ollama is still processing the
+        prompt, and closes the connection to stop generation when either is gone.
+        Raises DeadlineExceeded in that case.
+        """
+        model = model or self.model_name
+        parts: List[str] = []
+        final: Dict = {}
+        pending = None
+        
+        def abandon(reason: str):
+            deadline_stats.increment(f"abandoned_{reason}")
+            deadline_stats.increment("tokens_abandoned", len(parts))
+            deadline_stats.increment("seconds_abandoned", time.monotonic() - started)
+            response.close()
+            # Ollama sends no counts for a stream cut short; chunks are tokens, and the time is an upper bound
+            elapsed_ns = int((time.monotonic() - started) * 1e9)
+            self.record_usage({"eval_count": len(parts), "eval_duration": elapsed_ns}, model, prompt, abandoned=True)
+        
+        try:
+            while True:
+                reason = deadline.abandon_reason()
+                if reason:
+                    abandon(reason)
+                    raise DeadlineExceeded(reason)
+                
+                if pending is None:
+                    pending = asyncio.ensure_future(response.content.readline())
+                done, _ = await asyncio.wait(
+                    {pending}, timeout=max(0.0, min(deadline.remaining(), DISCONNECT_POLL_SECONDS))
+                )
+                if not done:
+                    continue
+                line, pending = pending.result(), None
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                
+                chunk = serialization.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                if endpoint == "/api/chat":
+                    parts.append(chunk.get("message", {}).get("content", ""))
+                else:
+                    parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    final = chunk
+                    break
+        except asyncio.CancelledError:
+            # aiohttp cancels the handler when the caller disconnects
+            abandon(DISCONNECT)
+            raise
+        finally:
+            if pending is not None:
+                pending.cancel()
+        
+        self.router.stats(model).observe(final, time.monotonic() - started)
+        self.record_usage(final, model, prompt)
+        text = "".join(parts)
+        if endpoint == "/api/chat":
+            return {**final, "message": {"role": "assistant", "content": text}}
+        return {**final, "response": text}
     
     def create_fallback_career_paths(self, user_data: Dict, career_preferences: str) -> List[Dict]:
         """Create fallback career paths when LLM is not available."""
@@ -389,9 +1146,18 @@ def main():
     host = os.getenv("MCP_HOST", "0.0.0.0")
     port = int(os.getenv("MCP_PORT", "8080"))
     
+    workers = int(os.getenv("MCP_WORKERS", "1"))
+    drain_seconds = float(os.getenv("MCP_DRAIN_SECONDS", "120"))
+    # Per-user budgets are meaningless when no caller's user can be trusted
+    accounting.check_service_token()
+    
     logger.info(f"Starting AI Training Planner API server on {host}:{port}")
     
-    web.run_app(init(), host=host, port=port)
+    if workers > 1:
+        from src.mcp_server.supervisor import DEFAULT_PIDFILE, Supervisor
+        Supervisor(workers, host, port, drain_seconds, pidfile=os.getenv("MCP_PIDFILE", DEFAULT_PIDFILE)).run()
+        return
+    web.run_app(init(), host=host, port=port, shutdown_timeout=drain_seconds)
 
 if __name__ == "__main__":
     main()
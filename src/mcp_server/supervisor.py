@@ -0,0 +1,211 @@
+"""
+Run several MCP server workers on one port.
+
+Each worker is a process with its own event loop, listening on the same
+host:port with SO_REUSEPORT so the kernel spreads connections across them;
+state they must agree on lives in the shared result store. The supervisor
+restarts workers that exit unexpectedly, backing off while they keep
+crashing. On SIGHUP it replaces them one at a time: the new worker is
+listening before the old one gets SIGTERM, and the old one stops accepting
+connections and finishes its in-flight requests, LLM streams included, for
+up to MCP_DRAIN_SECONDS before it exits.
+
+    MCP_WORKERS=4 python -m src.mcp_server.server   # starts the supervisor
+    python -m src.mcp_server.supervisor reload      # rolling restart
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIDFILE = "/tmp/mcp-supervisor.pid"
+POLL_SECONDS = 0.5
+# A worker must be listening with its app initialised within this long
+WORKER_START_SECONDS = 30.0
+# Workers that exit sooner than this after starting count as crash-looping
+MIN_UPTIME_SECONDS = 10.0
+MAX_BACKOFF_SECONDS = 30.0
+BACKLOG = 512
+
+
+def listen(host: str, port: int) -> socket.socket:
+    """A listening socket that other workers can bind to the same address as well."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    return sock
+
+
+def run_worker(host: str, port: int, ready, drain_seconds: float):
+    """Worker process: listen, initialise the app, report ready, and serve until SIGTERM, then drain."""
+    from aiohttp import web
+
+    from src.mcp_server.server import init
+
+    async def init_then_report():
+        app = await init()
+        # Only a worker whose app (result store included) came up counts as started;
+        # connections queue on the socket in the meantime
+        ready.set()
+        logger.info(f"Worker {os.getpid()} listening on {host}:{port}")
+        return app
+
+    # Reload requests are for the supervisor
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    sock = listen(host, port)
+    web.run_app(init_then_report(), sock=sock, shutdown_timeout=drain_seconds, print=None)
+
+
+class Supervisor:
+    """Keeps `workers` server processes running on host:port."""
+
+    def __init__(self, workers: int, host: str, port: int, drain_seconds: float = 120.0,
+                 pidfile: Optional[str] = DEFAULT_PIDFILE):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.drain_seconds = drain_seconds
+        self.pidfile = pidfile
+        self.context = multiprocessing.get_context()
+        self.slots: List[Optional[multiprocessing.Process]] = [None] * workers
+        self.started_at = [0.0] * workers
+        self.failures = [0] * workers
+        self.next_start = [0.0] * workers
+        # Replaced workers finishing their in-flight requests, with the time to kill them by
+        self.draining: List[tuple] = []
+        self.restarts = 0
+        self._reload = False
+        self._stopping = False
+
+    def start_worker(self, slot: int) -> bool:
+        ready = self.context.Event()
+        process = self.context.Process(
+            target=run_worker, args=(self.host, self.port, ready, self.drain_seconds), name=f"mcp-worker-{slot}"
+        )
+        process.start()
+        self.slots[slot] = process
+        self.started_at[slot] = time.monotonic()
+        if not ready.wait(WORKER_START_SECONDS):
+            logger.error(f"Worker {slot} (pid {process.pid}) did not start")
+            return False
+        return True
+
+    def retire(self, process: multiprocessing.Process):
+        """SIGTERM a worker; it drains, and is killed if still running after the drain period."""
+        if process.is_alive():
+            process.terminate()
+            self.draining.append((process, time.monotonic() + self.drain_seconds + 5))
+
+    def rolling_restart(self):
+        logger.info("Rolling restart")
+        for slot in range(self.workers):
+            old = self.slots[slot]
+            if not self.start_worker(slot):
+                # Keep the old worker serving rather than leave the slot empty
+                self.retire(self.slots[slot])
+                self.slots[slot] = old
+                continue
+            if old is not None:
+                self.retire(old)
+            self.failures[slot] = 0
+
+    def reap(self):
+        now = time.monotonic()
+        for slot, process in enumerate(self.slots):
+            if process is not None and not process.is_alive():
+                uptime = now - self.started_at[slot]
+                self.failures[slot] = self.failures[slot] + 1 if uptime < MIN_UPTIME_SECONDS else 0
+                delay = min(MAX_BACKOFF_SECONDS, 0.5 * 2 ** self.failures[slot]) if self.failures[slot] else 0.0
+                logger.warning(f"Worker {slot} (pid {process.pid}) exited with code {process.exitcode} "
+                               f"after {uptime:.1f}s; restarting in {delay:.1f}s")
+                self.slots[slot] = None
+                self.next_start[slot] = now + delay
+                self.restarts += 1
+            if self.slots[slot] is None and now >= self.next_start[slot]:
+                self.start_worker(slot)
+        self.reap_draining()
+
+    def reap_draining(self):
+        now = time.monotonic()
+        still_draining = []
+        for process, kill_at in self.draining:
+            if process.is_alive() and now >= kill_at:
+                logger.warning(f"Worker pid {process.pid} still busy after draining; killing it")
+                process.kill()
+            if process.is_alive():
+                still_draining.append((process, kill_at))
+            else:
+                process.join()
+        self.draining = still_draining
+
+    def stop(self):
+        for process in self.slots:
+            if process is not None:
+                self.retire(process)
+        self.slots = [None] * self.workers
+        while self.draining:
+            self.reap_draining()
+            time.sleep(POLL_SECONDS / 5)
+
+    def _request_reload(self, signum, frame):
+        self._reload = True
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        if self.pidfile:
+            with open(self.pidfile, "w") as f:
+                f.write(str(os.getpid()))
+        logger.info(f"Starting {self.workers} workers on {self.host}:{self.port} (supervisor pid {os.getpid()})")
+        try:
+            for slot in range(self.workers):
+                self.start_worker(slot)
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self.rolling_restart()
+                self.reap()
+                time.sleep(POLL_SECONDS)
+            logger.info("Stopping workers")
+            self.stop()
+        finally:
+            if self.pidfile and os.path.exists(self.pidfile):
+                os.remove(self.pidfile)
+
+
+def send_reload(pidfile: str = DEFAULT_PIDFILE):
+    with open(pidfile, "r") as f:
+        pid = int(f.read().strip())
+    os.kill(pid, signal.SIGHUP)
+    print(f"Rolling restart requested (supervisor pid {pid})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control a running MCP server supervisor")
+    parser.add_argument("command", choices=["reload"])
+    parser.add_argument("--pidfile", default=os.getenv("MCP_PIDFILE", DEFAULT_PIDFILE))
+    args = parser.parse_args()
+    try:
+        send_reload(args.pidfile)
+    except (OSError, ValueError) as e:
+        print(f"Could not signal the supervisor via {args.pidfile}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
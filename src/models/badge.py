@@ -1,9 +1,19 @@
+import sys
+
+
 class Badge:
-    def __init__(self, id, name, description, requirements=None):
-        self.id = id
+    """A catalog badge; slotted, with interned ids and tuple-backed list fields."""
+
+    __slots__ = ('id', 'name', 'description', 'requirements', 'level', 'courses', 'skills')
+
+    def __init__(self, id, name, description, requirements=None, level=None, courses=None, skills=None):
+        self.id = sys.intern(id) if id else id
         self.name = name
         self.description = description
-        self.requirements = requirements or []
+        self.requirements = tuple(requirements or ())
+        self.level = sys.intern(level) if level else level
+        self.courses = tuple(sys.intern(c) for c in courses or ())
+        self.skills = tuple(skills or ())
 
     def __repr__(self):
         return f"Badge(id={self.id}, name={self.name})"
@@ -14,5 +24,20 @@ class Badge:
             id=data.get('id'),
             name=data.get('title'),  # Use 'title' from the JSON data
             description=data.get('description'),
-            requirements=data.get('requirements', [])
+            requirements=data.get('requirements', []),
+            level=data.get('level'),
+            courses=data.get('courses', []),
+            skills=data.get('skills', [])
         )
+
+    def to_dict(self):
+        """Round-trip back to the catalog JSON shape."""
+        return {
+            'id': self.id,
+            'title': self.name,
+            'description': self.description,
+            'level': self.level,
+            'courses': list(self.courses),
+            'skills': list(self.skills),
+            'requirements': list(self.requirements),
+        }
@@ -1,14 +1,38 @@
+import sys
+
+
+def _intern_all(values):
+    return tuple(sys.intern(v) for v in values or ())
+
+
 class Course:
-    def __init__(self, id, name, description, prerequisites=None, badges=None):
-        self.id = id
+    """
+    A catalog course. Catalog data is immutable at runtime, so list fields are
+    stored as tuples, ids are interned and instances use __slots__ instead of
+    a per-instance __dict__.
+    """
+
+    __slots__ = ('id', 'name', 'description', 'prerequisites', 'badges', 'hours', 'url', 'topics', 'projects')
+
+    def __init__(self, id, name, description, prerequisites=None, badges=None, hours=None, url=None,
+                 topics=None, projects=None):
+        self.id = sys.intern(id) if id else id
         self.name = name
         self.description = description
-        self.prerequisites = prerequisites or []
-        self.badges = badges or []
+        self.prerequisites = _intern_all(prerequisites)
+        self.badges = _intern_all(badges)
+        self.hours = hours
+        self.url = url
+        self.topics = tuple(topics or ())
+        self.projects = tuple(projects or ())
 
     def __repr__(self):
         return f"Course(id={self.id}, name={self.name})"
 
+    @property
+    def related_badge(self):
+        return self.badges[0] if self.badges else None
+
     @classmethod
     def from_dict(cls, data):
         # Convert single relatedBadge to a list if present
@@ -21,5 +45,23 @@ class Course:
             name=data.get('title'),  # Use 'title' from the JSON data
             description=data.get('description'),
             prerequisites=data.get('prerequisites', []),
-            badges=badges
+            badges=badges,
+            hours=data.get('hours'),
+            url=data.get('url'),
+            topics=data.get('topics', []),
+            projects=data.get('projects', [])
         )
+
+    def to_dict(self):
+        """Round-trip back to the catalog JSON shape."""
+        return {
+            'id': self.id,
+            'title': self.name,
+            'description': self.description,
+            'hours': self.hours,
+            'url': self.url,
+            'relatedBadge': self.related_badge,
+            'topics': list(self.topics),
+            'prerequisites': list(self.prerequisites),
+            'projects': list(self.projects),
+        }
@@ -1,12 +1,20 @@
+import sys
+
+
 class User:
+    """A learner profile. Progress lists change over time, so they stay lists; ids are interned."""
+
+    __slots__ = ('id', 'name', 'job_title', 'description', 'completed_badges', 'completed_courses',
+                 'in_progress_courses')
+
     def __init__(self, id, name, job_title, description, completed_badges=None, completed_courses=None, in_progress_courses=None):
-        self.id = id
+        self.id = sys.intern(id) if id else id
         self.name = name
         self.job_title = job_title
         self.description = description
-        self.completed_badges = completed_badges or []
-        self.completed_courses = completed_courses or []
-        self.in_progress_courses = in_progress_courses or []
+        self.completed_badges = [sys.intern(b) for b in completed_badges or []]
+        self.completed_courses = [sys.intern(c) for c in completed_courses or []]
+        self.in_progress_courses = [sys.intern(c) for c in in_progress_courses or []]
 
     def __repr__(self):
         return f"User(id={self.id}, name={self.name})"
@@ -22,3 +30,14 @@ class User:
             completed_courses=data.get('completed_courses', []),
             in_progress_courses=data.get('in_progress_courses', [])
         )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'job_title': self.job_title,
+            'description': self.description,
+            'completed_badges': list(self.completed_badges),
+            'completed_courses': list(self.completed_courses),
+            'in_progress_courses': list(self.in_progress_courses),
+        }
@@ -0,0 +1,80 @@
+"""
+Columnar view of the course catalog for vectorized engines.
+
+Courses are assigned dense row numbers; per-course scalars live in NumPy
+arrays and the prerequisite relation is stored in CSR form, so engines can
+work on whole columns instead of iterating over Course objects.
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+LEVEL_CODES = {"basic": 0, "intermediate": 1, "expert": 2}
+LEVEL_NAMES = tuple(LEVEL_CODES)
+NO_BADGE = -1
+
+
+class CatalogTable:
+    """
+    Column arrays for every course, in row order.
+
+    Attributes:
+        course_ids: Course id per row
+        row: Course id -> row number
+        hours: float32 course hours (NaN when unknown)
+        level: int8 level code (see LEVEL_CODES)
+        related_badge: int32 index into badge_ids, or NO_BADGE
+        badge_ids: Badge id per badge index
+        prereq_indptr / prereq_indices: CSR rows of prerequisite course rows
+    """
+
+    def __init__(self, courses: Dict, badge_ids: Iterable[str], course_level):
+        self.course_ids: List[str] = list(courses)
+        self.row: Dict[str, int] = {course_id: i for i, course_id in enumerate(self.course_ids)}
+        self.badge_ids: List[str] = list(badge_ids)
+        self.badge_index: Dict[str, int] = {badge_id: i for i, badge_id in enumerate(self.badge_ids)}
+
+        n = len(self.course_ids)
+        self.hours = np.full(n, np.nan, dtype=np.float32)
+        self.level = np.zeros(n, dtype=np.int8)
+        self.related_badge = np.full(n, NO_BADGE, dtype=np.int32)
+
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        indices: List[int] = []
+        for i, course_id in enumerate(self.course_ids):
+            course = courses[course_id]
+            if course.hours is not None:
+                self.hours[i] = course.hours
+            self.level[i] = LEVEL_CODES.get(course_level(course_id), 0)
+            if course.related_badge in self.badge_index:
+                self.related_badge[i] = self.badge_index[course.related_badge]
+            # Prerequisites outside the catalog cannot be represented as rows
+            indices.extend(self.row[p] for p in course.prerequisites if p in self.row)
+            indptr[i + 1] = len(indices)
+        self.prereq_indptr = indptr
+        self.prereq_indices = np.asarray(indices, dtype=np.int32)
+
+    @classmethod
+    def from_planner(cls, planner) -> "CatalogTable":
+        return cls(planner.courses, planner.badges, planner.course_level)
+
+    def __len__(self) -> int:
+        return len(self.course_ids)
+
+    def prerequisites(self, row: int) -> np.ndarray:
+        return self.prereq_indices[self.prereq_indptr[row]:self.prereq_indptr[row + 1]]
+
+    def rows(self, course_ids: Iterable[str]) -> np.ndarray:
+        """Row numbers for the given course ids, skipping unknown ones."""
+        return np.fromiter((self.row[c] for c in course_ids if c in self.row), dtype=np.int32)
+
+    def mask(self, course_ids: Iterable[str]) -> np.ndarray:
+        """Boolean row mask with True for each given course."""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.rows(course_ids)] = True
+        return mask
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.hours, self.level, self.related_badge,
+                                      self.prereq_indptr, self.prereq_indices))
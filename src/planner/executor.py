@@ -0,0 +1,311 @@
+"""
+Process pool for CPU-bound planner work.
+
+Batch analytics such as scheduling every user towards a set of badges hold
+the GIL for seconds, stalling every other request thread (health checks
+included). PlannerPool runs such operations in worker processes instead.
+
+Operations are plain functions registered in OPERATIONS under a name; only
+the name, the call's own arguments and the catalog's identity cross the
+process boundary, never the catalog. Workers hold their own planners: on
+Linux (fork) they inherit the ones registered before the pool started, copy
+on write, and any other catalog (another tenant's, or a reloaded one) is
+loaded in the worker from its snapshot on first use. A pool replacing a
+broken one starts its workers from a fork server (or spawns them) instead,
+since by then the server is running request threads.
+
+Small inputs run in-process, where the round trip would cost more than the
+work. Every call has a timeout (capped by the request deadline); a call that
+times out is cancelled if still queued, and a running one sees the deadline
+and stops at its next check.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.common.deadline import DEADLINE, Deadline, DeadlineExceeded
+
+# Catalogs a worker keeps loaded at once, most recently used first
+WORKER_CATALOGS = 4
+# Pool calls kept for latency percentiles
+LATENCY_WINDOW = 1000
+# Users scheduled between deadline checks in a worker
+DEADLINE_CHECK_EVERY = 64
+
+CatalogKey = Tuple[Optional[str], Optional[str]]
+
+
+def catalog_key(planner) -> CatalogKey:
+    """What identifies a planner's catalog across processes: its directory and snapshot path."""
+    return planner.catalog_dir, planner.snapshot_path
+
+
+# -- operations -------------------------------------------------------------
+
+def schedule_many(planner, deadline: Deadline, users: List[Dict], target_badges: List[str],
+                  weekly_hours: float, max_concurrent: int) -> List[Dict]:
+    """CourseScheduler.schedule_many for a list of users, stopping at the deadline."""
+    results = []
+    for result in planner.scheduler.schedule_many(users, target_badges, weekly_hours, max_concurrent):
+        results.append(result)
+        if len(results) % DEADLINE_CHECK_EVERY == 0 and deadline.expired():
+            raise DeadlineExceeded(DEADLINE)
+    return results
+
+
+OPERATIONS: Dict[str, Callable] = {
+    "schedule_many": schedule_many,
+}
+
+
+# -- worker side ------------------------------------------------------------
+
+# Planners by catalog key. In the server process these are the ones handed to
+# the pool to preload; workers inherit them (fork) or load them (spawn).
+_planners: "OrderedDict[CatalogKey, Any]" = OrderedDict()
+
+
+def _load_planner(key: CatalogKey):
+    from src.planner.training_planner import TrainingPlanner
+
+    catalog_dir, snapshot_path = key
+    return TrainingPlanner(catalog_dir=catalog_dir, snapshot_path=snapshot_path)
+
+
+def _init_worker(keys: List[CatalogKey]):
+    for key in keys:
+        if key not in _planners:
+            _planners[key] = _load_planner(key)
+
+
+def _worker_planner(key: CatalogKey, version: str):
+    planner = _planners.get(key)
+    if planner is None or planner.catalog_version != version:
+        # First use of this catalog in the worker, or the server has reloaded it since
+        planner = _load_planner(key)
+        _planners[key] = planner
+        while len(_planners) > WORKER_CATALOGS:
+            _planners.popitem(last=False)
+    _planners.move_to_end(key)
+    return planner
+
+
+def _run_in_worker(key: CatalogKey, version: str, operation: str, expires_at: float, args: tuple):
+    started = time.time()
+    # Wall clock crosses the process boundary; the worker's deadline is monotonic again
+    deadline = Deadline.after(max(0.0, expires_at - started))
+    planner = _worker_planner(key, version)
+    result = OPERATIONS[operation](planner, deadline, *args)
+    return result, started, time.time() - started
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+# -- server side ------------------------------------------------------------
+
+def _percentiles(values: Iterable[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    if not ordered:
+        return {}
+    return {
+        "p50": round(ordered[int(len(ordered) * 0.5)] * 1000, 2),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _replacement_context(start_method: Optional[str]):
+    """
+    Start method for a pool started while request threads run: forking then
+    could copy a lock some thread holds, so workers come from a fork server
+    (which imports only this module) or are spawned.
+    """
+    if start_method and start_method != "fork":
+        return multiprocessing.get_context(start_method)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class PlannerPool:
+    """
+    Runs registered planner operations in worker processes.
+
+    Thread-safe; one pool serves every request thread and every tenant.
+    """
+
+    def __init__(self, workers: int = 2, inline_below: int = 200, timeout: float = 60.0,
+                 start_method: Optional[str] = None):
+        """
+        Args:
+            workers: Worker processes; 0 runs everything in-process
+            inline_below: Inputs smaller than this (e.g. users to schedule) run in-process
+            timeout: Seconds a call may take, queueing included, when the
+                caller's deadline allows more
+            start_method: multiprocessing start method; the platform default
+                (fork on Linux) lets workers share preloaded planners
+        """
+        self.workers = max(0, workers)
+        self.inline_below = inline_below
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "submitted": 0, "inline": 0, "completed": 0, "failed": 0,
+            "timed_out": 0, "cancelled": 0, "broken": 0,
+        }
+        self._in_flight = 0
+        self._queue_seconds: deque = deque(maxlen=LATENCY_WINDOW)
+        self._run_seconds: deque = deque(maxlen=LATENCY_WINDOW)
+        self._total_seconds: deque = deque(maxlen=LATENCY_WINDOW)
+
+    @classmethod
+    def from_env(cls) -> "PlannerPool":
+        return cls(
+            workers=int(os.getenv("PLANNER_POOL_WORKERS", "2")),
+            inline_below=int(os.getenv("PLANNER_POOL_INLINE_BELOW", "200")),
+            timeout=float(os.getenv("PLANNER_POOL_TIMEOUT", "60")),
+            start_method=os.getenv("PLANNER_POOL_START_METHOD") or None,
+        )
+
+    def start(self, preload: Iterable = (), context=None):
+        """
+        Start the workers with the given planners loaded.
+
+        Call before serving requests: forking from a process that is already
+        running request threads risks copying a lock some thread holds.
+
+        Args:
+            preload: Planners the workers start with
+            context: multiprocessing context; start_method's by default
+        """
+        if not self.workers:
+            return
+        for planner in preload:
+            _planners[catalog_key(planner)] = planner
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context or multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=(list(_planners),),
+                )
+                executor = self._executor
+            else:
+                return
+        # Workers are started on demand; submitting one task per worker starts them all now
+        for _ in range(self.workers):
+            executor.submit(_warm_up)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def run(self, planner, operation: str, *args, size: int = 0, deadline: Optional[Deadline] = None) -> Any:
+        """
+        Run OPERATIONS[operation](planner, deadline, *args), in a worker unless the input is small.
+
+        Args:
+            planner: The planner whose catalog the operation uses
+            operation: Name in OPERATIONS
+            size: Size of the input, compared with inline_below
+            deadline: The request's deadline; calls never run past it or `timeout`
+
+        Raises:
+            DeadlineExceeded: If the call did not finish in time
+            Exception: Whatever the operation raised
+        """
+        timeout = min(self.timeout, deadline.remaining()) if deadline else self.timeout
+        if timeout <= 0:
+            raise DeadlineExceeded(DEADLINE)
+        local_deadline = Deadline.after(timeout)
+        executor = self._executor
+        if executor is None or size < self.inline_below:
+            self._count("inline")
+            return OPERATIONS[operation](planner, local_deadline, *args)
+
+        submitted = time.time()
+        try:
+            future = executor.submit(_run_in_worker, catalog_key(planner), planner.catalog_version,
+                                     operation, submitted + timeout, args)
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            self._count("inline")
+            return OPERATIONS[operation](planner, local_deadline, *args)
+        with self._lock:
+            self._counters["submitted"] += 1
+            self._in_flight += 1
+        try:
+            result, started, run_seconds = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Still queued: never runs. Already running: the worker stops at its own deadline check.
+            self._count("cancelled" if future.cancel() else "timed_out")
+            raise DeadlineExceeded(DEADLINE)
+        except DeadlineExceeded:
+            self._count("timed_out")
+            raise
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+            raise
+        except Exception:
+            self._count("failed")
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self._counters["completed"] += 1
+            self._queue_seconds.append(max(0.0, started - submitted))
+            self._run_seconds.append(run_seconds)
+            self._total_seconds.append(time.time() - submitted)
+        return result
+
+    def _replace_broken(self, executor: ProcessPoolExecutor):
+        """A worker died (e.g. killed for memory); start a new pool for later calls."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._counters["broken"] += 1
+            self._executor = None
+        print("Planner pool broken; starting a new one")
+        executor.shutdown(wait=False)
+        # Workers load the registered catalogs from their snapshots rather than inherit them
+        self.start(context=_replacement_context(self.start_method))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = self._in_flight
+            latency = {
+                "queue_ms": _percentiles(self._queue_seconds),
+                "run_ms": _percentiles(self._run_seconds),
+                "total_ms": _percentiles(self._total_seconds),
+            }
+        return {
+            **counters,
+            "workers": self.workers if self._executor is not None else 0,
+            "inline_below": self.inline_below,
+            "timeout_seconds": self.timeout,
+            "in_flight": in_flight,
+            # Calls waiting for a free worker
+            "queued": max(0, in_flight - self.workers),
+            "latency": latency,
+        }
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
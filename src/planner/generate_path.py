@@ -16,13 +16,13 @@ def generate_learning_path(self, current_skills: list, target_badge_id: str) ->
         prerequisites = self.get_prerequisites_for_badge(target_badge_id)
         
         # Convert badge and course data to dictionaries for the LLM
-        target_badge = self.badges[target_badge_id].__dict__
+        target_badge = self.badges[target_badge_id].to_dict()
         available_courses = {
-            course_id: course.__dict__ 
+            course_id: course.to_dict()
             for course_id, course in self.courses.items()
         }
         available_badges = {
-            badge_id: badge.__dict__ 
+            badge_id: badge.to_dict()
             for badge_id, badge in self.badges.items()
         }
         
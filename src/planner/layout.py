@@ -0,0 +1,272 @@
+"""
+Layered (Sugiyama-style) layout of the course/badge DAG.
+
+Nodes are ranked inside level bands (basic, then intermediate, then expert)
+by longest path, long edges are split with dummy nodes, crossings are reduced
+with alternating barycenter sweeps, and every node gets fixed x/y coordinates
+so clients can draw the graph without running a force simulation.
+
+Layouts are cached per catalog version. When a new catalog only adds a few
+nodes to the previous one, the new nodes are slotted into the existing layout
+instead of recomputing it.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LEVELS = ("basic", "intermediate", "expert")
+NODE_SPACING = 180
+LAYER_SPACING = 120
+CROSSING_SWEEPS = 8
+
+# Above this many added nodes a full relayout is cheaper than patching
+MAX_INCREMENTAL_NODES = 25
+
+
+class LayeredLayout:
+    """A computed layout: ranks, per-layer ordering and coordinates."""
+
+    def __init__(self, nodes: Dict[str, str], edges: List[Tuple[str, str]]):
+        self.levels = dict(nodes)  # node id -> level
+        self.edges = [(u, v) for u, v in edges if u in nodes and v in nodes and u != v]
+        self.rank: Dict[str, int] = {}
+        self.layers: List[List[str]] = []
+        self.positions: Dict[str, Tuple[float, float]] = {}
+        self.edge_points: Dict[Tuple[str, str], List[Tuple[float, float]]] = {}
+        self._chains: Dict[Tuple[str, str], List[str]] = {}
+
+    # -- full layout ------------------------------------------------------
+
+    def compute(self) -> "LayeredLayout":
+        self._assign_ranks()
+        self._build_layers()
+        self._reduce_crossings()
+        self._assign_coordinates()
+        return self
+
+    def _assign_ranks(self):
+        """Longest-path ranking within each level band, bands stacked in level order."""
+        successors: Dict[str, List[str]] = {node: [] for node in self.levels}
+        indegree = {node: 0 for node in self.levels}
+        for u, v in self.edges:
+            # Only edges within a band push nodes down inside that band
+            if self.levels[u] == self.levels[v]:
+                successors[u].append(v)
+                indegree[v] += 1
+
+        depth = {node: 0 for node in self.levels}
+        ready = [node for node, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            node = ready.pop()
+            visited += 1
+            for succ in successors[node]:
+                depth[succ] = max(depth[succ], depth[node] + 1)
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    ready.append(succ)
+        # Nodes left with indegree > 0 sit on a cycle; they keep the depth reached so far
+
+        offset = 0
+        for level in LEVELS + tuple(sorted(set(self.levels.values()) - set(LEVELS))):
+            band = [node for node in self.levels if self.levels[node] == level]
+            if not band:
+                continue
+            for node in band:
+                self.rank[node] = offset + depth[node]
+            offset += max(depth[node] for node in band) + 1
+
+    def _build_layers(self):
+        """Create layers, splitting edges that span several ranks with dummy nodes."""
+        layer_count = max(self.rank.values(), default=-1) + 1
+        self.layers = [[] for _ in range(layer_count)]
+        for node in sorted(self.rank, key=lambda n: (self.rank[n], n)):
+            self.layers[self.rank[node]].append(node)
+
+        self._chains = {}
+        for u, v in self.edges:
+            lo, hi = sorted((self.rank[u], self.rank[v]))
+            chain = []
+            for r in range(lo + 1, hi):
+                dummy = f"__dummy__{u}__{v}__{r}"
+                self.rank[dummy] = r
+                self.layers[r].append(dummy)
+                chain.append(dummy)
+            if self.rank[u] > self.rank[v]:
+                chain.reverse()
+            self._chains[(u, v)] = chain
+
+    def _segments(self) -> Iterable[Tuple[str, str]]:
+        """Edges between adjacent layers, after dummy insertion (upper node first)."""
+        for (u, v), chain in self._chains.items():
+            path = [u] + chain + [v]
+            for a, b in zip(path, path[1:]):
+                if self.rank[a] != self.rank[b]:
+                    yield (a, b) if self.rank[a] < self.rank[b] else (b, a)
+
+    def _reduce_crossings(self):
+        """Alternate downward and upward barycenter sweeps."""
+        up: Dict[str, List[str]] = {}
+        down: Dict[str, List[str]] = {}
+        for a, b in self._segments():
+            down.setdefault(a, []).append(b)
+            up.setdefault(b, []).append(a)
+
+        for sweep in range(CROSSING_SWEEPS):
+            if sweep % 2 == 0:
+                for r in range(1, len(self.layers)):
+                    self._order_by_barycenter(r, r - 1, up)
+            else:
+                for r in range(len(self.layers) - 2, -1, -1):
+                    self._order_by_barycenter(r, r + 1, down)
+
+    def _order_by_barycenter(self, r: int, fixed: int, neighbours: Dict[str, List[str]]):
+        index = {node: i for i, node in enumerate(self.layers[fixed])}
+
+        def barycenter(item):
+            i, node = item
+            ranks = [index[n] for n in neighbours.get(node, []) if n in index]
+            # Nodes without neighbours in the fixed layer keep their position
+            return (sum(ranks) / len(ranks) if ranks else i, i)
+
+        self.layers[r] = [node for _, node in sorted(enumerate(self.layers[r]), key=barycenter)]
+
+    def _assign_coordinates(self):
+        self.positions = {}
+        for r in range(len(self.layers)):
+            self._place_layer(r)
+        self._route_edges()
+
+    def _place_layer(self, r: int):
+        layer = self.layers[r]
+        width = (len(layer) - 1) * NODE_SPACING
+        for i, node in enumerate(layer):
+            self.positions[node] = (i * NODE_SPACING - width / 2, r * LAYER_SPACING)
+
+    def _route_edges(self):
+        self.edge_points = {
+            edge: [self.positions[dummy] for dummy in chain]
+            for edge, chain in self._chains.items() if chain
+        }
+
+    # -- incremental updates ----------------------------------------------
+
+    def add_node(self, node: str, level: str, edges: List[Tuple[str, str]]) -> bool:
+        """
+        Slot one new node into the existing layout.
+
+        The node is ranked below its predecessors inside its level band and
+        inserted at the barycenter of its neighbours; only its own layer is
+        re-placed. Returns False if the node cannot be placed without
+        breaking the existing ranking, in which case a full layout is needed.
+        """
+        band = [self.rank[n] for n, lvl in self.levels.items() if lvl == level]
+        if not band:
+            return False
+        preds = [u for u, v in edges if v == node and u in self.levels]
+        succs = [v for u, v in edges if u == node and v in self.levels]
+        rank = max([min(band)] + [self.rank[u] + 1 for u in preds if self.levels[u] == level])
+        if rank > max(band) or any(self.rank[v] <= rank for v in succs if self.levels[v] == level):
+            return False
+
+        self.levels[node] = level
+        self.rank[node] = rank
+        new_edges = [(u, v) for u, v in edges if u in self.levels and v in self.levels and u != v]
+        self.edges.extend(new_edges)
+
+        neighbour_x = [self.positions[n][0] for n in preds + succs if n in self.positions]
+        target_x = sum(neighbour_x) / len(neighbour_x) if neighbour_x else float("inf")
+        layer = self.layers[rank]
+        insert_at = sum(1 for n in layer if self.positions[n][0] < target_x)
+        layer.insert(insert_at, node)
+        self._place_layer(rank)
+
+        # New edges are drawn straight; existing dummy chains are untouched
+        for edge in new_edges:
+            self._chains[edge] = []
+        self._route_edges()
+        return True
+
+    # -- output -----------------------------------------------------------
+
+    def to_dict(self) -> Dict:
+        xs = [x for x, _ in self.positions.values()] or [0]
+        return {
+            "algorithm": "layered",
+            "node_spacing": NODE_SPACING,
+            "layer_spacing": LAYER_SPACING,
+            "width": max(xs) - min(xs),
+            "height": (len(self.layers) - 1) * LAYER_SPACING if self.layers else 0,
+            "layers": len(self.layers),
+        }
+
+    def node_coordinates(self, node: str) -> Optional[Dict]:
+        if node not in self.positions:
+            return None
+        x, y = self.positions[node]
+        return {"x": x, "y": y, "rank": self.rank[node]}
+
+
+class LayoutEngine:
+    """Caches layouts by catalog version and patches them incrementally when possible."""
+
+    def __init__(self, max_versions: int = 4):
+        self.max_versions = max_versions
+        self._layouts: Dict[str, LayeredLayout] = {}
+        self._lock = threading.Lock()
+
+    def get_layout(self, version: str, nodes: Dict[str, str], edges: List[Tuple[str, str]]) -> LayeredLayout:
+        """
+        Return the layout for a catalog version, computing it at most once.
+
+        Args:
+            version: Catalog version the nodes and edges were built from
+            nodes: Node id -> level
+            edges: (source, target) node id pairs
+        """
+        with self._lock:
+            layout = self._layouts.get(version)
+            if layout is not None:
+                return layout
+
+            layout = self._incremental(nodes, edges) or LayeredLayout(nodes, edges).compute()
+            self._layouts[version] = layout
+            while len(self._layouts) > self.max_versions:
+                self._layouts.pop(next(iter(self._layouts)))
+            return layout
+
+    def _incremental(self, nodes: Dict[str, str], edges: List[Tuple[str, str]]) -> Optional[LayeredLayout]:
+        """Patch the newest cached layout if the new catalog only adds a few nodes to it."""
+        if not self._layouts:
+            return None
+        previous = self._layouts[next(reversed(self._layouts))]
+        old_nodes = previous.levels
+        added = [node for node in nodes if node not in old_nodes]
+        if not added or len(added) > MAX_INCREMENTAL_NODES:
+            return None
+        if any(node not in nodes or nodes[node] != level for node, level in old_nodes.items()):
+            return None
+        # Edges between existing nodes must be unchanged
+        old_edges = set(previous.edges)
+        new_edges = {(u, v) for u, v in edges if u in nodes and v in nodes and u != v}
+        if {(u, v) for u, v in new_edges if u in old_nodes and v in old_nodes} != old_edges:
+            return None
+
+        layout = _copy_layout(previous)
+        for node in added:
+            touching = [(u, v) for u, v in new_edges if node in (u, v)]
+            if not layout.add_node(node, nodes[node], touching):
+                return None
+        return layout
+
+
+def _copy_layout(layout: LayeredLayout) -> LayeredLayout:
+    copy = LayeredLayout.__new__(LayeredLayout)
+    copy.levels = dict(layout.levels)
+    copy.edges = list(layout.edges)
+    copy.rank = dict(layout.rank)
+    copy.layers = [list(layer) for layer in layout.layers]
+    copy.positions = dict(layout.positions)
+    copy.edge_points = dict(layout.edge_points)
+    copy._chains = {edge: list(chain) for edge, chain in layout._chains.items()}
+    return copy
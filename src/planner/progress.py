@@ -0,0 +1,158 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+COURSE_STARTED = "course_started"
+COURSE_COMPLETED = "course_completed"
+EVENT_TYPES = (COURSE_STARTED, COURSE_COMPLETED)
+
+
+class ProgressTracker:
+    """
+    Applies course progress events to the user store.
+
+    Badge awarding and the per-user "eligible next courses" list are both
+    maintained incrementally: a completed course only re-evaluates the badges
+    that list it (via the planner's course -> badge reverse index) and only
+    the courses that list it as a prerequisite.
+    """
+
+    def __init__(self, planner, user_store=None, recommender=None):
+        self.planner = planner
+        self.user_store = user_store or planner.user_store
+        # CourseRecommender to catch up with completions as they are recorded, once one is in use
+        self.recommender = recommender
+
+    @property
+    def catalog_version(self) -> str:
+        """Next-course lists depend on the catalog, so the store keeps one per user per catalog version."""
+        return self.planner.catalog_version or ""
+
+    def validate_events(self, events: Iterable[Dict]) -> List[Dict]:
+        """
+        Check event shape and that every course exists in the catalog.
+
+        Raises:
+            ValueError: If an event is malformed or references an unknown course
+        """
+        validated = []
+        for i, event in enumerate(events):
+            if not isinstance(event, dict):
+                raise ValueError(f"Event {i} must be an object")
+            event_type = event.get("type")
+            course_id = event.get("course_id")
+            if event_type not in EVENT_TYPES:
+                raise ValueError(f"Event {i} has invalid type {event_type!r}; expected one of {', '.join(EVENT_TYPES)}")
+            if not isinstance(course_id, str):
+                raise ValueError(f"Event {i} course_id must be a string")
+            if course_id not in self.planner.courses:
+                raise ValueError(f"Event {i} references unknown course {course_id!r}")
+            validated.append({"type": event_type, "course_id": course_id})
+        return validated
+
+    def is_eligible(self, course_id: str, completed: Set[str]) -> bool:
+        return all(prereq in completed for prereq in self.planner.courses[course_id].prerequisites)
+
+    def compute_next_courses(self, completed: Set[str], in_progress: Set[str]) -> List[str]:
+        """Full computation: every course not yet started whose prerequisites are all completed."""
+        return sorted(
+            course_id for course_id in self.planner.courses
+            if course_id not in completed and course_id not in in_progress
+            and self.is_eligible(course_id, completed)
+        )
+
+    def next_courses(self, user_id: str) -> Optional[List[str]]:
+        """
+        Return the user's eligible next courses.
+
+        Reads the materialized list, computing and storing it once if the user
+        has never had it built.
+
+        Returns:
+            List of course ids, or None if the user does not exist
+        """
+        cached = self.user_store.get_next_courses(user_id, self.catalog_version)
+        if cached is not None:
+            return cached
+
+        user = self.user_store.get_user(user_id)
+        if user is None:
+            return None
+        next_courses = self.compute_next_courses(
+            set(user["completed_courses"]), set(user["in_progress_courses"])
+        )
+        self.user_store.set_next_courses(user_id, self.catalog_version, next_courses)
+        return next_courses
+
+    def apply_events(self, user_id: str, events: Iterable[Dict]) -> Optional[Dict]:
+        """
+        Apply a batch of validated progress events for one user.
+
+        Returns:
+            Summary with the courses started/completed, newly awarded badges
+            and the refreshed next-course list, or None if the user does not exist
+        """
+        def update(user: Dict, next_courses: Optional[List[str]]) -> Dict:
+            completed = set(user["completed_courses"])
+            in_progress = set(user["in_progress_courses"])
+            earned = set(user["completed_badges"])
+            eligible = set(next_courses if next_courses is not None
+                           else self.compute_next_courses(completed, in_progress))
+
+            started: List[str] = []
+            newly_completed: List[str] = []
+            awarded: List[str] = []
+
+            for event in events:
+                course_id = event["course_id"]
+                if event["type"] == COURSE_STARTED:
+                    if course_id in completed or course_id in in_progress:
+                        continue
+                    in_progress.add(course_id)
+                    eligible.discard(course_id)
+                    started.append(course_id)
+                    continue
+
+                if course_id in completed:
+                    continue
+                completed.add(course_id)
+                in_progress.discard(course_id)
+                eligible.discard(course_id)
+                newly_completed.append(course_id)
+
+                # Only badges that list this course can have become complete
+                for badge_id in self.planner.course_badges.get(course_id, []):
+                    if badge_id in earned:
+                        continue
+                    if all(required in completed for required in self.planner.badge_courses[badge_id]):
+                        earned.add(badge_id)
+                        awarded.append(badge_id)
+
+                # Only courses that depend on this one can have become eligible
+                for dependent_id in self.planner.course_dependents.get(course_id, []):
+                    if (dependent_id not in completed and dependent_id not in in_progress
+                            and self.is_eligible(dependent_id, completed)):
+                        eligible.add(dependent_id)
+
+            return {
+                "started": started,
+                "completed": newly_completed,
+                "awarded_badges": awarded,
+                "next_courses": sorted(eligible),
+            }
+
+        # Read and written in one write transaction, so concurrent batches for
+        # the user, in this process or another, apply one after the other
+        changes = self.user_store.update_progress(user_id, self.catalog_version, update)
+        if changes is None:
+            return None
+        newly_completed = changes["completed"]
+
+        if self.recommender is not None and newly_completed:
+            # Reads them back from the completion log, with anything other processes recorded
+            self.recommender.catch_up(self.user_store, force=True)
+        return {
+            "user_id": user_id,
+            "started_courses": changes["started"],
+            "completed_courses": newly_completed,
+            "awarded_badges": changes["awarded_badges"],
+            "next_courses": changes["next_courses"],
+        }
@@ -0,0 +1,453 @@
+"""
+"People like you took" course recommendations from item-item co-occurrence.
+
+Every user's completed courses (plus their job title, treated as one more
+item) form a row of a sparse user x course matrix. Its co-occurrence
+X^T X says how many users completed both courses of a pair; the diagonal is
+each course's completion count. A user's recommendations are the courses
+that co-occur most with what they completed, normalized like a cosine so
+popular courses do not crowd out everything else, and restricted to the
+courses they are eligible to start.
+
+The matrix is built from the user store a chunk of users at a time, so
+memory depends on the catalog rather than the population, and can be saved
+and loaded offline. Course completions recorded by progress events are read
+back from the user store's completion log and added to a small delta that is
+folded into the matrix once it grows, so recommendations follow progress
+without a rebuild. Every process follows the same log, and a saved matrix
+records how far into it it has counted, so worker processes agree and a
+restart only replays what was logged since the last save.
+
+    python -m src.planner.recommender [--chunk-size 10000]
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.loader.dataLoader import catalog_snapshot_path
+
+DEFAULT_CHUNK_SIZE = 10000
+# Pending co-occurrence increments folded into the matrix at once
+MERGE_THRESHOLD = 5000
+# Added to a candidate's completion count so rarely taken courses are not over-promoted
+POPULARITY_SHRINKAGE = 5.0
+JOB_TITLE_WEIGHT = 1.0
+# Completion log entries read at a time, and how often a process looks for new ones (seconds)
+CATCH_UP_BATCH = 1000
+CATCH_UP_SECONDS = 1.0
+# Counts taken in since the last save are written back at most this often (seconds)
+SAVE_SECONDS = float(os.getenv("RECOMMENDER_SAVE_SECONDS", "300"))
+FORMAT = 2
+
+
+def course_cooccurrence_path(snapshot_path: Optional[str] = None) -> str:
+    """Next to the given catalog snapshot, or COURSE_COOCCURRENCE_PATH / next to the default one."""
+    if snapshot_path:
+        return os.path.join(os.path.dirname(snapshot_path), ".course_cooccurrence.npz")
+    return os.getenv(
+        "COURSE_COOCCURRENCE_PATH",
+        os.path.join(os.path.dirname(catalog_snapshot_path()), ".course_cooccurrence.npz")
+    )
+
+
+class CourseRecommender:
+    """
+    Item-item co-occurrence over course completions and job titles.
+
+    Args:
+        course_ids: Catalog course ids; completions of other courses are ignored
+        catalog_version: Version the course index belongs to
+    """
+
+    def __init__(self, course_ids: Iterable[str], catalog_version: Optional[str] = None):
+        self.course_ids: List[str] = list(course_ids)
+        self.index: Dict[str, int] = {course_id: i for i, course_id in enumerate(self.course_ids)}
+        self.catalog_version = catalog_version
+        self.titles: Dict[str, int] = {}
+        self.cooccurrence = None  # CSR course x course co-completion counts
+        self.popularity = np.zeros(len(self.course_ids), dtype=np.float32)  # completions per course
+        self.title_courses = None  # CSR title x course completions
+        self.title_users = np.zeros(0, dtype=np.float32)  # users per title
+        self.users = 0
+        self.built_at: Optional[float] = None
+        # Sequence number of the last completion log entry counted
+        self.log_position = 0
+        # Where catch_up saves the counts; set by load_or_build_recommender
+        self.path: Optional[str] = None
+        self._caught_up_at = 0.0
+        self._saved_at = time.monotonic()
+        self._catch_up_lock = threading.Lock()
+        # row -> col -> count, for completions not yet merged into the matrices
+        self._delta: Dict[int, Dict[int, float]] = {}
+        self._title_delta: Dict[int, Dict[int, float]] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.cooccurrence is not None
+
+    # -- offline build ----------------------------------------------------
+
+    def _chunk_matrices(self, users: List[Dict], titles: Dict[str, int]):
+        from scipy import sparse
+
+        rows, cols, title_rows, title_cols = [], [], [], []
+        for row, user in enumerate(users):
+            courses = {self.index[c] for c in user["completed_courses"] if c in self.index}
+            rows.extend([row] * len(courses))
+            cols.extend(courses)
+            title = user.get("job_title")
+            if title:
+                title_index = titles.setdefault(title, len(titles))
+                title_rows.extend([title_index] * len(courses))
+                title_cols.extend(courses)
+        n = len(self.course_ids)
+        interactions = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(len(users), n)
+        )
+        title_courses = sparse.csr_matrix(
+            (np.ones(len(title_rows), dtype=np.float32), (title_rows, title_cols)), shape=(len(titles), n)
+        )
+        title_users = np.bincount([titles[user["job_title"]] for user in users if user.get("job_title")],
+                                  minlength=len(titles))
+        return (interactions.T @ interactions).tocsr(), title_courses, title_users
+
+    def build(self, user_store, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Recompute everything from the user store, reading `chunk_size` users at a time.
+
+        Counts from the completion log position at the start of the build, so
+        a completion logged while the build reads users may be counted twice;
+        none are missed.
+        """
+        from scipy import sparse
+
+        log_position = user_store.completion_log_bounds()[1]
+        n = len(self.course_ids)
+        titles: Dict[str, int] = {}
+        cooccurrence = sparse.csr_matrix((n, n), dtype=np.float32)
+        title_courses = sparse.csr_matrix((0, n), dtype=np.float32)
+        title_users = np.zeros(0, dtype=np.float32)
+        users = 0
+
+        def add(chunk):
+            nonlocal cooccurrence, title_courses, title_users
+            chunk_cooccurrence, chunk_titles, chunk_title_users = self._chunk_matrices(chunk, titles)
+            cooccurrence = cooccurrence + chunk_cooccurrence
+            title_courses.resize(chunk_titles.shape)
+            title_courses = (title_courses + chunk_titles).tocsr()
+            title_users = np.pad(title_users, (0, len(chunk_title_users) - len(title_users))) + chunk_title_users
+
+        chunk: List[Dict] = []
+        for user in user_store.iter_users():
+            chunk.append(user)
+            users += 1
+            if len(chunk) >= chunk_size:
+                add(chunk)
+                chunk = []
+        if chunk:
+            add(chunk)
+
+        with self._lock:
+            self.titles = titles
+            self.cooccurrence = cooccurrence.astype(np.float32)
+            self.popularity = cooccurrence.diagonal().astype(np.float32)
+            self.title_courses = title_courses.astype(np.float32)
+            self.title_users = title_users.astype(np.float32)
+            self.users = users
+            self.built_at = time.time()
+            self.log_position = log_position
+            self._delta.clear()
+            self._title_delta.clear()
+            self._pending = 0
+
+    # -- incremental updates ----------------------------------------------
+
+    def record_completions(self, job_title: Optional[str], previously_completed: Iterable[str],
+                           newly_completed: Iterable[str]):
+        """
+        Count courses a user just completed against everything they had completed before.
+
+        A no-op until the matrix has been built or loaded, since a build reads
+        the completions from the store anyway. Fed by catch_up.
+        """
+        if not self.ready:
+            return
+        completed = [self.index[c] for c in previously_completed if c in self.index]
+        with self._lock:
+            title = self.titles.get(job_title) if job_title else None
+            for course_id in newly_completed:
+                course = self.index.get(course_id)
+                if course is None or course in completed:
+                    continue
+                self.popularity[course] += 1
+                for other in completed:
+                    self._increment(self._delta, course, other)
+                    self._increment(self._delta, other, course)
+                if title is not None:
+                    self._increment(self._title_delta, title, course)
+                completed.append(course)
+            if self._pending >= MERGE_THRESHOLD:
+                self._merge()
+
+    def _increment(self, delta: Dict[int, Dict[int, float]], row: int, col: int):
+        cols = delta.setdefault(row, {})
+        cols[col] = cols.get(col, 0.0) + 1.0
+        self._pending += 1
+
+    def _merge(self):
+        from scipy import sparse
+
+        def as_matrix(delta, shape):
+            rows = [row for row, cols in delta.items() for _ in cols]
+            cols = [col for row_cols in delta.values() for col in row_cols]
+            values = [value for row_cols in delta.values() for value in row_cols.values()]
+            return sparse.csr_matrix((np.asarray(values, dtype=np.float32), (rows, cols)), shape=shape)
+
+        self.cooccurrence = (self.cooccurrence + as_matrix(self._delta, self.cooccurrence.shape)).tocsr()
+        self.title_courses = (self.title_courses + as_matrix(self._title_delta, self.title_courses.shape)).tocsr()
+        self._delta.clear()
+        self._title_delta.clear()
+        self._pending = 0
+
+    def catch_up(self, user_store, force: bool = False) -> int:
+        """
+        Count the completions logged in the user store since this recommender last looked.
+
+        Looks at most every CATCH_UP_SECONDS unless forced, and saves to `path`
+        when counts were taken in and the last save is SAVE_SECONDS old.
+
+        Returns:
+            Number of completions counted
+        """
+        if not self.ready or (not force and time.monotonic() - self._caught_up_at < CATCH_UP_SECONDS):
+            return 0
+        if not self._catch_up_lock.acquire(blocking=False):
+            # Another thread is reading the log already
+            return 0
+        try:
+            counted = 0
+            while True:
+                entries = user_store.completions_since(self.log_position, CATCH_UP_BATCH)
+                users = user_store.get_users({user_id for _, user_id, _ in entries})
+                for seq, user_id, course_id in entries:
+                    user = users.get(user_id)
+                    # A completion moves the course to the end of the list, so what precedes it came before it
+                    completed = user["completed_courses"] if user is not None else []
+                    if course_id in completed:
+                        previous = completed[:completed.index(course_id)]
+                        self.record_completions(user.get("job_title"), previous, [course_id])
+                        counted += 1
+                    self.log_position = seq
+                if len(entries) < CATCH_UP_BATCH:
+                    break
+            self._caught_up_at = time.monotonic()
+            if counted and self.path and time.monotonic() - self._saved_at >= SAVE_SECONDS:
+                try:
+                    self.save(self.path)
+                except OSError as e:
+                    print(f"Could not write course co-occurrence to {self.path}: {e}")
+            return counted
+        finally:
+            self._catch_up_lock.release()
+
+    # -- queries ----------------------------------------------------------
+
+    def _row(self, matrix, delta: Dict[int, Dict[int, float]], row: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        cols, values = matrix.indices[start:end], matrix.data[start:end]
+        pending = delta.get(row)
+        if pending:
+            cols = np.concatenate([cols, np.fromiter(pending.keys(), dtype=cols.dtype, count=len(pending))])
+            values = np.concatenate([values, np.fromiter(pending.values(), dtype=np.float32, count=len(pending))])
+        return cols, values
+
+    def recommend(self, completed: Iterable[str], job_title: Optional[str] = None,
+                  candidates: Optional[Iterable[str]] = None, limit: int = 10) -> List[Dict]:
+        """
+        Courses most taken by users who completed the same courses (and share the job title).
+
+        Args:
+            completed: Course ids the user completed
+            job_title: The user's job title
+            candidates: Only recommend these course ids (e.g. the eligible next courses)
+            limit: Maximum number of recommendations
+
+        Returns:
+            Dicts with 'course_id', 'score' and 'because' (the completed course
+            that contributed most, or None when only the job title did), best first
+        """
+        if not self.ready:
+            return []
+        n = len(self.course_ids)
+        completed_rows = [self.index[c] for c in set(completed) if c in self.index]
+        with self._lock:
+            popularity = self.popularity.copy()
+            scores = np.zeros(n, dtype=np.float32)
+            best = np.zeros(n, dtype=np.float32)
+            because = np.full(n, -1, dtype=np.int64)
+            for course in completed_rows:
+                cols, values = self._row(self.cooccurrence, self._delta, course)
+                values = np.where(cols == course, 0.0, values)
+                contribution = np.zeros(n, dtype=np.float32)
+                np.add.at(contribution, cols, values / np.sqrt(max(popularity[course], 1.0)))
+                scores += contribution
+                improved = contribution > best
+                best[improved] = contribution[improved]
+                because[improved] = course
+
+            title = self.titles.get(job_title) if job_title else None
+            if title is not None and self.title_users[title] > 1:
+                cols, values = self._row(self.title_courses, self._title_delta, title)
+                np.add.at(scores, cols, JOB_TITLE_WEIGHT * values / np.sqrt(self.title_users[title]))
+
+        scores /= np.sqrt(popularity + POPULARITY_SHRINKAGE)
+        allowed = np.ones(n, dtype=bool)
+        if candidates is not None:
+            allowed[:] = False
+            allowed[[self.index[c] for c in candidates if c in self.index]] = True
+        allowed[completed_rows] = False
+        ranked = np.flatnonzero(allowed & (scores > 0))
+        if len(ranked) > limit:
+            ranked = ranked[np.argpartition(-scores[ranked], limit - 1)[:limit]]
+        ranked = ranked[np.lexsort((ranked, -scores[ranked]))]
+        return [
+            {
+                "course_id": self.course_ids[course],
+                "score": round(float(scores[course]), 4),
+                "because": self.course_ids[because[course]] if because[course] >= 0 else None,
+            }
+            for course in ranked
+        ]
+
+    def nbytes(self) -> int:
+        total = self.popularity.nbytes + self.title_users.nbytes
+        for matrix in (self.cooccurrence, self.title_courses):
+            if matrix is not None:
+                total += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+        return total
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "users": self.users,
+                "courses": len(self.course_ids),
+                "job_titles": len(self.titles),
+                "pairs": int(self.cooccurrence.nnz) if self.ready else 0,
+                "pending_updates": self._pending,
+                "built_at": self.built_at,
+                "log_position": self.log_position,
+                "catalog_version": self.catalog_version,
+            }
+
+    # -- persistence ------------------------------------------------------
+
+    def save(self, path: str):
+        with self._lock:
+            if self._pending:
+                self._merge()
+            arrays = {
+                "format": np.array(FORMAT),
+                "catalog_version": np.array(self.catalog_version or ""),
+                "course_ids": np.array(self.course_ids),
+                "titles": np.array(sorted(self.titles, key=self.titles.get)),
+                "users": np.array(self.users),
+                "built_at": np.array(self.built_at or 0.0),
+                "log_position": np.array(self.log_position),
+                "title_users": self.title_users,
+                "popularity": self.popularity,
+            }
+            for name, matrix in (("cooccurrence", self.cooccurrence), ("title_courses", self.title_courses)):
+                arrays[f"{name}_data"] = matrix.data
+                arrays[f"{name}_indices"] = matrix.indices
+                arrays[f"{name}_indptr"] = matrix.indptr
+                arrays[f"{name}_shape"] = np.array(matrix.shape)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+        self._saved_at = time.monotonic()
+
+    def load(self, path: str) -> bool:
+        """Replace the matrices with a saved build for the same catalog; False if unusable."""
+        from scipy import sparse
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if (int(data["format"]) != FORMAT or data["course_ids"].tolist() != self.course_ids
+                        or str(data["catalog_version"]) != (self.catalog_version or "")):
+                    return False
+                matrices = {
+                    name: sparse.csr_matrix(
+                        (data[f"{name}_data"], data[f"{name}_indices"], data[f"{name}_indptr"]),
+                        shape=tuple(data[f"{name}_shape"])
+                    )
+                    for name in ("cooccurrence", "title_courses")
+                }
+                with self._lock:
+                    self.cooccurrence = matrices["cooccurrence"]
+                    self.title_courses = matrices["title_courses"]
+                    self.title_users = data["title_users"].astype(np.float32)
+                    self.popularity = data["popularity"].astype(np.float32)
+                    self.titles = {title: i for i, title in enumerate(data["titles"].tolist())}
+                    self.users = int(data["users"])
+                    self.built_at = float(data["built_at"]) or None
+                    self.log_position = int(data["log_position"])
+                    self._delta.clear()
+                    self._title_delta.clear()
+                    self._pending = 0
+                return True
+        except (OSError, KeyError, ValueError):
+            return False
+
+
+def load_or_build_recommender(planner, path: Optional[str] = None) -> CourseRecommender:
+    """
+    A recommender for the planner's catalog, loaded from `path` or built from its user store.
+
+    A saved recommender is only used if the user store's completion log still
+    holds everything recorded since it was saved, which is then counted;
+    otherwise (another store, or a pruned log) it is rebuilt. A freshly built
+    or caught-up recommender is saved; failing to write it is never fatal.
+    """
+    path = path or course_cooccurrence_path(planner.snapshot_path)
+    store = planner.user_store
+    recommender = CourseRecommender(planner.courses, planner.catalog_version)
+    recommender.path = path
+    first, last = store.completion_log_bounds()
+    if recommender.load(path) and recommender.log_position <= last and (
+            not first or first <= recommender.log_position + 1):
+        if not recommender.catch_up(store, force=True):
+            return recommender
+    else:
+        recommender.build(store)
+    try:
+        recommender.save(path)
+    except OSError as e:
+        print(f"Could not write course co-occurrence to {path}: {e}")
+    return recommender
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.loader.dataLoader import load_catalog
+    from src.store.user_store import open_user_store
+
+    parser = argparse.ArgumentParser(description="Rebuild the course co-occurrence matrix from the user store")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Users read per chunk")
+    args = parser.parse_args()
+
+    course_data, _, version = load_catalog()
+    result = CourseRecommender(course_data, version)
+    started = time.perf_counter()
+    result.build(open_user_store(), chunk_size=args.chunk_size)
+    result.save(course_cooccurrence_path())
+    print(f"Co-occurrence for {result.users} users and {len(result.course_ids)} courses "
+          f"in {time.perf_counter() - started:.1f}s -> {course_cooccurrence_path()}")
@@ -0,0 +1,280 @@
+"""
+Week-by-week study schedules under a weekly hours budget.
+
+Given target badges, the courses already completed, the hours a learner can
+study per week and how many courses they are willing to take at once, the
+scheduler lays out every remaining course (including prerequisites of
+prerequisites) on a calendar. Independent courses run side by side, sharing
+the week's hours equally, and a course starts as soon as its prerequisites
+are done, even mid-week.
+
+Which ready course to start next is decided by list scheduling with
+critical-path priority: the course heading the longest chain of dependent
+hours goes first, so long prerequisite chains are never left for last.
+"""
+
+import heapq
+import math
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from src.common.lru import TTLCache
+
+# Hours assumed for a course whose catalog entry has none
+DEFAULT_COURSE_HOURS = 8.0
+# Give up on schedules longer than this (ten years of weeks)
+MAX_WEEKS = 520
+EPSILON = 1e-9
+
+
+class CourseScheduler:
+    """
+    Schedules courses for a planner's catalog.
+
+    Summaries (no calendar) are cached by input, since learners working
+    towards the same badges from the same completions get the same plan.
+    """
+
+    def __init__(self, planner, cache_size: int = 4096):
+        self.planner = planner
+        self.hours: Dict[str, float] = {
+            course_id: float(course.hours) if course.hours else DEFAULT_COURSE_HOURS
+            for course_id, course in planner.courses.items()
+        }
+        # Prerequisites outside the catalog can never be taken, so they do not block anything
+        self.prerequisites: Dict[str, Tuple[str, ...]] = {
+            course_id: tuple(p for p in course.prerequisites if p in planner.courses)
+            for course_id, course in planner.courses.items()
+        }
+        self._summaries = TTLCache(maxsize=cache_size)
+
+    # -- inputs -----------------------------------------------------------
+
+    def required_courses(self, target_badges: Iterable[str]) -> Tuple[Set[str], List[str]]:
+        """
+        Every catalog course the target badges need, prerequisites included.
+
+        Returns:
+            (course ids, badge course ids missing from the catalog)
+
+        Raises:
+            ValueError: For an unknown badge
+        """
+        required: Set[str] = set()
+        unavailable: List[str] = []
+        stack: List[str] = []
+        for badge_id in target_badges:
+            if badge_id not in self.planner.badges:
+                raise ValueError(f"Unknown badge: {badge_id}")
+            for course_id in self.planner.badge_courses.get(badge_id, ()):
+                if course_id in self.hours:
+                    stack.append(course_id)
+                elif course_id not in unavailable:
+                    unavailable.append(course_id)
+        while stack:
+            course_id = stack.pop()
+            if course_id not in required:
+                required.add(course_id)
+                stack.extend(self.prerequisites[course_id])
+        return required, unavailable
+
+    def _critical_path(self, courses: Set[str]) -> Dict[str, float]:
+        """Hours of the longest chain each course starts, counting only the given courses."""
+        blocking = {c: sum(1 for p in self.prerequisites[c] if p in courses) for c in courses}
+        order = [c for c, count in blocking.items() if count == 0]
+        for course_id in order:
+            for dependent in self.planner.course_dependents.get(course_id, ()):
+                if dependent in blocking:
+                    blocking[dependent] -= 1
+                    if blocking[dependent] == 0:
+                        order.append(dependent)
+        if len(order) < len(courses):
+            raise ValueError("Prerequisite cycle among the required courses")
+
+        priority: Dict[str, float] = {}
+        for course_id in reversed(order):
+            priority[course_id] = self.hours[course_id] + max(
+                (priority[d] for d in self.planner.course_dependents.get(course_id, ()) if d in priority),
+                default=0.0
+            )
+        return priority
+
+    # -- scheduling -------------------------------------------------------
+
+    def schedule(
+        self,
+        target_badges: Iterable[str],
+        completed: Iterable[str] = (),
+        weekly_hours: float = 6.0,
+        max_concurrent: int = 2,
+        in_progress: Iterable[str] = (),
+        detail: bool = True
+    ) -> Dict:
+        """
+        Plan the remaining courses for a set of target badges.
+
+        Args:
+            target_badges: Badge ids to earn
+            completed: Course ids already completed
+            weekly_hours: Study hours available per week
+            max_concurrent: Most courses taken at the same time
+            in_progress: Course ids already started; they are continued first
+            detail: Include the week-by-week calendar, not just the summary
+
+        Returns:
+            Dictionary with 'weeks' (to finish everything), 'total_hours',
+            'lower_bound_weeks', 'badges' (week each target badge is earned),
+            'courses' (start/finish week per course), 'unavailable' and, with
+            detail, 'calendar' (hours per course for each week)
+
+        Raises:
+            ValueError: For unknown badges, a non-positive budget or concurrency,
+                or a plan longer than MAX_WEEKS
+        """
+        if weekly_hours <= 0:
+            raise ValueError("weekly_hours must be positive")
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        targets = tuple(dict.fromkeys(target_badges))
+        required, unavailable = self.required_courses(targets)
+        completed_set = frozenset(completed) & required
+        remaining_courses = frozenset(required - completed_set)
+        started = frozenset(in_progress) & remaining_courses
+
+        if detail:
+            return self._schedule(targets, remaining_courses, started, weekly_hours, max_concurrent,
+                                  unavailable, detail=True)
+        key = (targets, remaining_courses, started, weekly_hours, max_concurrent)
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._schedule(targets, remaining_courses, started, weekly_hours, max_concurrent,
+                                     unavailable, detail=False)
+            self._summaries.set(key, summary)
+        return summary
+
+    def _schedule(self, targets: Tuple[str, ...], courses: FrozenSet[str], started: FrozenSet[str],
+                  weekly_hours: float, max_concurrent: int, unavailable: List[str], detail: bool) -> Dict:
+        priority = self._critical_path(set(courses))
+        remaining = {course_id: self.hours[course_id] for course_id in courses}
+        blocking = {
+            course_id: sum(1 for p in self.prerequisites[course_id] if p in courses)
+            for course_id in courses
+        }
+        # Started courses go first, then by longest chain of dependent hours
+        ready = [(course_id not in started, -priority[course_id], course_id)
+                 for course_id, count in blocking.items() if count == 0]
+        heapq.heapify(ready)
+        active: List[str] = []
+        start_week: Dict[str, int] = {}
+        finish_week: Dict[str, int] = {}
+        calendar: List[Dict] = []
+        week = 0
+
+        while remaining:
+            week += 1
+            if week > MAX_WEEKS:
+                raise ValueError(f"Schedule exceeds {MAX_WEEKS} weeks; increase weekly_hours")
+            budget = weekly_hours
+            spent: Dict[str, float] = {}
+            while budget > EPSILON:
+                while len(active) < max_concurrent and ready:
+                    course_id = heapq.heappop(ready)[2]
+                    active.append(course_id)
+                    start_week.setdefault(course_id, week)
+                if not active:
+                    break
+                # Share the hours equally until the next course finishes or the week's hours run out
+                step = min(budget / len(active), min(remaining[c] for c in active))
+                finished = []
+                for course_id in active:
+                    remaining[course_id] -= step
+                    spent[course_id] = spent.get(course_id, 0.0) + step
+                    if remaining[course_id] <= EPSILON:
+                        finished.append(course_id)
+                budget -= step * len(active)
+                for course_id in finished:
+                    active.remove(course_id)
+                    del remaining[course_id]
+                    finish_week[course_id] = week
+                    for dependent in self.planner.course_dependents.get(course_id, ()):
+                        if dependent in blocking:
+                            blocking[dependent] -= 1
+                            if blocking[dependent] == 0:
+                                heapq.heappush(ready, (dependent not in started, -priority[dependent], dependent))
+            if not spent and remaining:
+                raise ValueError("Remaining courses cannot be scheduled: their prerequisites are unreachable")
+            if detail:
+                calendar.append({
+                    "week": week,
+                    "hours": round(sum(spent.values()), 2),
+                    "courses": [
+                        {"course_id": course_id, "hours": round(hours, 2), "finished": finish_week.get(course_id) == week}
+                        for course_id, hours in spent.items()
+                    ],
+                })
+
+        total_hours = sum(self.hours[c] for c in courses)
+        longest_chain = max(priority.values(), default=0.0)
+        result = {
+            "weeks": week,
+            "total_hours": round(total_hours, 2),
+            # No schedule can beat the total hours or the longest prerequisite chain at full budget
+            "lower_bound_weeks": math.ceil(max(total_hours, longest_chain) / weekly_hours - EPSILON),
+            # Badges needing a course missing from the catalog cannot be earned
+            "badges": {
+                badge_id: None if any(c in unavailable for c in self.planner.badge_courses.get(badge_id, ())) else
+                max((finish_week.get(c, 0) for c in self.planner.badge_courses.get(badge_id, ())), default=0)
+                for badge_id in targets
+            },
+            "courses": {
+                course_id: {"start_week": start_week[course_id], "finish_week": finish_week[course_id]}
+                for course_id in sorted(finish_week, key=lambda c: (finish_week[c], start_week[c], c))
+            },
+            "unavailable": unavailable,
+        }
+        if detail:
+            result["calendar"] = calendar
+        return result
+
+    def schedule_many(
+        self,
+        users: Iterable[Dict],
+        target_badges: Iterable[str],
+        weekly_hours: float = 6.0,
+        max_concurrent: int = 2
+    ) -> Iterable[Dict]:
+        """
+        Summaries for many users towards the same badges, for workforce reports.
+
+        Yields:
+            Per user: 'user_id', 'weeks', 'total_hours' and 'badges'
+        """
+        targets = tuple(target_badges)
+        for user in users:
+            summary = self.schedule(
+                targets, user.get("completed_courses", ()), weekly_hours, max_concurrent,
+                in_progress=user.get("in_progress_courses", ()), detail=False
+            )
+            yield {
+                "user_id": user.get("id"),
+                "weeks": summary["weeks"],
+                "total_hours": summary["total_hours"],
+                "badges": summary["badges"],
+            }
+
+
+def summarize_weeks(weeks: List[int]) -> Dict:
+    """Distribution of weeks-to-finish across users."""
+    if not weeks:
+        return {"users": 0}
+    ordered = sorted(weeks)
+
+    def percentile(p: float) -> int:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "users": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2),
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "max": ordered[-1],
+    }
@@ -0,0 +1,369 @@
+"""
+In-memory full-text search over the catalog with BM25 ranking.
+
+Courses are indexed on title, description, topics and projects and badges on
+title, description and skills; titles and topics/skills count more than
+free text. Each term's BM25 contribution to every document containing it is
+precomputed when the index is built, so a query only sums a few NumPy arrays.
+
+Query terms match exactly, by prefix (so partially typed words match) and
+within one typo (deletion-neighbourhood lookup, as in SymSpell); approximate
+matches score lower than exact ones. Results can be filtered and faceted by
+type, level, hours and related badge.
+"""
+
+import bisect
+import heapq
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.planner.catalog_table import LEVEL_CODES, LEVEL_NAMES, NO_BADGE
+
+TYPES = ("course", "badge")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Field weights: a term in a title says more about a document than one in its description
+COURSE_FIELDS = (("name", 3.0), ("topics", 2.0), ("description", 1.0), ("projects", 1.0))
+BADGE_FIELDS = (("name", 3.0), ("skills", 2.0), ("description", 1.0))
+
+# Approximate matches count for less than exact ones
+PREFIX_WEIGHT = 0.7
+TYPO_WEIGHT = 0.5
+MIN_PREFIX_LENGTH = 2
+MIN_TYPO_LENGTH = 4
+# Cap on the vocabulary terms one prefix expands to (the most common ones win)
+MAX_PREFIX_EXPANSIONS = 20
+# Prefix expansions are precomputed for prefixes up to this length
+PRECOMPUTED_PREFIX_LENGTH = 3
+
+# Hours facet buckets: [0, 10), [10, 20), [20, 40), [40, inf)
+HOURS_BUCKETS = (0, 10, 20, 40)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it of on or that the their this to with your you".split()
+)
+_TOKEN = re.compile(r"[a-z0-9]+(?:[+#]+)?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords, with simple plural folding."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _deletes(term: str) -> Iterable[str]:
+    return (term[:i] + term[i + 1:] for i in range(len(term)))
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Levenshtein distance <= 1, or a single adjacent transposition."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        return len(diff) == 1 or (
+            len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+        )
+    if la > lb:
+        a, b = b, a
+    # b is one longer than a: it must be a with one character inserted
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+
+class SearchIndex:
+    """
+    Inverted index over courses and badges.
+
+    Documents are numbered 0..n-1; per-document attributes used for filters
+    and facets are NumPy columns indexed by document number.
+    """
+
+    def __init__(self, courses: Dict, badges: Dict, course_level, badge_level):
+        self.doc_ids: List[str] = []
+        self.titles: List[str] = []
+        self.descriptions: List[str] = []
+        types, levels, hours, related = [], [], [], []
+        self.badge_ids: List[str] = list(badges)
+        self.badge_index: Dict[str, int] = {badge_id: i for i, badge_id in enumerate(self.badge_ids)}
+
+        term_freqs: List[Dict[str, float]] = []
+        for course in courses.values():
+            term_freqs.append(self._weighted_terms(course, COURSE_FIELDS))
+            self.doc_ids.append(course.id)
+            self.titles.append(course.name or "")
+            self.descriptions.append(course.description or "")
+            types.append(0)
+            levels.append(LEVEL_CODES.get(course_level(course.id), 0))
+            hours.append(course.hours if course.hours is not None else np.nan)
+            related.append(self.badge_index.get(course.related_badge, NO_BADGE))
+        for badge in badges.values():
+            term_freqs.append(self._weighted_terms(badge, BADGE_FIELDS))
+            self.doc_ids.append(badge.id)
+            self.titles.append(badge.name or "")
+            self.descriptions.append(badge.description or "")
+            types.append(1)
+            levels.append(LEVEL_CODES.get(badge_level(badge.id), 0))
+            hours.append(np.nan)
+            # A badge is its own "related badge", so filtering by badge finds it and its courses
+            related.append(self.badge_index[badge.id])
+
+        self.types = np.asarray(types, dtype=np.int8)
+        self.levels = np.asarray(levels, dtype=np.int8)
+        self.hours = np.asarray(hours, dtype=np.float32)
+        self.related_badge = np.asarray(related, dtype=np.int32)
+        self.doc_index = {(TYPES[t], doc_id): i for i, (t, doc_id) in enumerate(zip(types, self.doc_ids))}
+        self._build_postings(term_freqs)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def nbytes(self) -> int:
+        """Approximate size: posting arrays and columns, plus a rough allowance per vocabulary entry."""
+        postings = sum(docs.nbytes + impact.nbytes for docs, impact in self.postings.values())
+        columns = sum(a.nbytes for a in (self.types, self.levels, self.hours, self.related_badge))
+        # Dict slots, term strings and list entries across postings, doc_freq, vocabulary and deletes
+        return postings + columns + 200 * len(self.postings) + 120 * len(self._deletes)
+
+    @classmethod
+    def from_planner(cls, planner) -> "SearchIndex":
+        return cls(planner.courses, planner.badges, planner.course_level, planner.badge_level)
+
+    @staticmethod
+    def _weighted_terms(item, fields: Sequence[Tuple[str, float]]) -> Dict[str, float]:
+        freqs: Dict[str, float] = {}
+        for attr, weight in fields:
+            value = getattr(item, attr) or ""
+            text = " ".join(value) if isinstance(value, tuple) else value
+            for token in tokenize(text):
+                freqs[token] = freqs.get(token, 0.0) + weight
+        return freqs
+
+    def _build_postings(self, term_freqs: List[Dict[str, float]]):
+        n = len(term_freqs)
+        lengths = np.asarray([sum(freqs.values()) for freqs in term_freqs], dtype=np.float32)
+        avg_length = float(lengths.mean()) if n else 0.0
+        norm = K1 * (1 - B + B * lengths / avg_length) if n else lengths
+
+        postings: Dict[str, Tuple[List[int], List[float]]] = {}
+        for doc, freqs in enumerate(term_freqs):
+            for term, tf in freqs.items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(doc)
+                tfs.append(tf)
+
+        # term -> (doc numbers, precomputed BM25 contribution of the term to each)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.doc_freq: Dict[str, int] = {}
+        for term, (docs, tfs) in postings.items():
+            docs_array = np.asarray(docs, dtype=np.int32)
+            tf_array = np.asarray(tfs, dtype=np.float32)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            impact = idf * tf_array * (K1 + 1) / (tf_array + norm[docs_array])
+            self.postings[term] = (docs_array, impact.astype(np.float32))
+            self.doc_freq[term] = len(docs)
+
+        self.vocabulary = sorted(self.postings)
+        self._prefix_expansions: Dict[str, List[str]] = {}
+        for length in range(MIN_PREFIX_LENGTH, PRECOMPUTED_PREFIX_LENGTH + 1):
+            groups: Dict[str, List[str]] = {}
+            for term in self.vocabulary:
+                if len(term) > length:
+                    groups.setdefault(term[:length], []).append(term)
+            for prefix, terms in groups.items():
+                self._prefix_expansions[prefix] = heapq.nlargest(
+                    MAX_PREFIX_EXPANSIONS, terms, key=self.doc_freq.__getitem__
+                )
+
+        self._deletes: Dict[str, List[str]] = {}
+        for term in self.vocabulary:
+            if len(term) >= MIN_TYPO_LENGTH:
+                for variant in set(_deletes(term)):
+                    self._deletes.setdefault(variant, []).append(term)
+
+    # -- query expansion --------------------------------------------------
+
+    def _prefix_matches(self, token: str) -> List[str]:
+        if len(token) < MIN_PREFIX_LENGTH:
+            return []
+        if len(token) <= PRECOMPUTED_PREFIX_LENGTH:
+            return self._prefix_expansions.get(token, [])
+        start = bisect.bisect_right(self.vocabulary, token)
+        end = bisect.bisect_left(self.vocabulary, token + "\uffff", start)
+        return heapq.nlargest(MAX_PREFIX_EXPANSIONS, self.vocabulary[start:end], key=self.doc_freq.__getitem__)
+
+    def _typo_matches(self, token: str) -> List[str]:
+        if len(token) < MIN_TYPO_LENGTH:
+            return []
+        candidates = set(self._deletes.get(token, ()))  # one character missing from the query
+        for variant in _deletes(token):
+            if variant in self.postings:  # one extra character in the query
+                candidates.add(variant)
+            candidates.update(self._deletes.get(variant, ()))  # substitutions and transpositions
+        candidates.discard(token)
+        return [term for term in candidates if _within_one_edit(token, term)]
+
+    def expand(self, query: str) -> Dict[str, float]:
+        """Vocabulary terms matched by a query, with the weight of each match."""
+        terms: Dict[str, float] = {}
+        tokens = tokenize(query)
+        for position, token in enumerate(tokens):
+            exact = token in self.postings
+            if exact:
+                terms[token] = max(terms.get(token, 0.0), 1.0)
+            # The last token is usually still being typed; earlier ones only expand if unknown
+            if not exact or position == len(tokens) - 1:
+                for term in self._prefix_matches(token):
+                    terms[term] = max(terms.get(term, 0.0), PREFIX_WEIGHT)
+            if not exact:
+                for term in self._typo_matches(token):
+                    terms[term] = max(terms.get(term, 0.0), TYPO_WEIGHT)
+        return terms
+
+    # -- search -----------------------------------------------------------
+
+    def _filter_mask(self, doc_type: Optional[str], level: Optional[str], min_hours: Optional[float],
+                     max_hours: Optional[float], badge: Optional[str]) -> Optional[np.ndarray]:
+        mask = None
+
+        def narrow(condition):
+            nonlocal mask
+            mask = condition if mask is None else mask & condition
+
+        if doc_type is not None:
+            narrow(self.types == TYPES.index(doc_type))
+        if level is not None:
+            narrow(self.levels == LEVEL_CODES[level])
+        if min_hours is not None:
+            narrow(self.hours >= min_hours)
+        if max_hours is not None:
+            narrow(self.hours <= max_hours)
+        if badge is not None:
+            # An unknown badge matches nothing
+            narrow(self.related_badge == self.badge_index.get(badge, NO_BADGE - 1))
+        return mask
+
+    def search(
+        self,
+        query: str = "",
+        offset: int = 0,
+        limit: int = 20,
+        doc_type: Optional[str] = None,
+        level: Optional[str] = None,
+        min_hours: Optional[float] = None,
+        max_hours: Optional[float] = None,
+        badge: Optional[str] = None
+    ) -> Dict:
+        """
+        Rank documents for a query.
+
+        An empty query returns every document that passes the filters, in
+        catalog order.
+
+        Args:
+            query: Free text
+            offset, limit: Page of results to return
+            doc_type: "course" or "badge"
+            level: "basic", "intermediate" or "expert"
+            min_hours, max_hours: Course hours range (badges have no hours)
+            badge: Related badge id
+
+        Returns:
+            Dictionary with 'total', 'results' (type, id, title, score and
+            facet attributes) and 'facets' counts over all matches
+
+        Raises:
+            ValueError: For an unknown type or level
+        """
+        if doc_type is not None and doc_type not in TYPES:
+            raise ValueError(f"type must be one of {', '.join(TYPES)}")
+        if level is not None and level not in LEVEL_CODES:
+            raise ValueError(f"level must be one of {', '.join(LEVEL_NAMES)}")
+
+        mask = self._filter_mask(doc_type, level, min_hours, max_hours, badge)
+        terms = self.expand(query) if query.strip() else None
+
+        if terms is None:
+            matches = np.flatnonzero(mask) if mask is not None else np.arange(len(self), dtype=np.int64)
+            scores = None
+            ranked = matches
+        else:
+            scores = np.zeros(len(self), dtype=np.float32)
+            for term, weight in terms.items():
+                docs, impact = self.postings[term]
+                # Each document appears once per posting list, so fancy-index add is safe
+                scores[docs] += impact * weight if weight != 1.0 else impact
+            hit = scores > 0
+            if mask is not None:
+                hit &= mask
+            matches = np.flatnonzero(hit)
+            # Only the requested page needs a full sort
+            wanted = min(offset + limit, len(matches))
+            if wanted < len(matches):
+                top = np.argpartition(-scores[matches], wanted - 1)[:wanted]
+                candidates = matches[top]
+            else:
+                candidates = matches
+            ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
+
+        page = ranked[offset:offset + limit]
+        return {
+            "total": int(len(matches)),
+            "results": [self._result(int(doc), scores) for doc in page],
+            "facets": self._facets(matches),
+        }
+
+    def _result(self, doc: int, scores: Optional[np.ndarray]) -> Dict:
+        related = int(self.related_badge[doc])
+        hours = float(self.hours[doc])
+        return {
+            "type": TYPES[self.types[doc]],
+            "id": self.doc_ids[doc],
+            "title": self.titles[doc],
+            "description": self.descriptions[doc],
+            "score": round(float(scores[doc]), 4) if scores is not None else None,
+            "level": LEVEL_NAMES[self.levels[doc]],
+            "hours": None if math.isnan(hours) else hours,
+            "related_badge": self.badge_ids[related] if related != NO_BADGE else None,
+        }
+
+    def _facets(self, matches: np.ndarray) -> Dict:
+        levels = np.bincount(self.levels[matches], minlength=len(LEVEL_NAMES))
+        types = np.bincount(self.types[matches], minlength=len(TYPES))
+        related = self.related_badge[matches]
+        related = related[related != NO_BADGE]
+        badge_counts = np.bincount(related, minlength=len(self.badge_ids)) if len(related) else np.zeros(0, int)
+        hours = self.hours[matches]
+        hours = hours[~np.isnan(hours)]
+        bucket_counts = np.bincount(np.searchsorted(HOURS_BUCKETS, hours, side="right") - 1,
+                                    minlength=len(HOURS_BUCKETS)) if len(hours) else [0] * len(HOURS_BUCKETS)
+        bounds = list(HOURS_BUCKETS) + [None]
+        return {
+            "type": {name: int(count) for name, count in zip(TYPES, types) if count},
+            "level": {name: int(count) for name, count in zip(LEVEL_NAMES, levels) if count},
+            "hours": [
+                {"min": bounds[i], "max": bounds[i + 1], "count": int(bucket_counts[i])}
+                for i in range(len(HOURS_BUCKETS)) if bucket_counts[i]
+            ],
+            "related_badge": {
+                self.badge_ids[i]: int(badge_counts[i])
+                for i in np.argsort(-badge_counts, kind="stable")[:20] if badge_counts[i]
+            },
+        }
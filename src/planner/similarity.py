@@ -0,0 +1,284 @@
+"""
+Precomputed "similar courses" from TF-IDF cosine similarity.
+
+Each course becomes a sparse TF-IDF vector over the words of its topics,
+description and projects. The top-k most similar courses for every course
+are computed once per catalog version and saved next to the catalog
+snapshot, so serving a lookup is a dict access and an array slice.
+
+Exact neighbours come from multiplying the (L2-normalized) matrix with its
+transpose a block of rows at a time, so memory stays bounded on large
+catalogs. The approximate mode only multiplies each course's few strongest,
+rarer terms to find candidates, then scores those candidates exactly.
+
+    python -m src.planner.similarity [--approximate] [--k 20]
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.loader.dataLoader import catalog_snapshot_path
+from src.planner.search import tokenize
+
+DEFAULT_K = 20
+# Dense similarity block size for exact neighbours (rows x catalog size float32)
+BLOCK_BYTES = 64 * 1024 * 1024
+# Catalogs larger than this use the approximate mode unless told otherwise
+APPROXIMATE_THRESHOLD = 50000
+# Approximate mode: terms kept per course, document-frequency cap and candidates per neighbour
+APPROX_TERMS = 8
+APPROX_MAX_DF = 0.05
+APPROX_CANDIDATES = 4
+NO_NEIGHBOUR = -1
+FORMAT = 1
+
+
+def similar_courses_path(snapshot_path: Optional[str] = None) -> str:
+    """Next to the given catalog snapshot, or SIMILAR_COURSES_PATH / next to the default one."""
+    if snapshot_path:
+        return os.path.join(os.path.dirname(snapshot_path), ".similar_courses.npz")
+    return os.getenv(
+        "SIMILAR_COURSES_PATH", os.path.join(os.path.dirname(catalog_snapshot_path()), ".similar_courses.npz")
+    )
+
+
+def tfidf_matrix(courses: Dict):
+    """
+    L2-normalized TF-IDF rows (scipy CSR, float32), one per course in dict order.
+
+    Uses sublinear term frequency and smoothed IDF; terms found in only one
+    course are dropped since they cannot make two courses similar.
+    """
+    from scipy import sparse
+
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    for row, course in enumerate(courses.values()):
+        text = " ".join([*course.topics, course.description or "", *course.projects])
+        for token in tokenize(text):
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    n = len(courses)
+    counts = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, len(vocabulary))
+    )
+    counts.sum_duplicates()
+    doc_freq = np.bincount(counts.indices, minlength=len(vocabulary))
+    counts = counts[:, np.flatnonzero(doc_freq > 1)].tocsr()
+    doc_freq = doc_freq[doc_freq > 1]
+
+    idf = (np.log((1 + n) / (1 + doc_freq)) + 1).astype(np.float32)
+    counts.data = 1 + np.log(counts.data)
+    weights = counts.multiply(idf).tocsr()
+    norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((1 / norms).astype(np.float32)).dot(weights).tocsr().astype(np.float32)
+
+
+def _rank_rows(scores: np.ndarray, cols: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort each row's k candidates by descending score, marking non-positive ones as missing."""
+    order = np.argsort(-scores, axis=1, kind="stable")
+    scores = np.take_along_axis(scores, order, axis=1)
+    cols = np.take_along_axis(cols, order, axis=1)
+    cols[scores <= 0] = NO_NEIGHBOUR
+    scores[scores <= 0] = 0
+    return cols.astype(np.int32), scores.astype(np.float32)
+
+
+def exact_neighbours(matrix, k: int, block_rows: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k cosine neighbours of every row by blocked sparse matrix multiplication.
+
+    Returns:
+        (neighbours, scores): n x k arrays of row numbers (NO_NEIGHBOUR when
+        fewer than k rows share any term) and cosine similarities
+    """
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    neighbours = np.full((n, max(k, 0)), NO_NEIGHBOUR, dtype=np.int32)
+    scores = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return neighbours, scores
+
+    transposed = matrix.T.tocsc()
+    block_rows = block_rows or max(1, BLOCK_BYTES // (4 * n))
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        block = (matrix[start:stop] @ transposed).toarray()
+        block[np.arange(stop - start), np.arange(start, stop)] = -1  # a course is not similar to itself
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        neighbours[start:stop], scores[start:stop] = _rank_rows(np.take_along_axis(block, top, axis=1), top, k)
+    return neighbours, scores
+
+
+def _row_numbers(block) -> np.ndarray:
+    """Row number of each stored value of a CSR matrix."""
+    return np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+
+
+def _top_per_row(block, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(rows, cols, values, rank) of the `count` largest stored values in each row of a CSR matrix."""
+    rows = _row_numbers(block)
+    order = np.lexsort((-block.data, rows))
+    rank = np.arange(len(order)) - block.indptr[rows[order]]
+    keep = order[rank < count]
+    return rows[keep], block.indices[keep], block.data[keep], rank[rank < count]
+
+
+def approximate_neighbours(matrix, k: int, block_rows: int = 4096) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k neighbours from pruned vectors, rescored exactly.
+
+    Candidates are found by multiplying vectors that keep only each course's
+    APPROX_TERMS strongest terms among those in at most APPROX_MAX_DF of the
+    courses, which keeps the product sparse. Pairs that share only common
+    or weak terms can be missed.
+    """
+    from scipy import sparse
+
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    neighbours = np.full((n, max(k, 0)), NO_NEIGHBOUR, dtype=np.int32)
+    scores = np.zeros((n, max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return neighbours, scores
+
+    doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    rare = matrix.multiply((doc_freq <= max(2, APPROX_MAX_DF * n)).astype(np.float32)).tocsr()
+    rare.eliminate_zeros()
+    rows, cols, values, _ = _top_per_row(rare, APPROX_TERMS)
+    pruned = sparse.csr_matrix((values, (rows, cols)), shape=matrix.shape)
+    transposed = pruned.T.tocsc()
+
+    candidates = k * APPROX_CANDIDATES
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        block = (pruned[start:stop] @ transposed).tocsr()
+        block.data[block.indices == _row_numbers(block) + start] = 0  # a course is not similar to itself
+        block.eliminate_zeros()
+        rows, cols, _, rank = _top_per_row(block, candidates)
+        if not len(rows):
+            continue
+        # Exact cosine for each candidate pair
+        exact = np.asarray(matrix[rows + start].multiply(matrix[cols]).sum(axis=1)).ravel()
+        block_scores = np.zeros((stop - start, candidates), dtype=np.float32)
+        block_cols = np.zeros((stop - start, candidates), dtype=np.int64)
+        block_scores[rows, rank] = exact
+        block_cols[rows, rank] = cols
+        top = np.argpartition(-block_scores, k - 1, axis=1)[:, :k]
+        neighbours[start:stop], scores[start:stop] = _rank_rows(
+            np.take_along_axis(block_scores, top, axis=1), np.take_along_axis(block_cols, top, axis=1), k
+        )
+    return neighbours, scores
+
+
+class SimilarCourses:
+    """Precomputed top-k similar courses for one catalog version."""
+
+    def __init__(self, course_ids: List[str], neighbours: np.ndarray, scores: np.ndarray,
+                 catalog_version: str, method: str):
+        self.course_ids = list(course_ids)
+        self.row: Dict[str, int] = {course_id: i for i, course_id in enumerate(self.course_ids)}
+        self.neighbours = neighbours
+        self.scores = scores
+        self.catalog_version = catalog_version
+        self.method = method
+
+    @property
+    def k(self) -> int:
+        return self.neighbours.shape[1]
+
+    def nbytes(self) -> int:
+        return self.neighbours.nbytes + self.scores.nbytes
+
+    @classmethod
+    def build(cls, courses: Dict, catalog_version: str, k: int = DEFAULT_K,
+              approximate: Optional[bool] = None) -> "SimilarCourses":
+        """Compute neighbours for every course; `approximate` defaults to on for large catalogs."""
+        if approximate is None:
+            approximate = len(courses) > APPROXIMATE_THRESHOLD
+        matrix = tfidf_matrix(courses)
+        neighbours, scores = (approximate_neighbours if approximate else exact_neighbours)(matrix, k)
+        return cls(list(courses), neighbours, scores, catalog_version,
+                   "approximate" if approximate else "exact")
+
+    def similar(self, course_id: str, limit: Optional[int] = None) -> Optional[List[Tuple[str, float]]]:
+        """(course id, cosine similarity) pairs, most similar first, or None for an unknown course."""
+        row = self.row.get(course_id)
+        if row is None:
+            return None
+        neighbours = self.neighbours[row, :limit]
+        scores = self.scores[row, :limit]
+        return [(self.course_ids[n], float(s)) for n, s in zip(neighbours, scores) if n != NO_NEIGHBOUR]
+
+    def save(self, path: str):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                format=np.array(FORMAT),
+                catalog_version=np.array(self.catalog_version),
+                method=np.array(self.method),
+                course_ids=np.array(self.course_ids),
+                neighbours=self.neighbours,
+                scores=self.scores.astype(np.float16),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, catalog_version: str) -> Optional["SimilarCourses"]:
+        """The stored neighbours, or None if missing, unreadable or for another catalog version."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["format"]) != FORMAT or str(data["catalog_version"]) != catalog_version:
+                    return None
+                return cls(data["course_ids"].tolist(), data["neighbours"], data["scores"].astype(np.float32),
+                           catalog_version, str(data["method"]))
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def load_or_build_similar_courses(courses: Dict, catalog_version: str, path: Optional[str] = None,
+                                  k: int = DEFAULT_K) -> SimilarCourses:
+    """
+    Stored neighbours for this catalog version, computing and storing them if needed.
+
+    Failing to write the file is never fatal.
+    """
+    path = path or similar_courses_path()
+    similar = SimilarCourses.load(path, catalog_version)
+    if similar is not None and similar.k >= min(k, len(courses) - 1):
+        return similar
+    similar = SimilarCourses.build(courses, catalog_version, k)
+    try:
+        similar.save(path)
+    except OSError as e:
+        print(f"Could not write similar courses to {path}: {e}")
+    return similar
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from src.loader.dataLoader import load_catalog
+    from src.models.course import Course
+
+    parser = argparse.ArgumentParser(description="Precompute similar courses for the current catalog")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="Neighbours stored per course")
+    parser.add_argument("--approximate", action="store_true", default=None,
+                        help=f"Use the approximate mode (default above {APPROXIMATE_THRESHOLD} courses)")
+    parser.add_argument("--exact", dest="approximate", action="store_false", help="Force exact neighbours")
+    args = parser.parse_args()
+
+    course_data, _, version = load_catalog()
+    catalog = {course_id: Course.from_dict(data) for course_id, data in course_data.items()}
+    started = time.perf_counter()
+    result = SimilarCourses.build(catalog, version, args.k, args.approximate)
+    result.save(similar_courses_path())
+    print(f"{result.method} neighbours for {len(catalog)} courses (catalog {version}) "
+          f"in {time.perf_counter() - started:.1f}s -> {similar_courses_path()}")
@@ -0,0 +1,278 @@
+"""
+Per-tenant course and badge catalogs.
+
+Each tenant (a business unit) has its own catalog directory, laid out like
+data/badge-course-creation. The registry builds a tenant's TrainingPlanner on
+first use and keeps the loaded ones in least-recently-used order; once their
+estimated memory exceeds the budget (or more than `max_tenants` are loaded)
+the least recently used are dropped and simply reloaded, from their catalog
+snapshot, the next time they are asked for. The default tenant is never
+evicted. All tenants share one user store.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.loader.dataLoader import catalog_snapshot_path, default_catalog_dir
+
+DEFAULT_TENANT = "default"
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+SNAPSHOT_FILENAME = ".catalog_snapshot.pickle"
+
+
+def load_tenant_catalogs(spec: Optional[str] = None, root: Optional[str] = None) -> Dict[str, str]:
+    """
+    Tenant id -> catalog directory.
+
+    Args:
+        spec: JSON object, or the path of a file holding one, mapping tenant ids
+            to a catalog directory or to {"catalog_dir": ...} (TENANT_CATALOGS)
+        root: Directory whose subdirectories are each a tenant's catalog,
+            named after the subdirectory (TENANT_CATALOG_ROOT)
+
+    Returns:
+        Catalog directories by tenant id; the default tenant is always present
+        and uses the shipped catalog unless configured otherwise
+
+    Raises:
+        ValueError: For malformed configuration, an invalid tenant id or a
+            missing catalog directory
+    """
+    spec = os.getenv("TENANT_CATALOGS") if spec is None else spec
+    root = os.getenv("TENANT_CATALOG_ROOT") if root is None else root
+    catalogs: Dict[str, str] = {}
+
+    if root:
+        for name in sorted(os.listdir(root)):
+            if os.path.isdir(os.path.join(root, name)) and TENANT_ID_PATTERN.match(name):
+                catalogs[name] = os.path.join(root, name)
+
+    if spec:
+        if not spec.lstrip().startswith("{"):
+            with open(spec, "r") as f:
+                spec = f.read()
+        try:
+            configured = json.loads(spec)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"TENANT_CATALOGS is not valid JSON: {e}")
+        if not isinstance(configured, dict):
+            raise ValueError("TENANT_CATALOGS must be a JSON object")
+        for tenant_id, entry in configured.items():
+            catalog_dir = entry.get("catalog_dir") if isinstance(entry, dict) else entry
+            if not isinstance(catalog_dir, str):
+                raise ValueError(f"Tenant {tenant_id!r} needs a catalog_dir")
+            catalogs[tenant_id] = catalog_dir
+
+    catalogs.setdefault(DEFAULT_TENANT, default_catalog_dir())
+    for tenant_id, catalog_dir in catalogs.items():
+        if not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError(f"Invalid tenant id {tenant_id!r}: use letters, digits, '-' and '_'")
+        if not os.path.isdir(catalog_dir):
+            raise ValueError(f"Catalog directory for tenant {tenant_id!r} does not exist: {catalog_dir}")
+    return catalogs
+
+
+class Tenant:
+    """A loaded tenant: its planner and the progress tracker writing through it."""
+
+    def __init__(self, tenant_id: str, planner, progress_tracker):
+        self.id = tenant_id
+        self.planner = planner
+        self.progress_tracker = progress_tracker
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+
+    def memory_usage(self) -> Dict[str, int]:
+        return self.planner.memory_usage()
+
+
+class TenantRegistry:
+    """
+    Lazily loaded, LRU-evicted planners, one per tenant.
+
+    Thread-safe: concurrent first requests for a tenant load it once (each
+    tenant has its own load lock, so a slow load does not block the others).
+    """
+
+    def __init__(
+        self,
+        catalogs: Dict[str, str],
+        user_store=None,
+        memory_budget: int = 2048 * 1024 * 1024,
+        max_tenants: int = 16,
+        cache_dir: Optional[str] = None,
+        planner_factory: Optional[Callable] = None
+    ):
+        """
+        Args:
+            catalogs: Catalog directory by tenant id (see load_tenant_catalogs)
+            user_store: Store shared by every tenant's planner; opened by the
+                first planner when not given
+            memory_budget: Bytes the loaded tenants may hold before eviction
+            max_tenants: Most tenants loaded at once
+            cache_dir: Where non-default tenants keep their catalog snapshot and
+                derived indexes, one subdirectory each; defaults to tenants/
+                next to the default catalog snapshot
+            planner_factory: Called as factory(user_store=..., catalog_dir=...,
+                snapshot_path=...); defaults to TrainingPlanner
+        """
+        self.catalogs = dict(catalogs)
+        self.user_store = user_store
+        self.memory_budget = memory_budget
+        self.max_tenants = max(1, max_tenants)
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(catalog_snapshot_path()), "tenants")
+        self.planner_factory = planner_factory
+        self._loaded: "OrderedDict[str, Tenant]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {tenant_id: threading.Lock() for tenant_id in self.catalogs}
+        self._loads = {tenant_id: 0 for tenant_id in self.catalogs}
+        self._evictions = {tenant_id: 0 for tenant_id in self.catalogs}
+        self._errors: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls, user_store=None) -> "TenantRegistry":
+        return cls(
+            load_tenant_catalogs(),
+            user_store=user_store,
+            memory_budget=int(float(os.getenv("TENANT_MEMORY_BUDGET_MB", "2048")) * 1024 * 1024),
+            max_tenants=int(os.getenv("MAX_TENANTS", "16")),
+            cache_dir=os.getenv("TENANT_CACHE_DIR"),
+        )
+
+    def __contains__(self, tenant_id: str) -> bool:
+        return tenant_id in self.catalogs
+
+    def snapshot_path(self, tenant_id: str) -> Optional[str]:
+        """The default tenant keeps the usual snapshot location (None); others get their own directory."""
+        if tenant_id == DEFAULT_TENANT:
+            return None
+        return os.path.join(self.cache_dir, tenant_id, SNAPSHOT_FILENAME)
+
+    def _load(self, tenant_id: str) -> Tenant:
+        from src.planner.progress import ProgressTracker
+
+        snapshot_path = self.snapshot_path(tenant_id)
+        if snapshot_path:
+            os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        factory = self.planner_factory
+        if factory is None:
+            from src.planner.training_planner import TrainingPlanner
+            factory = TrainingPlanner
+        planner = factory(user_store=self.user_store, catalog_dir=self.catalogs[tenant_id], snapshot_path=snapshot_path)
+        if self.user_store is None:
+            self.user_store = planner.user_store
+        return Tenant(tenant_id, planner, ProgressTracker(planner))
+
+    def get(self, tenant_id: str) -> Tenant:
+        """
+        The tenant's loaded planner, loading it on first use.
+
+        Raises:
+            KeyError: For an unknown tenant
+            Exception: Whatever loading the tenant's catalog raised
+        """
+        if tenant_id not in self.catalogs:
+            raise KeyError(tenant_id)
+        with self._lock:
+            tenant = self._loaded.get(tenant_id)
+            if tenant is not None:
+                self._loaded.move_to_end(tenant_id)
+                tenant.last_used = time.monotonic()
+                return tenant
+
+        with self._load_locks[tenant_id]:
+            with self._lock:
+                tenant = self._loaded.get(tenant_id)
+            if tenant is None:
+                try:
+                    tenant = self._load(tenant_id)
+                except Exception as e:
+                    self._errors[tenant_id] = str(e)
+                    raise
+                self._errors.pop(tenant_id, None)
+                with self._lock:
+                    self._loaded[tenant_id] = tenant
+                    self._loads[tenant_id] += 1
+        self.enforce_budget(keep=(tenant_id,))
+        return tenant
+
+    def loaded(self, tenant_id: str) -> Optional[Tenant]:
+        """The tenant if it is loaded, without loading it or touching its LRU position."""
+        with self._lock:
+            return self._loaded.get(tenant_id)
+
+    def loaded_tenants(self) -> List[Tenant]:
+        with self._lock:
+            return list(self._loaded.values())
+
+    def enforce_budget(self, keep: Iterable[str] = ()) -> List[str]:
+        """
+        Evict least recently used tenants until the loaded ones fit the budget.
+
+        Indexes built after a tenant loaded count too, so this is also worth
+        calling after requests that may have built one.
+
+        Args:
+            keep: Tenant ids not to evict (e.g. those serving a request)
+
+        Returns:
+            The evicted tenant ids
+        """
+        protected = {DEFAULT_TENANT, *keep}
+        usage = {tenant.id: sum(tenant.memory_usage().values()) for tenant in self.loaded_tenants()}
+        evicted = []
+        with self._lock:
+            total = sum(usage.get(tenant_id, 0) for tenant_id in self._loaded)
+            for tenant_id in list(self._loaded):
+                if total <= self.memory_budget and len(self._loaded) <= self.max_tenants:
+                    break
+                if tenant_id in protected:
+                    continue
+                del self._loaded[tenant_id]
+                total -= usage.get(tenant_id, 0)
+                self._evictions[tenant_id] += 1
+                evicted.append(tenant_id)
+        for tenant_id in evicted:
+            print(f"Evicted tenant {tenant_id} (loaded tenants now hold ~{total // (1024 * 1024)} MB)")
+        return evicted
+
+    def stats(self) -> Dict:
+        """Per-tenant load state and memory by component, plus the budget."""
+        loaded = {tenant.id: tenant for tenant in self.loaded_tenants()}
+        now = time.monotonic()
+        tenants = {}
+        total = 0
+        for tenant_id in self.catalogs:
+            tenant = loaded.get(tenant_id)
+            entry = {
+                "loaded": tenant is not None,
+                "loads": self._loads[tenant_id],
+                "evictions": self._evictions[tenant_id],
+            }
+            if tenant is not None:
+                memory = tenant.memory_usage()
+                total += sum(memory.values())
+                entry.update({
+                    "catalog_version": tenant.planner.catalog_version,
+                    "courses": len(tenant.planner.courses),
+                    "badges": len(tenant.planner.badges),
+                    "memory_bytes": sum(memory.values()),
+                    "memory": memory,
+                    "idle_seconds": round(now - tenant.last_used, 1),
+                })
+            if tenant_id in self._errors:
+                entry["error"] = self._errors[tenant_id]
+            tenants[tenant_id] = entry
+        return {
+            "default": DEFAULT_TENANT,
+            "loaded": len(loaded),
+            "max_tenants": self.max_tenants,
+            "memory_bytes": total,
+            "memory_budget_bytes": self.memory_budget,
+            "tenants": tenants,
+        }
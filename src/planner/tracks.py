@@ -0,0 +1,128 @@
+"""
+Precomputed index of badge tracks.
+
+A track is a path through the badge progression graph from a basic badge to
+an expert badge. Every track is enumerated once per catalog, together with
+the courses it takes (the badges' courses and their prerequisites) as a row
+of a sparse track x course matrix of hours. A user's remaining hours on
+every track is then one sparse matrix-vector product with their completed
+courses, so "which expert badges can I reach, and how far is each" needs no
+graph traversal per request.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Guard against combinatorial blow-up in a badly formed progression graph
+MAX_TRACKS = 100000
+
+
+class TrackIndex:
+    """
+    All basic-to-expert badge tracks with their course hours.
+
+    Attributes:
+        tracks: Badge ids along each track, basic first
+        total_hours: float32 course hours per track
+        course_hours: CSR track x course matrix of the hours each track needs
+        tracks_through: Badge id -> int32 ids of the tracks passing through it
+    """
+
+    def __init__(self, progressions: Dict[str, List[str]], badge_level, required_courses,
+                 course_hours: Dict[str, float]):
+        from scipy import sparse
+
+        starts = sorted(badge for badge in set(progressions) | {b for n in progressions.values() for b in n}
+                        if badge_level(badge) == "basic")
+        self.tracks: List[Tuple[str, ...]] = []
+        for start in starts:
+            stack = [(start,)]
+            while stack:
+                path = stack.pop()
+                if badge_level(path[-1]) == "expert":
+                    self.tracks.append(path)
+                    if len(self.tracks) > MAX_TRACKS:
+                        raise ValueError(f"More than {MAX_TRACKS} badge tracks; check relationships.json")
+                    continue
+                for next_id in reversed(progressions.get(path[-1], ())):
+                    if next_id not in path:
+                        stack.append(path + (next_id,))
+
+        self.course_ids: List[str] = list(course_hours)
+        self.course_index: Dict[str, int] = {course_id: i for i, course_id in enumerate(self.course_ids)}
+        rows, cols, hours = [], [], []
+        through: Dict[str, List[int]] = {}
+        for track_id, track in enumerate(self.tracks):
+            courses, _ = required_courses(track)
+            for course_id in courses:
+                rows.append(track_id)
+                cols.append(self.course_index[course_id])
+                hours.append(course_hours[course_id])
+            for badge_id in track:
+                through.setdefault(badge_id, []).append(track_id)
+
+        self.course_hours = sparse.csr_matrix(
+            (np.asarray(hours, dtype=np.float32), (rows, cols)), shape=(len(self.tracks), len(self.course_ids))
+        )
+        self.total_hours = np.asarray(self.course_hours.sum(axis=1), dtype=np.float32).ravel()
+        self.tracks_through: Dict[str, np.ndarray] = {
+            badge_id: np.asarray(track_ids, dtype=np.int32) for badge_id, track_ids in through.items()
+        }
+        self.track_expert = [track[-1] for track in self.tracks]
+
+    @classmethod
+    def from_planner(cls, planner) -> "TrackIndex":
+        scheduler = planner.scheduler
+        return cls(planner.badge_progressions, planner.badge_level, scheduler.required_courses, scheduler.hours)
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def nbytes(self) -> int:
+        matrix = self.course_hours
+        return (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes + self.total_hours.nbytes
+                + sum(a.nbytes for a in self.tracks_through.values()))
+
+    def remaining_hours(self, completed_courses: Iterable[str]) -> np.ndarray:
+        """Course hours still to do on every track."""
+        done = np.zeros(len(self.course_ids), dtype=np.float32)
+        done[[self.course_index[c] for c in completed_courses if c in self.course_index]] = 1
+        return self.total_hours - self.course_hours.dot(done)
+
+    def reachable_experts(self, completed_badges: Iterable[str], completed_courses: Iterable[str],
+                          limit: Optional[int] = None) -> List[Dict]:
+        """
+        Expert badges on a track through any of the user's badges, nearest first.
+
+        Users with no badges yet get every track. Each expert badge is
+        reported once, via its track with the fewest remaining hours.
+
+        Returns:
+            Dicts with 'expert_badge', 'remaining_hours', 'total_hours',
+            'track' (badge ids) and 'next_badge' (first unearned badge on it)
+        """
+        earned = set(completed_badges)
+        through = [self.tracks_through[b] for b in earned if b in self.tracks_through]
+        candidates = np.unique(np.concatenate(through)) if through else np.arange(len(self.tracks))
+        if not len(candidates):
+            return []
+        remaining = self.remaining_hours(completed_courses)[candidates]
+
+        best: Dict[str, int] = {}
+        for position in np.lexsort((candidates, remaining)):
+            track_id = int(candidates[position])
+            expert = self.track_expert[track_id]
+            if expert not in earned and expert not in best:
+                best[expert] = track_id
+        results = []
+        for expert, track_id in list(best.items())[:limit]:
+            track = self.tracks[track_id]
+            results.append({
+                "expert_badge": expert,
+                "remaining_hours": round(float(remaining[np.searchsorted(candidates, track_id)]), 2),
+                "total_hours": round(float(self.total_hours[track_id]), 2),
+                "track": list(track),
+                "next_badge": next((b for b in track if b not in earned), None),
+            })
+        return results
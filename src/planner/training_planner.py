@@ -1,80 +1,280 @@
-import networkx as nx
-import matplotlib.pyplot as plt
-from typing import Dict
-from src.loader.dataLoader import load_badges, load_courses, load_users
+import threading
+from typing import Callable, Dict, List, Optional
+from src.common.deadline import Deadline
+from src.loader.dataLoader import load_catalog, load_relationships
 from src.models.badge import Badge
 from src.models.course import Course
 from src.models.user import User
-from src.llm.ollama_api import OllamaAPI
+from src.store.user_store import open_user_store
 
 class TrainingPlanner:
-    def __init__(self, model_name: str = "llama3.3:70b-instruct-q2_K"):
+    def __init__(self, model_name: str = "llama3.3:70b-instruct-q2_K", user_store=None,
+                 catalog_dir: Optional[str] = None, snapshot_path: Optional[str] = None):
+        self.model_name = model_name
+        # Another tenant's catalog (same layout as the default one) and where its snapshot and
+        # derived indexes are stored; None means the default catalog and locations
+        self.catalog_dir = catalog_dir
+        self.snapshot_path = snapshot_path
         self.badges = {}
         self.courses = {}
-        self.users = {}
-        self.graph = nx.DiGraph()
-        print("Initializing Ollama API...")  # Debug print
-        try:
-            self.llm = OllamaAPI(model=model_name)
-            # Test connection to Ollama
-            available_models = self.llm.get_models()
-            print(f"Available Ollama models: {available_models}")
-        except Exception as e:
-            print(f"Failed to initialize Ollama: {str(e)}")
-            raise
+        self.catalog_version = None
+        self.badge_courses = {}  # badge id -> course ids the badge requires
+        self.course_badges = {}  # course id -> badge ids that require it (reverse index)
+        self.course_dependents = {}  # course id -> course ids that list it as a prerequisite
+        self.badge_levels = {}  # badge id -> basic / intermediate / expert
+        self.badge_progressions = {}  # badge id -> badge ids it leads to (relationships.json)
+        # Users are read from the store on demand instead of being held in memory
+        self.user_store = user_store or open_user_store()
+        # networkx and the Ollama client are only needed by a few methods, so
+        # they are created on first use and never delay startup
+        self._graph = None
+        self._catalog_table = None
+        self._search_index = None
+        self._similar_courses = None
+        self._scheduler = None
+        self._track_index = None
+        self._recommender = None
+        self._memory = {}  # component -> measured bytes, for components that never change once built
+        self._llm = None
+        # One lock per lazily built attribute, so concurrent first requests build it once
+        # while first requests for different attributes do not wait on each other
+        self._build_locks = {name: threading.RLock() for name in (
+            '_graph', '_catalog_table', '_search_index', '_similar_courses', '_scheduler', '_track_index',
+            '_recommender', '_llm'
+        )}
         print("Loading training data...")  # Debug print
         self.load_data()
 
+    def _lazy(self, name: str, build: Callable):
+        """The attribute `name`, built by `build` on first use and only once however many threads ask."""
+        value = getattr(self, name)
+        if value is None:
+            with self._build_locks[name]:
+                value = getattr(self, name)
+                if value is None:
+                    value = build()
+                    setattr(self, name, value)
+        return value
+
+    @property
+    def llm(self):
+        """Ollama client, created on first use without waiting for the model to be pulled."""
+        def build():
+            from src.llm.ollama_api import OllamaAPI
+            return OllamaAPI(model=self.model_name, wait_for_model=False)
+        return self._lazy('_llm', build)
+
+    def llm_available(self, timeout: float = 2) -> bool:
+        """Quick, non-blocking check that Ollama is reachable and serving the model."""
+        try:
+            return self.llm.is_model_available(timeout=timeout)
+        except Exception:
+            return False
+
+    @property
+    def graph(self):
+        """NetworkX view of the catalog, built on first access."""
+        return self._lazy('_graph', self._build_graph)
+
+    @property
+    def catalog_table(self):
+        """Columnar (NumPy) view of the courses, built on first access."""
+        from src.planner.catalog_table import CatalogTable
+        return self._lazy('_catalog_table', lambda: CatalogTable.from_planner(self))
+
+    @property
+    def search_index(self):
+        """Full-text index over courses and badges, built on first access."""
+        from src.planner.search import SearchIndex
+        return self._lazy('_search_index', lambda: SearchIndex.from_planner(self))
+
+    @property
+    def similar_courses(self):
+        """Top-k similar courses, read from next to the catalog snapshot (computed there if missing)."""
+        from src.planner.similarity import load_or_build_similar_courses
+        from src.planner.similarity import similar_courses_path
+        return self._lazy('_similar_courses', lambda: load_or_build_similar_courses(
+            self.courses, self.catalog_version, similar_courses_path(self.snapshot_path)
+        ))
+
+    @property
+    def scheduler(self):
+        """Weekly-budget course scheduler for this catalog, created on first use."""
+        from src.planner.schedule import CourseScheduler
+        return self._lazy('_scheduler', lambda: CourseScheduler(self))
+
+    @property
+    def track_index(self):
+        """Every basic-to-expert badge track with its course hours, built on first access."""
+        from src.planner.tracks import TrackIndex
+        return self._lazy('_track_index', lambda: TrackIndex.from_planner(self))
+
+    @property
+    def recommender(self):
+        """Co-occurrence course recommender, loaded from disk or built from the user store on first access."""
+        from src.planner.recommender import load_or_build_recommender
+        return self._lazy('_recommender', lambda: load_or_build_recommender(self))
+
+    def build_indexes(self):
+        """
+        Build every index the API serves from now instead of on first request.
+
+        For a master process that forks workers: indexes built before the fork
+        are shared copy-on-write instead of being built once per worker. The
+        graph is left lazy since no API route reads it.
+        """
+        for name in ('catalog_table', 'search_index', 'similar_courses', 'scheduler', 'track_index', 'recommender'):
+            getattr(self, name)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Estimated bytes held by the catalog and each index built so far.
+
+        Components are measured once, since they do not change after being
+        built; only the recommender, which takes in completions, is measured
+        every time.
+        """
+        from src.common.memory import deep_sizeof
+
+        def measured(name, build):
+            if name not in self._memory:
+                self._memory[name] = build()
+            return self._memory[name]
+
+        usage = {
+            'catalog': measured('catalog', lambda: deep_sizeof(
+                (self.courses, self.badges, self.badge_courses, self.course_badges,
+                 self.course_dependents, self.badge_levels, self.badge_progressions)
+            )),
+        }
+        if self._graph is not None:
+            usage['graph'] = measured('graph', lambda: deep_sizeof(self._graph))
+        if self._scheduler is not None:
+            usage['scheduler'] = measured('scheduler', lambda: deep_sizeof(
+                (self._scheduler.hours, self._scheduler.prerequisites)
+            ))
+        for name in ('catalog_table', 'search_index', 'similar_courses', 'track_index'):
+            index = getattr(self, f'_{name}')
+            if index is not None:
+                usage[name] = measured(name, index.nbytes)
+        if self._recommender is not None:
+            usage['recommender'] = self._recommender.nbytes()
+        return usage
+
+    def _build_graph(self):
+        import networkx as nx
+
+        graph = nx.DiGraph()
+        for badge in self.badges.values():
+            graph.add_node(f"badge_{badge.id}", type="badge", name=badge.name)
+
+        for course in self.courses.values():
+            graph.add_node(f"course_{course.id}", type="course", name=course.name)
+
+        for course in self.courses.values():
+            # Add relationships
+            for badge_id in course.badges:
+                graph.add_edge(f"course_{course.id}", f"badge_{badge_id}")
+
+            for prereq_id in course.prerequisites:
+                graph.add_edge(f"course_{prereq_id}", f"course_{course.id}")
+
+        for badge_id, next_badges in self.badge_progressions.items():
+            for next_id in next_badges:
+                graph.add_edge(f"badge_{badge_id}", f"badge_{next_id}", type="progression")
+        return graph
+
     def load_data(self):
-        # Load raw data
-        badge_data = load_badges()
-        course_data = load_courses()
-        user_data = load_users()
+        # Load raw data (from the catalog snapshot when it is warm)
+        course_data, badge_data, self.catalog_version = load_catalog(self.snapshot_path, self.catalog_dir)
 
         # Convert to objects
         for badge_id, badge_dict in badge_data.items():
             badge = Badge.from_dict(badge_dict)
             self.badges[badge.id] = badge
-            self.graph.add_node(f"badge_{badge.id}", type="badge", name=badge.name)
 
-        for user_id, user_dict in user_data.items():
-            user = User.from_dict(user_dict)
-            self.users[user.id] = user
-            self.graph.add_node(f"user_{user.id}", type="user", name=user.name)
+            self.badge_levels[badge.id] = badge.level or self._level_from_id(badge.id)
+            self.badge_courses[badge.id] = badge.courses
+            for course_id in self.badge_courses[badge.id]:
+                self.course_badges.setdefault(course_id, []).append(badge.id)
 
         for course_id, course_dict in course_data.items():
             course = Course.from_dict(course_dict)
             self.courses[course.id] = course
-            self.graph.add_node(f"course_{course.id}", type="course", name=course.name)
-
-            # Add relationships
-            for badge_id in course.badges:
-                self.graph.add_edge(f"course_{course.id}", f"badge_{badge_id}")
 
             for prereq_id in course.prerequisites:
-                self.graph.add_edge(f"course_{prereq_id}", f"course_{course.id}")
+                self.course_dependents.setdefault(prereq_id, []).append(course.id)
+
+        self.badge_progressions = self._load_progressions()
+        self._graph = None
+        self._catalog_table = None
+        self._search_index = None
+        self._similar_courses = None
+        self._scheduler = None
+        self._track_index = None
+        self._recommender = None
+        self._memory = {}
+
+    def _load_progressions(self) -> Dict[str, List[str]]:
+        """
+        Badge-to-badge progression edges from relationships.json.
+
+        A badge's `prerequisites` and the `progressions` of the badges it
+        requires describe the same edges, so both are merged; edges to badges
+        missing from the catalog are dropped.
+        """
+        try:
+            relationships = load_relationships(self.catalog_dir)
+        except (OSError, ValueError) as e:
+            print(f"Could not load badge relationships: {e}")
+            return {}
+
+        progressions: Dict[str, List[str]] = {}
+
+        def add(badge_id, next_id):
+            if badge_id in self.badges and next_id in self.badges and badge_id != next_id:
+                targets = progressions.setdefault(badge_id, [])
+                if next_id not in targets:
+                    targets.append(next_id)
+
+        for badge_id, next_badges in relationships.get('progressions', {}).items():
+            for next_id in next_badges:
+                add(badge_id, next_id)
+        for badge_id, prereq_badges in relationships.get('prerequisites', {}).items():
+            for prereq_id in prereq_badges:
+                add(prereq_id, badge_id)
+        return progressions
+
+    @staticmethod
+    def _level_from_id(item_id: str) -> str:
+        for level in ('basic', 'intermediate', 'expert'):
+            if item_id.startswith(f"{level}_"):
+                return level
+        return 'basic'
+
+    def badge_level(self, badge_id: str) -> str:
+        return self.badge_levels.get(badge_id) or self._level_from_id(badge_id)
+
+    def course_level(self, course_id: str) -> str:
+        """Level of the course's related badge, or inferred from its 1xx/2xx/3xx number."""
+        course = self.courses.get(course_id)
+        if course and course.badges and course.badges[0] in self.badge_levels:
+            return self.badge_levels[course.badges[0]]
+        number = course_id.rsplit('_', 1)[-1]
+        if number[:1] == '3':
+            return 'expert'
+        if number[:1] == '2':
+            return 'intermediate'
+        return 'basic'
+
+    def get_user(self, user_id: str) -> Optional[User]:
+        user_dict = self.user_store.get_user(user_id)
+        return User.from_dict(user_dict) if user_dict else None
 
     def visualize_relationships(self):
-        plt.figure(figsize=(12, 8))
-        pos = nx.spring_layout(self.graph)
-        
-        # Draw nodes
-        course_nodes = [n for n in self.graph.nodes() if "course_" in n]
-        badge_nodes = [n for n in self.graph.nodes() if "badge_" in n]
-        
-        nx.draw_networkx_nodes(self.graph, pos, nodelist=course_nodes, node_color='lightblue', node_size=500)
-        nx.draw_networkx_nodes(self.graph, pos, nodelist=badge_nodes, node_color='lightgreen', node_size=500)
-        
-        # Draw edges
-        nx.draw_networkx_edges(self.graph, pos)
-        
-        # Add labels
-        labels = {node: self.graph.nodes[node]["name"] for node in self.graph.nodes()}
-        nx.draw_networkx_labels(self.graph, pos, labels)
-        
-        plt.title("Course and Badge Relationships")
-        plt.axis('off')
-        plt.show()
+        """Draw the catalog graph with matplotlib (imported only when called)."""
+        from src.planner.visualization import visualize_relationships
+        visualize_relationships(self.graph)
 
     def get_prerequisites_for_badge(self, badge_id):
         badge_node = f"badge_{badge_id}"
@@ -83,9 +283,13 @@ class TrainingPlanner:
         
         prerequisites = []
         for course_node in self.graph.predecessors(badge_node):
+            # Badge predecessors are progression edges, not required courses
+            if not course_node.startswith("course_"):
+                continue
+            course_id = course_node[len("course_"):]
             prerequisites.append({
-                'course': self.courses[course_node.split('_')[1]],
-                'prerequisites': self.get_course_prerequisites(course_node.split('_')[1])
+                'course': self.courses[course_id],
+                'prerequisites': self.get_course_prerequisites(course_id)
             })
         return prerequisites
 
@@ -96,35 +300,39 @@ class TrainingPlanner:
         
         prerequisites = []
         for prereq_node in self.graph.predecessors(course_node):
-            if "course_" in prereq_node:
-                prerequisites.append(self.courses[prereq_node.split('_')[1]])
+            prereq_id = prereq_node[len("course_"):]
+            # Prerequisites missing from the catalog only exist as graph nodes
+            if prereq_node.startswith("course_") and prereq_id in self.courses:
+                prerequisites.append(self.courses[prereq_id])
         return prerequisites
 
-    def generate_learning_path(self, current_skills: list, target_badge_id: str) -> str:
+    def generate_learning_path(self, current_skills: list, target_badge_id: str,
+                               deadline: Optional[Deadline] = None) -> str:
         """
         Generate a personalized learning path for achieving a specific badge.
         
         Args:
             current_skills: List of skills/courses the user has already completed
             target_badge_id: ID of the badge the user wants to achieve
+            deadline: Bounds the LLM call; OllamaAPI's default if None
         
         Returns:
             str: A detailed learning plan
         """
-        if f"badge_{target_badge_id}" not in self.graph:
+        if target_badge_id not in self.badges:
             raise ValueError(f"Badge with ID {target_badge_id} not found")
             
         # Get all relevant courses and prerequisites
         prerequisites = self.get_prerequisites_for_badge(target_badge_id)
         
         # Convert badge and course data to dictionaries for the LLM
-        target_badge = self.badges[target_badge_id].__dict__
+        target_badge = self.badges[target_badge_id].to_dict()
         available_courses = {
-            course_id: course.__dict__ 
+            course_id: course.to_dict()
             for course_id, course in self.courses.items()
         }
         available_badges = {
-            badge_id: badge.__dict__ 
+            badge_id: badge.to_dict()
             for badge_id, badge in self.badges.items()
         }
         
@@ -133,7 +341,8 @@ class TrainingPlanner:
             current_skills=current_skills,
             target_badge=target_badge,
             available_courses=available_courses,
-            available_badges=available_badges
+            available_badges=available_badges,
+            deadline=deadline
         )
 
     def find_course_badge_overlaps(self) -> Dict[str, Dict[str, list]]:
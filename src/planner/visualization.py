@@ -0,0 +1,32 @@
+"""
+Matplotlib rendering of the course/badge graph.
+
+Kept out of training_planner so that importing the planner never pulls in
+matplotlib; this module is only imported when a visualization is requested.
+"""
+
+import matplotlib.pyplot as plt
+import networkx as nx
+
+
+def visualize_relationships(graph):
+    plt.figure(figsize=(12, 8))
+    pos = nx.spring_layout(graph)
+    
+    # Draw nodes
+    course_nodes = [n for n in graph.nodes() if "course_" in n]
+    badge_nodes = [n for n in graph.nodes() if "badge_" in n]
+    
+    nx.draw_networkx_nodes(graph, pos, nodelist=course_nodes, node_color='lightblue', node_size=500)
+    nx.draw_networkx_nodes(graph, pos, nodelist=badge_nodes, node_color='lightgreen', node_size=500)
+    
+    # Draw edges
+    nx.draw_networkx_edges(graph, pos)
+    
+    # Add labels
+    labels = {node: graph.nodes[node]["name"] for node in graph.nodes()}
+    nx.draw_networkx_labels(graph, pos, labels)
+    
+    plt.title("Course and Badge Relationships")
+    plt.axis('off')
+    plt.show()
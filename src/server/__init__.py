@@ -1,9 +1,11 @@
 from flask import Flask
 from flask_cors import CORS
 from .routes import api_routes
+from ..api.json_provider import FastJSONProvider
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     CORS(app)  # Enable CORS for all routes
     
     # Register blueprints
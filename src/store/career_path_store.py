@@ -0,0 +1,121 @@
+"""
+Precomputed career-path analyses, keyed by profile hash and catalog version.
+
+The batch job in src/llm/precompute.py fills this store offline; the live
+/api/career/paths route serves a stored analysis whenever the requesting
+profile (and preferences) hash to an entry for the current catalog version.
+Because entries are keyed by content rather than by user, identical profiles
+share one generation and a changed profile simply misses.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+from src.common import serialization
+from src.store.user_store import BASE_DIR, ConnectionPool
+
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "data", "career_paths.db")
+
+# Preferences used for precomputed analyses, and by the live route when a
+# request does not state any
+DEFAULT_CAREER_PREFERENCES = os.getenv(
+    "DEFAULT_CAREER_PREFERENCES",
+    "Grow my skills and advance along the career track that best fits my current role"
+)
+
+PROFILE_FIELDS = ("job_title", "description")
+PROFILE_LIST_FIELDS = ("completed_badges", "completed_courses", "in_progress_courses")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS career_paths (
+    profile_hash TEXT NOT NULL,
+    catalog_version TEXT NOT NULL,
+    career_paths BLOB NOT NULL,
+    generated_at REAL NOT NULL,
+    PRIMARY KEY (profile_hash, catalog_version)
+) WITHOUT ROWID;
+"""
+
+SELECT_PATHS = "SELECT career_paths FROM career_paths WHERE profile_hash = ? AND catalog_version = ?"
+SELECT_EXISTS = "SELECT 1 FROM career_paths WHERE profile_hash = ? AND catalog_version = ?"
+UPSERT_PATHS = """
+INSERT INTO career_paths (profile_hash, catalog_version, career_paths, generated_at)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (profile_hash, catalog_version) DO UPDATE SET
+    career_paths = excluded.career_paths,
+    generated_at = excluded.generated_at
+"""
+
+
+def profile_data(user: Dict) -> Dict:
+    """The parts of a user record the career analysis prompt uses."""
+    data = {field: user.get(field) or "" for field in PROFILE_FIELDS}
+    data.update({field: list(user.get(field) or []) for field in PROFILE_LIST_FIELDS})
+    return data
+
+
+def profile_hash(user_data: Dict, career_preferences: str) -> str:
+    """
+    Hash everything that goes into a career analysis prompt.
+
+    List order and whitespace/case in the preferences do not change the hash,
+    so the frontend's view of a user and the store's view agree.
+    """
+    data = profile_data(user_data)
+    canonical = {field: str(data[field]).strip() for field in PROFILE_FIELDS}
+    canonical.update({field: sorted(data[field]) for field in PROFILE_LIST_FIELDS})
+    canonical["career_preferences"] = " ".join(career_preferences.lower().split())
+    return hashlib.sha1(serialization.dumps(canonical)).hexdigest()
+
+
+class CareerPathStore:
+    """SQLite store of generated career paths."""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, pool_size: int = 4):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def get(self, profile_hash: str, catalog_version: str) -> Optional[List[Dict]]:
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_PATHS, (profile_hash, catalog_version)).fetchone()
+        return serialization.loads(row[0]) if row else None
+
+    def has(self, profile_hash: str, catalog_version: str) -> bool:
+        with self.pool.connection() as conn:
+            return conn.execute(SELECT_EXISTS, (profile_hash, catalog_version)).fetchone() is not None
+
+    def put(self, profile_hash: str, catalog_version: str, career_paths: List[Dict]):
+        with self.pool.transaction() as conn:
+            conn.execute(UPSERT_PATHS, (profile_hash, catalog_version,
+                                        serialization.dumps(career_paths), time.time()))
+
+    def delete_other_versions(self, catalog_version: str) -> int:
+        """Drop analyses generated against any other catalog version."""
+        with self.pool.transaction() as conn:
+            return conn.execute("DELETE FROM career_paths WHERE catalog_version != ?",
+                                (catalog_version,)).rowcount
+
+    def count(self, catalog_version: Optional[str] = None) -> int:
+        with self.pool.connection() as conn:
+            if catalog_version is None:
+                return conn.execute("SELECT COUNT(*) FROM career_paths").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM career_paths WHERE catalog_version = ?",
+                                (catalog_version,)).fetchone()[0]
+
+    def close(self):
+        self.pool.close()
+
+
+def open_career_path_store(db_path: Optional[str] = None) -> Optional[CareerPathStore]:
+    """Open the store at CAREER_PATHS_DB_PATH; returns None if it cannot be opened."""
+    db_path = db_path or os.getenv("CAREER_PATHS_DB_PATH", DEFAULT_DB_PATH)
+    try:
+        return CareerPathStore(db_path)
+    except sqlite3.Error as e:
+        print(f"Could not open career path database at {db_path} ({e}), precomputed paths disabled")
+        return None
@@ -0,0 +1,761 @@
+"""
+User repository backed by SQLite, with data/users.json as a read-only fallback.
+
+Users live in a `users` table and their progress in normalized
+`user_courses` / `user_badges` tables indexed by user, course and badge, so a
+single profile or "who completed X" query never loads the whole population.
+Both stores return plain dicts shaped like the entries in users.json.
+"""
+
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "data", "users.db")
+DEFAULT_JSON_PATH = os.path.join(BASE_DIR, "data", "users.json")
+
+USER_FIELDS = (
+    "id",
+    "name",
+    "job_title",
+    "description",
+    "completed_badges",
+    "completed_courses",
+    "in_progress_courses",
+)
+
+COMPLETED = "completed"
+IN_PROGRESS = "in_progress"
+
+# SQLite's default limit on host parameters is 999 on older builds
+MAX_QUERY_PARAMS = 500
+# Users iter_users() reads per connection checkout
+ITER_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    job_title TEXT,
+    description TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_users_job_title ON users (job_title);
+
+CREATE TABLE IF NOT EXISTS user_courses (
+    user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    course_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, course_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_courses_course ON user_courses (course_id, status);
+
+CREATE TABLE IF NOT EXISTS user_badges (
+    user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    badge_id TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, badge_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_badges_badge ON user_badges (badge_id);
+
+-- Materialized "eligible next courses" per user and catalog version (tenants share the
+-- users but not the catalog), kept up to date by progress events
+CREATE TABLE IF NOT EXISTS next_courses (
+    user_id TEXT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    catalog_version TEXT NOT NULL,
+    course_ids TEXT NOT NULL,
+    PRIMARY KEY (user_id, catalog_version)
+) WITHOUT ROWID;
+
+-- Every course completion recorded by progress events, in order, for consumers that
+-- follow progress incrementally (the course recommender) across processes and restarts
+CREATE TABLE IF NOT EXISTS completion_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    course_id TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call.
+SELECT_USER = "SELECT id, name, job_title, description FROM users WHERE id = ?"
+SELECT_USER_COURSES = "SELECT course_id, status FROM user_courses WHERE user_id = ? ORDER BY position"
+SELECT_USER_BADGES = "SELECT badge_id FROM user_badges WHERE user_id = ? ORDER BY position"
+SELECT_USERS_PAGE = "SELECT id, name, job_title, description FROM users WHERE id > ? ORDER BY id LIMIT ?"
+UPSERT_USER = """
+INSERT INTO users (id, name, job_title, description) VALUES (?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET name = excluded.name, job_title = excluded.job_title,
+    description = excluded.description
+"""
+
+
+def _empty_user(row) -> Dict:
+    return {
+        "id": row[0],
+        "name": row[1],
+        "job_title": row[2],
+        "description": row[3],
+        "completed_badges": [],
+        "completed_courses": [],
+        "in_progress_courses": [],
+    }
+
+
+def _projection(fields: Optional[Iterable[str]]) -> List[str]:
+    """
+    Validate a field projection, always keeping `id` first.
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return list(USER_FIELDS)
+    unknown = set(fields) - set(USER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown user fields: {', '.join(sorted(unknown))}")
+    return ["id"] + [field for field in USER_FIELDS if field in fields and field != "id"]
+
+
+def _add_course(user: Dict, course_id: str, status: str):
+    key = "completed_courses" if status == COMPLETED else "in_progress_courses"
+    user[key].append(course_id)
+
+
+# Pools to reopen in a forked child: SQLite connections must not be used across a fork
+_open_pools: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _reopen_pools_after_fork():
+    for pool in list(_open_pools):
+        pool._forked()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_pools_after_fork)
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of SQLite connections shared between threads.
+
+    Each connection is only ever used by one thread at a time, which is what
+    SQLite requires; `check_same_thread=False` just lets a connection move
+    between threads as it is checked in and out. A forked child (e.g. a
+    gunicorn worker of a preloaded app) opens its own connections on first use.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.size = size
+        self._pool: Optional[queue.LifoQueue] = self._fill()
+        self._inherited: List[queue.LifoQueue] = []
+        self._refill_lock = threading.Lock()
+        _open_pools.add(self)
+
+    def _fill(self) -> queue.LifoQueue:
+        pool: queue.LifoQueue = queue.LifoQueue(maxsize=self.size)
+        for _ in range(self.size):
+            pool.put(self._connect())
+        return pool
+
+    def _forked(self):
+        # The parent's connections stay referenced but unused: closing them here
+        # could release locks and WAL state the parent still relies on
+        if self._pool is not None:
+            self._inherited.append(self._pool)
+        self._pool = None
+        self._refill_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=256,
+            isolation_level=None,  # autocommit; transactions are explicit
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        pool = self._pool
+        if pool is None:
+            with self._refill_lock:
+                if self._pool is None:
+                    self._pool = self._fill()
+                pool = self._pool
+        conn = pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection and commit (or roll back) around the block."""
+        with self.connection() as conn:
+            # A BEGIN that failed (e.g. the database stayed locked) left nothing to roll back
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        while self._pool is not None and not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class SQLiteUserStore:
+    """Read/write user repository in a WAL-mode SQLite database."""
+
+    read_only = False
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, pool_size: int = 4):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        self._lock = threading.Lock()
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    # -- import -----------------------------------------------------------
+
+    def import_json(self, json_path: str = DEFAULT_JSON_PATH, force: bool = False) -> int:
+        """
+        Import users.json into the database once.
+
+        Returns:
+            Number of users imported (0 if the import already happened)
+        """
+        with self._lock:
+            if not force and self._get_meta("json_imported"):
+                return 0
+            with open(json_path, "r") as f:
+                users = json.load(f)
+            with self.pool.transaction() as conn:
+                for user in users.values():
+                    self._write_user(conn, user)
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)",
+                    (json_path,)
+                )
+            return len(users)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # -- writes -----------------------------------------------------------
+
+    def _write_user(self, conn: sqlite3.Connection, user: Dict):
+        user_id = user["id"]
+        conn.execute(UPSERT_USER, (user_id, user.get("name"), user.get("job_title"), user.get("description")))
+        conn.execute("DELETE FROM user_courses WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM user_badges WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM next_courses WHERE user_id = ?", (user_id,))
+        courses = [(course_id, COMPLETED) for course_id in user.get("completed_courses", [])]
+        courses += [(course_id, IN_PROGRESS) for course_id in user.get("in_progress_courses", [])]
+        conn.executemany(
+            "INSERT OR REPLACE INTO user_courses (user_id, course_id, status, position) VALUES (?, ?, ?, ?)",
+            [(user_id, course_id, status, i) for i, (course_id, status) in enumerate(courses)]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO user_badges (user_id, badge_id, position) VALUES (?, ?, ?)",
+            [(user_id, badge_id, i) for i, badge_id in enumerate(user.get("completed_badges", []))]
+        )
+
+    def upsert_user(self, user: Dict):
+        """Insert or fully replace a user and their progress."""
+        with self.pool.transaction() as conn:
+            self._write_user(conn, user)
+
+    def delete_user(self, user_id: str):
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+
+    def apply_progress(
+        self,
+        user_id: str,
+        started: Iterable[str] = (),
+        completed: Iterable[str] = (),
+        awarded_badges: Iterable[str] = (),
+        next_courses: Optional[List[str]] = None,
+        catalog_version: str = ""
+    ):
+        """
+        Record course starts/completions, awarded badges and the refreshed
+        next-course list (for `catalog_version`) for one user in a single transaction.
+
+        Starting a course that is already started or completed is a no-op;
+        completing a course moves it to the end of the completed list. Lists
+        materialized for other catalogs are dropped, since they predate the progress.
+        """
+        with self.pool.transaction() as conn:
+            self._apply_progress(conn, user_id, started, completed, awarded_badges, next_courses, catalog_version)
+
+    def _apply_progress(self, conn: sqlite3.Connection, user_id: str, started: Iterable[str] = (),
+                        completed: Iterable[str] = (), awarded_badges: Iterable[str] = (),
+                        next_courses: Optional[List[str]] = None, catalog_version: str = ""):
+        position = conn.execute(
+            "SELECT COALESCE(MAX(position), -1) FROM user_courses WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+        for course_id in started:
+            position += 1
+            conn.execute(
+                "INSERT INTO user_courses (user_id, course_id, status, position) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, course_id) DO NOTHING",
+                (user_id, course_id, IN_PROGRESS, position)
+            )
+        for course_id in completed:
+            position += 1
+            changed = conn.execute(
+                "INSERT INTO user_courses (user_id, course_id, status, position) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (user_id, course_id) DO UPDATE SET status = excluded.status, "
+                "position = excluded.position WHERE user_courses.status != excluded.status",
+                (user_id, course_id, COMPLETED, position)
+            ).rowcount
+            if changed:
+                conn.execute("INSERT INTO completion_log (user_id, course_id) VALUES (?, ?)", (user_id, course_id))
+
+        badge_position = conn.execute(
+            "SELECT COALESCE(MAX(position), -1) FROM user_badges WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+        for badge_id in awarded_badges:
+            badge_position += 1
+            conn.execute(
+                "INSERT OR IGNORE INTO user_badges (user_id, badge_id, position) VALUES (?, ?, ?)",
+                (user_id, badge_id, badge_position)
+            )
+
+        conn.execute("DELETE FROM next_courses WHERE user_id = ?", (user_id,))
+        if next_courses is not None:
+            conn.execute(
+                "INSERT INTO next_courses (user_id, catalog_version, course_ids) VALUES (?, ?, ?)",
+                (user_id, catalog_version, json.dumps(next_courses))
+            )
+
+    def update_progress(self, user_id: str, catalog_version: str,
+                        update: Callable[[Dict, Optional[List[str]]], Dict]) -> Optional[Dict]:
+        """
+        Read a user's progress and record the changes `update` makes to it in one write transaction.
+
+        The transaction takes the database's write lock before reading, so
+        concurrent updates for a user, from any thread or process, each see
+        the progress the previous one left.
+
+        Args:
+            update: Called with the user and their next-course list for
+                `catalog_version` (None if not materialized); returns
+                apply_progress's started, completed, awarded_badges and
+                next_courses arguments
+
+        Returns:
+            What `update` returned, or None if the user does not exist
+        """
+        with self.pool.transaction() as conn:
+            user = self._read_user(conn, user_id)
+            if user is None:
+                return None
+            row = conn.execute(
+                "SELECT course_ids FROM next_courses WHERE user_id = ? AND catalog_version = ?",
+                (user_id, catalog_version)
+            ).fetchone()
+            changes = update(user, json.loads(row[0]) if row else None)
+            self._apply_progress(conn, user_id, catalog_version=catalog_version, **changes)
+        return changes
+
+    def get_next_courses(self, user_id: str, catalog_version: str) -> Optional[List[str]]:
+        """Materialized next-course list for a catalog, or None if it has not been computed yet."""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT course_ids FROM next_courses WHERE user_id = ? AND catalog_version = ?",
+                (user_id, catalog_version)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_next_courses(self, user_id: str, catalog_version: str, course_ids: List[str]):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO next_courses (user_id, catalog_version, course_ids) VALUES (?, ?, ?)",
+                (user_id, catalog_version, json.dumps(course_ids))
+            )
+
+    def completion_log_bounds(self) -> Tuple[int, int]:
+        """First and last sequence numbers in the completion log; (0, 0) while it is empty."""
+        with self.pool.connection() as conn:
+            first, last = conn.execute("SELECT MIN(seq), MAX(seq) FROM completion_log").fetchone()
+        return first or 0, last or 0
+
+    def completions_since(self, seq: int, limit: int = 1000) -> List[Tuple[int, str, str]]:
+        """Up to `limit` logged completions after `seq`, oldest first, as (seq, user_id, course_id)."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT seq, user_id, course_id FROM completion_log WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit)
+            ).fetchall()
+
+    # -- single-user reads ------------------------------------------------
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            return self._read_user(conn, user_id)
+
+    def _read_user(self, conn: sqlite3.Connection, user_id: str) -> Optional[Dict]:
+        row = conn.execute(SELECT_USER, (user_id,)).fetchone()
+        if row is None:
+            return None
+        user = _empty_user(row)
+        for course_id, status in conn.execute(SELECT_USER_COURSES, (user_id,)):
+            _add_course(user, course_id, status)
+        user["completed_badges"] = [badge_id for (badge_id,) in conn.execute(SELECT_USER_BADGES, (user_id,))]
+        return user
+
+    def __contains__(self, user_id: str) -> bool:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM users WHERE id = ?", (user_id,)).fetchone() is not None
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    # -- bulk reads -------------------------------------------------------
+
+    def _attach_progress(self, conn: sqlite3.Connection, users: Dict[str, Dict],
+                         courses: bool = True, badges: bool = True):
+        """Fill in progress lists for already-fetched users, one query per table per chunk."""
+        user_ids = list(users)
+        for start in range(0, len(user_ids), MAX_QUERY_PARAMS):
+            chunk = user_ids[start:start + MAX_QUERY_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            if courses:
+                for user_id, course_id, status in conn.execute(
+                    f"SELECT user_id, course_id, status FROM user_courses WHERE user_id IN ({placeholders}) "
+                    f"ORDER BY user_id, position", chunk
+                ):
+                    _add_course(users[user_id], course_id, status)
+            if badges:
+                for user_id, badge_id in conn.execute(
+                    f"SELECT user_id, badge_id FROM user_badges WHERE user_id IN ({placeholders}) "
+                    f"ORDER BY user_id, position", chunk
+                ):
+                    users[user_id]["completed_badges"].append(badge_id)
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Fetch many users with one query per table per chunk of ids."""
+        user_ids = list(user_ids)
+        users: Dict[str, Dict] = {}
+        with self.pool.connection() as conn:
+            for start in range(0, len(user_ids), MAX_QUERY_PARAMS):
+                chunk = user_ids[start:start + MAX_QUERY_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                for row in conn.execute(
+                    f"SELECT id, name, job_title, description FROM users WHERE id IN ({placeholders})", chunk
+                ):
+                    users[row[0]] = _empty_user(row)
+            self._attach_progress(conn, users)
+        return users
+
+    def list_users(
+        self,
+        after_id: Optional[str] = None,
+        limit: int = 100,
+        job_title: Optional[str] = None,
+        badge_id: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Return one keyset-paginated page of users ordered by id.
+
+        Args:
+            after_id: Only return users whose id sorts after this one
+            limit: Maximum number of users to return
+            job_title: Only return users with exactly this job title (uses idx_users_job_title)
+            badge_id: Only return users who earned this badge (uses idx_user_badges_badge)
+            fields: Fields to include; progress tables are only read when requested.
+                `id` is always included.
+
+        Returns:
+            List of user dicts restricted to the requested fields
+        """
+        fields = _projection(fields)
+        clauses, params = [], []
+        source = "users u"
+        if badge_id is not None:
+            source = "user_badges b JOIN users u ON u.id = b.user_id"
+            clauses.append("b.badge_id = ?")
+            params.append(badge_id)
+        if job_title is not None:
+            clauses.append("u.job_title = ?")
+            params.append(job_title)
+        if after_id is not None:
+            clauses.append("u.id > ?")
+            params.append(after_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self.pool.connection() as conn:
+            users = {
+                row[0]: _empty_user(row)
+                for row in conn.execute(
+                    f"SELECT u.id, u.name, u.job_title, u.description FROM {source} {where} "
+                    f"ORDER BY u.id LIMIT ?", params + [limit]
+                )
+            }
+            want_courses = "completed_courses" in fields or "in_progress_courses" in fields
+            want_badges = "completed_badges" in fields
+            if want_courses or want_badges:
+                self._attach_progress(conn, users, courses=want_courses, badges=want_badges)
+
+        return [{field: user[field] for field in fields} for user in users.values()]
+
+    def iter_users(self) -> Iterator[Dict]:
+        """
+        Stream every user in id order.
+
+        Users are read a keyset page at a time, each page in its own read
+        transaction, and the connection goes back to the pool before the page
+        is yielded; memory stays constant regardless of headcount, and a slow
+        consumer neither holds a connection nor keeps the WAL from checkpointing.
+        """
+        after_id = ""
+        while True:
+            with self.pool.connection() as conn:
+                # The page's user rows and progress rows come from one WAL snapshot
+                conn.execute("BEGIN")
+                try:
+                    users = {row[0]: _empty_user(row)
+                             for row in conn.execute(SELECT_USERS_PAGE, (after_id, ITER_PAGE_SIZE))}
+                    self._attach_progress(conn, users)
+                finally:
+                    conn.execute("COMMIT")
+            yield from users.values()
+            if len(users) < ITER_PAGE_SIZE:
+                return
+            after_id = next(reversed(users))
+
+    def users_with_badge(self, badge_id: str) -> List[str]:
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT user_id FROM user_badges WHERE badge_id = ?", (badge_id,)
+            )]
+
+    def users_with_course(self, course_id: str, status: str = COMPLETED) -> List[str]:
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT user_id FROM user_courses WHERE course_id = ? AND status = ?", (course_id, status)
+            )]
+
+    def course_completion_counts(self) -> Dict[str, int]:
+        """Number of users who completed each course."""
+        with self.pool.connection() as conn:
+            return dict(conn.execute(
+                "SELECT course_id, COUNT(*) FROM user_courses WHERE status = ? GROUP BY course_id", (COMPLETED,)
+            ))
+
+    def badge_completion_counts(self) -> Dict[str, int]:
+        """Number of users who earned each badge."""
+        with self.pool.connection() as conn:
+            return dict(conn.execute("SELECT badge_id, COUNT(*) FROM user_badges GROUP BY badge_id"))
+
+    # -- asyncio ----------------------------------------------------------
+
+    async def aget_user(self, user_id: str) -> Optional[Dict]:
+        """get_user() on a worker thread so the event loop is never blocked."""
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_user, user_id)
+
+    async def aget_users(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_users, list(user_ids))
+
+    async def aupsert_user(self, user: Dict):
+        await asyncio.get_running_loop().run_in_executor(None, self.upsert_user, user)
+
+    def close(self):
+        self.pool.close()
+
+
+class JsonUserStore:
+    """Read-only user store over users.json, used when SQLite is unavailable."""
+
+    read_only = True
+
+    def __init__(self, json_path: str = DEFAULT_JSON_PATH):
+        self.json_path = json_path
+        self._users: Optional[Dict[str, Dict]] = None
+        self._sorted_ids: Optional[List[str]] = None
+        self._next_courses: Dict[tuple, List[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def users(self) -> Dict[str, Dict]:
+        if self._users is None:
+            with self._lock:
+                if self._users is None:
+                    with open(self.json_path, "r") as f:
+                        self._users = json.load(f)
+        return self._users
+
+    def upsert_user(self, user: Dict):
+        raise RuntimeError("The JSON user store is read-only")
+
+    def delete_user(self, user_id: str):
+        raise RuntimeError("The JSON user store is read-only")
+
+    def apply_progress(self, user_id: str, started: Iterable[str] = (), completed: Iterable[str] = (),
+                       awarded_badges: Iterable[str] = (), next_courses: Optional[List[str]] = None,
+                       catalog_version: str = ""):
+        raise RuntimeError("The JSON user store is read-only")
+
+    def update_progress(self, user_id: str, catalog_version: str,
+                        update: Callable[[Dict, Optional[List[str]]], Dict]) -> Optional[Dict]:
+        raise RuntimeError("The JSON user store is read-only")
+
+    def get_next_courses(self, user_id: str, catalog_version: str) -> Optional[List[str]]:
+        return self._next_courses.get((catalog_version, user_id))
+
+    def set_next_courses(self, user_id: str, catalog_version: str, course_ids: List[str]):
+        # Derived data only, so it can be cached even though the store is read-only
+        self._next_courses[(catalog_version, user_id)] = course_ids
+
+    def completion_log_bounds(self) -> Tuple[int, int]:
+        # Nothing records progress in a read-only store
+        return 0, 0
+
+    def completions_since(self, seq: int, limit: int = 1000) -> List[Tuple[int, str, str]]:
+        return []
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        return self.users.get(user_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.users
+
+    def count(self) -> int:
+        return len(self.users)
+
+    def get_users(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        return {user_id: self.users[user_id] for user_id in user_ids if user_id in self.users}
+
+    def iter_users(self) -> Iterator[Dict]:
+        for user_id in self.sorted_ids:
+            yield self.users[user_id]
+
+    @property
+    def sorted_ids(self) -> List[str]:
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self.users)
+        return self._sorted_ids
+
+    def list_users(
+        self,
+        after_id: Optional[str] = None,
+        limit: int = 100,
+        job_title: Optional[str] = None,
+        badge_id: Optional[str] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """Same contract as SQLiteUserStore.list_users, by scanning the sorted ids."""
+        fields = _projection(fields)
+        start = bisect.bisect_right(self.sorted_ids, after_id) if after_id is not None else 0
+        page = []
+        for user_id in itertools.islice(self.sorted_ids, start, None):
+            user = self.users[user_id]
+            if job_title is not None and user.get("job_title") != job_title:
+                continue
+            if badge_id is not None and badge_id not in user.get("completed_badges", []):
+                continue
+            page.append({field: user.get(field) for field in fields})
+            if len(page) >= limit:
+                break
+        return page
+
+    def users_with_badge(self, badge_id: str) -> List[str]:
+        return [u["id"] for u in self.users.values() if badge_id in u.get("completed_badges", [])]
+
+    def users_with_course(self, course_id: str, status: str = COMPLETED) -> List[str]:
+        key = "completed_courses" if status == COMPLETED else "in_progress_courses"
+        return [u["id"] for u in self.users.values() if course_id in u.get(key, [])]
+
+    def course_completion_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for user in self.users.values():
+            for course_id in user.get("completed_courses", []):
+                counts[course_id] = counts.get(course_id, 0) + 1
+        return counts
+
+    def badge_completion_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for user in self.users.values():
+            for badge_id in user.get("completed_badges", []):
+                counts[badge_id] = counts.get(badge_id, 0) + 1
+        return counts
+
+    async def aget_user(self, user_id: str) -> Optional[Dict]:
+        return self.get_user(user_id)
+
+    async def aget_users(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        return self.get_users(user_ids)
+
+    async def aupsert_user(self, user: Dict):
+        self.upsert_user(user)
+
+    def close(self):
+        pass
+
+
+def open_user_store(db_path: Optional[str] = None, json_path: Optional[str] = None):
+    """
+    Open the SQLite user store, importing users.json on first use.
+
+    Set USER_STORE=json to force the read-only JSON store. If the database
+    cannot be opened (e.g. the data directory is mounted read-only) the JSON
+    store is returned instead.
+    """
+    json_path = json_path or os.getenv("USERS_JSON_PATH", DEFAULT_JSON_PATH)
+    if os.getenv("USER_STORE", "sqlite") == "json":
+        return JsonUserStore(json_path)
+
+    db_path = db_path or os.getenv("USER_DB_PATH", DEFAULT_DB_PATH)
+    try:
+        store = SQLiteUserStore(db_path)
+    except sqlite3.Error as e:
+        print(f"Could not open user database at {db_path} ({e}), falling back to read-only {json_path}")
+        return JsonUserStore(json_path)
+
+    if os.path.exists(json_path):
+        imported = store.import_json(json_path)
+        if imported:
+            print(f"Imported {imported} users from {json_path} into {db_path}")
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import users.json into the SQLite user store")
+    parser.add_argument("--db", default=os.getenv("USER_DB_PATH", DEFAULT_DB_PATH))
+    parser.add_argument("--json", default=os.getenv("USERS_JSON_PATH", DEFAULT_JSON_PATH))
+    parser.add_argument("--force", action="store_true", help="Re-import even if already imported")
+    args = parser.parse_args()
+
+    user_store = SQLiteUserStore(args.db)
+    print(f"Imported {user_store.import_json(args.json, force=args.force)} users into {args.db}")
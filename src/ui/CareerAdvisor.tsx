@@ -36,6 +36,7 @@ export const CareerAdvisor: React.FC<Props> = ({ userData, onPathSelect }) => {
   const [error, setError] = useState<string | null>(null);
   const [selectedPath, setSelectedPath] = useState<CareerPath | null>(null);
   const [feedback, setFeedback] = useState("");
+  const [sessionId, setSessionId] = useState<string | null>(null);
 
   const getCareerPaths = async () => {
     setLoading(true);
@@ -58,6 +59,8 @@ export const CareerAdvisor: React.FC<Props> = ({ userData, onPathSelect }) => {
 
       const data = await response.json();
       setCareerPaths(data);
+      // Refinements continue the same LLM session when the server opened one
+      setSessionId(response.headers.get("X-Refine-Session-Id"));
     } catch (err) {
       setError(err instanceof Error ? err.message : "An error occurred");
     } finally {
@@ -80,6 +83,7 @@ export const CareerAdvisor: React.FC<Props> = ({ userData, onPathSelect }) => {
           user_data: userData,
           selected_path: selectedPath,
           user_feedback: feedback,
+          session_id: sessionId,
         }),
       });
 
@@ -109,7 +113,7 @@ export const CareerAdvisor: React.FC<Props> = ({ userData, onPathSelect }) => {
         rows={4}
         variant="outlined"
         label="Career Preferences"
-        placeholder="Describe your career goals and preferences..."
+        placeholder="Describe your career goals and preferences, or leave empty for suggested paths..."
         value={preferences}
         onChange={(e: React.ChangeEvent<HTMLInputElement>) =>
           setPreferences(e.target.value)
@@ -143,7 +147,7 @@ export const CareerAdvisor: React.FC<Props> = ({ userData, onPathSelect }) => {
         variant="contained"
         color="primary"
         onClick={getCareerPaths}
-        disabled={loading || !preferences}
+        disabled={loading}
         sx={{
           mt: 2,
           mb: 4,
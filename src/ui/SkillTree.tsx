@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 import UserSelector from "./components/UserSelector";
 import { useUsers } from "./hooks/useUsers";
 import { CareerAdvisor } from "./CareerAdvisor";
@@ -80,12 +80,18 @@ const SkillTree: React.FC<SkillTreeProps> = (props) => {
   const [selectedUserId, setSelectedUserId] = useState<string | null>(null);
   const [selectedBadge, setSelectedBadge] = useState<Node | null>(null);
   const [isAdvisorOpen, setIsAdvisorOpen] = useState(false);
-  const { users, loading: loadingUsers } = useUsers();
+  const { users, loading: loadingUsers, hasMore: moreUsers, loadMore: loadMoreUsers } = useUsers();
 
   const badges = nodes.filter((node) => node.type === "badge");
   const courses = nodes.filter((node) => node.type === "course");
   const selectedUser = users.find((user) => user.id === selectedUserId);
 
+  // Opening a profile lets the backend start the career analysis in the background
+  useEffect(() => {
+    if (!selectedUserId) return;
+    fetch(`/api/users/${encodeURIComponent(selectedUserId)}`).catch(() => {});
+  }, [selectedUserId]);
+
   const filteredBadges = (
     selectedUser
       ? badges.filter((badge) =>
@@ -142,6 +148,9 @@ const SkillTree: React.FC<SkillTreeProps> = (props) => {
           users={users}
           selectedUserId={selectedUserId}
           onUserSelect={setSelectedUserId}
+          hasMore={moreUsers}
+          loadingMore={loadingUsers}
+          onLoadMore={loadMoreUsers}
         />
         <div>
           {selectedBadge ? (
@@ -284,7 +293,7 @@ const SkillTree: React.FC<SkillTreeProps> = (props) => {
               <h2 style={{ color: "#e3f2fd" }}>
                 Badges {selectedUser && `- ${selectedUser.name}`}
               </h2>
-              {loadingUsers ? (
+              {loadingUsers && users.length === 0 ? (
                 <div style={{ color: "#e3f2fd" }}>Loading users...</div>
               ) : filteredBadges.length === 0 ? (
                 <div style={{ color: "#90a4ae", fontStyle: "italic" }}>
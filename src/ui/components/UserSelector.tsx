@@ -10,12 +10,21 @@ interface UserSelectorProps {
   users: User[];
   selectedUserId: string | null;
   onUserSelect: (userId: string) => void;
+  hasMore?: boolean;
+  loadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
+// Option value that loads the next page of users instead of selecting one
+const LOAD_MORE = "__load_more__";
+
 const UserSelector: React.FC<UserSelectorProps> = ({
   users,
   selectedUserId,
   onUserSelect,
+  hasMore = false,
+  loadingMore = false,
+  onLoadMore,
 }) => {
   return (
     <div
@@ -28,7 +37,13 @@ const UserSelector: React.FC<UserSelectorProps> = ({
     >
       <select
         value={selectedUserId || ""}
-        onChange={(e) => onUserSelect(e.target.value)}
+        onChange={(e) => {
+          if (e.target.value === LOAD_MORE) {
+            onLoadMore?.();
+          } else {
+            onUserSelect(e.target.value);
+          }
+        }}
         style={{
           padding: "0.5rem",
           borderRadius: "4px",
@@ -62,6 +77,18 @@ const UserSelector: React.FC<UserSelectorProps> = ({
             {user.name} - {user.job_title}
           </option>
         ))}
+        {hasMore && onLoadMore && (
+          <option
+            value={LOAD_MORE}
+            disabled={loadingMore}
+            style={{
+              backgroundColor: "#2a2a3f",
+              color: "#90caf9",
+            }}
+          >
+            {loadingMore ? "Loading users..." : "Load more users..."}
+          </option>
+        )}
       </select>
     </div>
   );
@@ -20,13 +20,17 @@ export const useSkillTreeData = () => {
           name: node.name,
           type: node.type,
           level: node.level,
-          description: node.description
+          description: node.description,
+          x: node.x,
+          y: node.y,
+          rank: node.rank
         }));
 
         const transformedLinks = data.links.map((link: any) => ({
           source: link.source,
           target: link.target,
-          type: link.type
+          type: link.type,
+          points: link.points
         }));
 
         setNodes(transformedNodes);
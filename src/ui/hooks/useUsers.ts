@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 
 interface User {
   id: string;
@@ -10,26 +10,47 @@ interface User {
   in_progress_courses: string[];
 }
 
+interface UsersPage {
+  users: User[];
+  next_cursor: string | null;
+}
+
+const PAGE_SIZE = 100;
+
 export const useUsers = () => {
   const [users, setUsers] = useState<User[]>([]);
+  const [hasMore, setHasMore] = useState(true);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const cursor = useRef<string | null>(null);
+  const fetching = useRef(false);
 
-  useEffect(() => {
-    const fetchUsers = async () => {
-      try {
-        const response = await fetch('/api/users');
-        const data = await response.json();
-        setUsers(data);
-      } catch (err) {
-        setError(err instanceof Error ? err.message : 'Failed to load users');
-      } finally {
-        setLoading(false);
-      }
-    };
+  // Fetch the page after the last one loaded and append just that page
+  const loadMore = useCallback(async () => {
+    if (fetching.current || !hasMore) return;
+    fetching.current = true;
+    setLoading(true);
+    try {
+      const query = cursor.current
+        ? `?limit=${PAGE_SIZE}&cursor=${encodeURIComponent(cursor.current)}`
+        : `?limit=${PAGE_SIZE}`;
+      const response = await fetch(`/api/users${query}`);
+      const data: UsersPage = await response.json();
+      setUsers((loaded) => loaded.concat(data.users));
+      cursor.current = data.next_cursor;
+      setHasMore(data.next_cursor !== null);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load users');
+    } finally {
+      fetching.current = false;
+      setLoading(false);
+    }
+  }, [hasMore]);
 
-    fetchUsers();
+  useEffect(() => {
+    // Only the first page up front; the rest on demand
+    loadMore();
   }, []);
 
-  return { users, loading, error };
+  return { users, loading, error, hasMore, loadMore };
 };
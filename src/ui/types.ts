@@ -3,10 +3,16 @@ export interface Node {
   name: string;
   type: 'badge' | 'course';
   level: 'basic' | 'intermediate' | 'expert';
+  // Precomputed server-side layout coordinates
+  x?: number;
+  y?: number;
+  rank?: number;
 }
 
 export interface Link {
   source: string;
   target: string;
   type: 'prerequisite' | 'contributes';
+  // Bend points for links that span several layout layers
+  points?: { x: number; y: number }[];
 }